@@ -7,12 +7,14 @@ from routes.auth_routes import auth_bp
 from routes.predict_routes import predict_bp
 from routes.redistribute_routes import redistribute_bp
 from config import Config
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+from utils.geocoding import geocode
+from utils.geo import haversine_one_to_many
+from utils.json_encoder import MongoJSONEncoder
 import requests
 import os
 from models.user import User
-from bson import ObjectId
+from models.retraining import start_retraining_scheduler
+from utils.gazetteer import gazetteer
 
 app = Flask(__name__)
 
@@ -28,6 +30,9 @@ CORS(app, resources={
 # Load configuration
 app.config.from_object(Config)
 
+# Encode ObjectId, datetime and Decimal128 in every JSON response
+app.json_encoder = MongoJSONEncoder
+
 # Set secret key for session management
 app.secret_key = os.environ.get('SECRET_KEY', 'your-super-secret-key')
 
@@ -44,14 +49,19 @@ login_manager.login_message = 'Please log in to access this page.'
 # Initialize database
 init_db(app)
 
+# Periodically retrain the wastage model from recorded actual wastage
+if Config.RETRAIN_ENABLED:
+    start_retraining_scheduler()
+
+# Build the local place-name index before the first geocode needs it
+if Config.GAZETTEER_ENABLED:
+    gazetteer.load_in_background()
+
 # Register blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(predict_bp, url_prefix='/predict')
 app.register_blueprint(redistribute_bp, url_prefix='/api/redistribute')
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="food_wastage_prediction")
-
 # Base wastage rates in kg per person for different event types
 BASE_WASTAGE_RATES = {
     'Wedding': 0.5,
@@ -63,14 +73,10 @@ BASE_WASTAGE_RATES = {
 
 def get_coordinates_from_location(city, state, country):
     """Get coordinates from city, state, and country."""
-    try:
-        location = geolocator.geocode(f"{city}, {state}, {country}")
-        if location:
-            return location.latitude, location.longitude
-        return None
-    except Exception as e:
-        print(f"Error getting coordinates: {e}")
+    latitude, longitude = geocode(f"{city}, {state}, {country}")
+    if latitude is None:
         return None
+    return latitude, longitude
 
 def find_nearby_charities(latitude, longitude, radius_km=10):
     """Find nearby organizations using the coordinates."""
@@ -138,13 +144,15 @@ def find_nearby_charities(latitude, longitude, radius_km=10):
         "old_age_homes": []
     }
     
-    for org in mock_organizations:
-        org_coords = (org["latitude"], org["longitude"])
-        event_coords = (latitude, longitude)
-        distance = geodesic(event_coords, org_coords).kilometers
-        
+    distances = haversine_one_to_many(
+        latitude, longitude,
+        [org["latitude"] for org in mock_organizations],
+        [org["longitude"] for org in mock_organizations]
+    )
+    
+    for org, distance in zip(mock_organizations, distances):
         if distance <= radius_km:
-            org["distance"] = round(distance, 2)
+            org["distance"] = round(float(distance), 2)
             if org["type"] == "charity":
                 nearby_organizations["charities"].append(org)
             elif org["type"] == "ngo":
@@ -189,21 +197,24 @@ def predict_wastage(event_type, expected_attendees, actual_attendees):
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        user_data = mongo.db.users.find_one({'_id': ObjectId(user_id)})
-        if not user_data:
+        # Served from a short-lived per-process cache instead of Mongo on every request
+        user = User.get(user_id)
+        if user is None or not user.is_active:
             return None
-        user = User(
-            email=user_data.get('email'),
-            mobile=user_data.get('mobile'),
-            name=user_data.get('name')
-        )
-        user._id = user_data['_id']
-        user.password_hash = user_data.get('password_hash')
         return user
     except Exception as e:
         print(f"Error loading user: {str(e)}")
         return None
 
+@jwt.user_lookup_loader
+def load_jwt_user(jwt_header, jwt_data):
+    # API tokens of deactivated accounts are refused too, not only browser sessions
+    return load_user(jwt_data['sub'])
+
+@jwt.user_lookup_error_loader
+def jwt_user_rejected(jwt_header, jwt_data):
+    return jsonify({'error': 'Account not found or deactivated'}), 403
+
 @app.route('/')
 def index():
     return render_template('index.html')
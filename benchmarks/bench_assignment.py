@@ -0,0 +1,59 @@
+"""
+Time the surplus assignment engine on synthetic city-sized batches.
+
+    python benchmarks/bench_assignment.py --surpluses 1000 3000 --charities 2000
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.assignment import plan_assignments
+from models.charity_model import Charity
+
+FOODS = ['rice', 'dal', 'roti', 'paneer', 'chicken', 'beef', 'pork', 'dessert']
+
+def make_batch(surplus_count, charity_count, capacity_ratio, seed=7):
+    """Surpluses and charities scattered over a ~50 km square; total capacity = ratio x total surplus"""
+    rng = random.Random(seed)
+    surpluses = [{
+        'id': i,
+        'lat': 12.8 + rng.random() * 0.45,
+        'lng': 77.4 + rng.random() * 0.45,
+        'quantity': rng.randint(5, 60),
+        'food_items': [{'name': name} for name in rng.sample(FOODS, 3)]
+    } for i in range(surplus_count)]
+
+    mean_capacity = sum(s['quantity'] for s in surpluses) * capacity_ratio / charity_count
+    charities = []
+    for j in range(charity_count):
+        requirements = [{'type': 'restriction', 'items': ['beef', 'pork']}] if rng.random() < 0.3 else []
+        charities.append({
+            'id': j,
+            'lat': 12.8 + rng.random() * 0.45,
+            'lng': 77.4 + rng.random() * 0.45,
+            'capacity': max(1, int(rng.expovariate(1 / mean_capacity))),
+            'charity': Charity({'requirements': requirements})
+        })
+    return surpluses, charities
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark plan_assignments')
+    parser.add_argument('--surpluses', type=int, nargs='+', default=[500, 1000, 3000])
+    parser.add_argument('--charities', type=int, default=2000)
+    parser.add_argument('--capacity-ratio', type=float, default=1.0)
+    parser.add_argument('--max-distance', type=float, default=20.0)
+    parser.add_argument('--no-split', action='store_true', help='Each surplus goes to a single charity')
+    args = parser.parse_args()
+
+    for surplus_count in args.surpluses:
+        surpluses, charities = make_batch(surplus_count, args.charities, args.capacity_ratio)
+        plan = plan_assignments(surpluses, charities, args.max_distance, allow_split=not args.no_split)
+        stats = plan['stats']
+        print(f"{surplus_count:>5} surpluses x {args.charities} charities: {stats['runtime_ms']:8.1f} ms, "
+              f"{stats['assigned_quantity'] / stats['total_quantity']:6.1%} assigned, cost {stats['cost']:.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the orjson and stdlib paths of MongoJSONEncoder on event listings.
+
+    python benchmarks/bench_json_encoding.py --events 500 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask import Flask
+from flask import json as flask_json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.json_encoder as json_encoder
+from utils.json_encoder import MongoJSONEncoder
+
+FOODS = ['rice', 'dal', 'roti', 'paneer', 'biryani', 'salad', 'dessert', 'curry']
+EVENT_TYPES = ['wedding', 'corporate', 'birthday', 'festival', 'other']
+
+def make_event(rng, created_at):
+    """An event document shaped like the ones create-event and redistribution store"""
+    food_items = [
+        {'name': name, 'quantity': rng.randint(5, 200), 'unit': 'kg'}
+        for name in rng.sample(FOODS, rng.randint(2, 6))
+    ]
+    charity_id = ObjectId()
+    return {
+        '_id': ObjectId(),
+        'user_id': str(ObjectId()),
+        'event_type': rng.choice(EVENT_TYPES),
+        'expected_attendees': rng.randint(20, 2000),
+        'location': {'type': 'Point', 'coordinates': [77 + rng.random(), 12 + rng.random()]},
+        'food_items': food_items,
+        'wastage_predictions': [
+            {'item': item['name'], 'predicted_waste': round(item['quantity'] * rng.random() * 0.3, 2)}
+            for item in food_items
+        ],
+        'estimated_cost': Decimal128(f"{rng.randint(1000, 90000)}.{rng.randint(0, 99):02d}"),
+        'status': 'redistribution_pending',
+        'charity_id': str(charity_id),
+        'redistribution_details': {
+            'charity_id': charity_id,
+            'food_items': [item['name'] for item in food_items],
+            'status': 'pending',
+            'created_at': created_at + timedelta(hours=2),
+            'pickup_time': '18:30',
+            'notes': ''
+        },
+        'created_at': created_at,
+        'updated_at': created_at + timedelta(hours=3)
+    }
+
+def make_listing(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return {'events': [make_event(rng, start + timedelta(minutes=i)) for i in range(count)], 'next_cursor': None}
+
+def time_encoding(app, payload, repeat, number):
+    with app.app_context():
+        timings = timeit.repeat(lambda: flask_json.dumps(payload), repeat=repeat, number=number)
+    return min(timings) / number
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoding of event listings')
+    parser.add_argument('--events', type=int, default=500, help='Events per listing payload')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--number', type=int, default=5, help='Encodings per timed repeat')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json_encoder = MongoJSONEncoder
+    payload = make_listing(args.events)
+
+    orjson_module = json_encoder.orjson
+    results = {}
+    try:
+        json_encoder.orjson = None
+        results['stdlib'] = time_encoding(app, payload, args.repeat, args.number)
+        if orjson_module is not None:
+            json_encoder.orjson = orjson_module
+            results['orjson'] = time_encoding(app, payload, args.repeat, args.number)
+    finally:
+        json_encoder.orjson = orjson_module
+
+    with app.app_context():
+        size_kb = len(flask_json.dumps(payload)) / 1024
+
+    print(f"{args.events} events, {size_kb:.0f} KB per listing")
+    for name, seconds in results.items():
+        print(f"{name:>7}: {seconds * 1000:8.2f} ms per listing")
+    if 'orjson' in results:
+        print(f"speedup: {results['stdlib'] / results['orjson']:.1f}x")
+    else:
+        print("orjson is not installed; only the stdlib path was measured")
+
+if __name__ == "__main__":
+    main()
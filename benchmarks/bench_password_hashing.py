@@ -0,0 +1,92 @@
+"""
+Measure password hashing throughput and how much it slows other work.
+
+For each policy, a burst of logins is verified through utils.passwords while
+a loop of small CPU tasks (standing in for predictions) runs alongside; the
+second column shows how much that loop slowed down.
+
+    python benchmarks/bench_password_hashing.py --logins 64 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import Config
+import utils.passwords as passwords
+
+POLICIES = [
+    ('bcrypt', {'PASSWORD_HASH_METHOD': 'bcrypt'}),
+    ('pbkdf2', {'PASSWORD_HASH_METHOD': 'pbkdf2'}),
+]
+
+def _foreground_task():
+    rng = np.random.default_rng(0)
+    points = rng.random((2000, 2))
+    return float(np.sqrt(((points - points.mean(axis=0)) ** 2).sum(axis=1)).mean())
+
+def _foreground_rate(stop, counter):
+    while not stop.is_set():
+        _foreground_task()
+        counter[0] += 1
+
+def run_burst(logins, workers, password_hash):
+    """Verify `logins` passwords from 32 request threads; returns (logins/s, foreground tasks/s)"""
+    passwords._executor = ThreadPoolExecutor(max_workers=workers)
+    passwords._admission = threading.BoundedSemaphore(logins)
+
+    stop, counter = threading.Event(), [0]
+    foreground = threading.Thread(target=_foreground_rate, args=(stop, counter))
+    foreground.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as requests:
+        results = list(requests.map(lambda _: passwords.verify_password(password_hash, 'correct horse'), range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    foreground.join()
+
+    assert all(results)
+    return logins / elapsed, counter[0] / elapsed
+
+def baseline_foreground_rate(seconds=1.0):
+    stop, counter = threading.Event(), [0]
+    foreground = threading.Thread(target=_foreground_rate, args=(stop, counter))
+    foreground.start()
+    time.sleep(seconds)
+    stop.set()
+    foreground.join()
+    return counter[0] / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bounded password hashing')
+    parser.add_argument('--logins', type=int, default=64, help='Password checks per burst')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Hashing pool sizes to compare')
+    parser.add_argument('--rounds', type=int, default=Config.BCRYPT_LOG_ROUNDS, help='bcrypt cost')
+    parser.add_argument('--iterations', type=int, default=Config.PBKDF2_ITERATIONS, help='pbkdf2 iterations')
+    args = parser.parse_args()
+
+    Config.BCRYPT_LOG_ROUNDS = args.rounds
+    Config.PBKDF2_ITERATIONS = args.iterations
+    baseline = baseline_foreground_rate()
+    print(f"{os.cpu_count()} CPUs, foreground alone: {baseline:.0f} tasks/s")
+
+    for name, settings in POLICIES:
+        if name == 'bcrypt' and passwords.bcrypt is None:
+            print("bcrypt is not installed; skipping")
+            continue
+        for key, value in settings.items():
+            setattr(Config, key, value)
+        password_hash = passwords._hash('correct horse')
+        for workers in args.workers:
+            logins_per_second, foreground = run_burst(args.logins, workers, password_hash)
+            print(f"{name:>6} workers={workers}: {logins_per_second:7.1f} logins/s, "
+                  f"foreground at {foreground / baseline:6.1%} of its solo rate")
+
+if __name__ == "__main__":
+    main()
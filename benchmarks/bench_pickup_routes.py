@@ -0,0 +1,59 @@
+"""
+Time the pickup route planner on synthetic days of donations.
+
+    python benchmarks/bench_pickup_routes.py --stops 100 300 --vehicles 10
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.pickup_routes import plan_pickup_routes
+from utils.distance_matrix import distance_matrix
+
+DEPOT = (12.97, 77.59)
+
+def make_stops(count, start, hours, seed=7):
+    """Donations over a ~30 km square, with hour-long windows spread over the day"""
+    rng = random.Random(seed)
+    stops = []
+    for i in range(count):
+        window_start = start + timedelta(minutes=rng.randint(0, int(hours * 60) - 120))
+        stops.append({
+            'id': i,
+            'lat': DEPOT[0] - 0.13 + rng.random() * 0.27,
+            'lng': DEPOT[1] - 0.13 + rng.random() * 0.27,
+            'plates': rng.randint(5, 60),
+            'window_start': window_start,
+            'window_end': window_start + timedelta(minutes=60)
+        })
+    return stops
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark plan_pickup_routes')
+    parser.add_argument('--stops', type=int, nargs='+', default=[50, 100, 300])
+    parser.add_argument('--vehicles', type=int, default=10)
+    parser.add_argument('--capacity', type=int, default=200)
+    parser.add_argument('--hours', type=float, default=12)
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1, 8)
+    end = start + timedelta(hours=args.hours)
+    for count in args.stops:
+        stops = make_stops(count, start, args.hours)
+        plan = plan_pickup_routes(stops, DEPOT, start, end, args.vehicles, args.capacity)
+        stats = plan['stats']
+        print(f"{count:>4} stops, {args.vehicles} vehicles: {stats['runtime_ms']:8.1f} ms, "
+              f"{stats['routed_stops']} routed on {stats['vehicles_used']} routes, {stats['distance_km']:.0f} km")
+
+        # Dispatch re-runs the plan when a donation arrives; only its row is new in the matrix
+        stops.append(make_stops(1, start, args.hours, seed=count)[0] | {'id': count})
+        plan = plan_pickup_routes(stops, DEPOT, start, end, args.vehicles, args.capacity)
+        print(f"{'':>4} re-plan with one more: {plan['stats']['runtime_ms']:8.1f} ms")
+    print(f"distance matrix: {distance_matrix.stats()}")
+
+if __name__ == "__main__":
+    main()
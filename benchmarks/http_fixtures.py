@@ -0,0 +1,80 @@
+"""
+Record and replay outbound HTTP for the benchmark suite.
+
+Fixtures are JSON files in benchmarks/fixtures holding one response each:
+{"method", "url", "status", "headers", "body"}. Replay is keyed by method and
+URL only (query bodies are ignored) and any request without a fixture fails,
+so a replayed run never reaches the network.
+"""
+import json
+import os
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class UnrecordedRequest(Exception):
+    """Raised for a request that has no recorded fixture"""
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name)) as f:
+        return json.load(f)
+
+
+def _build_response(request, fixture, body_bytes):
+    response = Response()
+    response.status_code = fixture['status']
+    response.headers = CaseInsensitiveDict(fixture.get('headers') or {})
+    response._content = body_bytes
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter answering from fixtures: {(method, url): fixture}"""
+
+    def __init__(self, fixtures):
+        super().__init__()
+        # Serialised once, so replaying costs what reading a socket buffer would
+        self._responses = {
+            (fixture['method'].upper(), fixture['url']): (fixture, json.dumps(fixture['body']).encode('utf-8'))
+            for fixture in fixtures
+        }
+
+    def send(self, request, **kwargs):
+        url = request.url.split('?')[0]
+        recorded = self._responses.get((request.method.upper(), url))
+        if recorded is None:
+            raise UnrecordedRequest(f"No fixture for {request.method} {url}")
+        return _build_response(request, *recorded)
+
+    def close(self):
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Passes requests through and writes each JSON response to `directory/<name>`"""
+
+    def __init__(self, name, directory=FIXTURE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.directory = directory
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, self.name), 'w') as f:
+            json.dump({
+                'method': request.method,
+                'url': request.url.split('?')[0],
+                'status': response.status_code,
+                'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+                'body': response.json()
+            }, f, indent=1)
+        return response
@@ -0,0 +1,29 @@
+"""
+Re-record the HTTP fixtures the benchmark suite replays. Needs network access.
+
+    python benchmarks/record_fixtures.py --lat 12.9716 --lng 77.5946 --radius 10
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_fixtures import RecordingAdapter
+from routes.predict_routes import fetch_places_overpass
+from utils import http_client
+
+def main():
+    parser = argparse.ArgumentParser(description='Record the Overpass response used by the benchmark suite')
+    parser.add_argument('--lat', type=float, default=12.9716)
+    parser.add_argument('--lng', type=float, default=77.5946)
+    parser.add_argument('--radius', type=float, default=10.0)
+    args = parser.parse_args()
+
+    session = http_client._get_provider('overpass').session
+    session.mount('https://', RecordingAdapter('overpass_interpreter.json'))
+    places = fetch_places_overpass(args.lat, args.lng, args.radius)
+    print(f"Recorded an Overpass response with {len(places)} places")
+
+if __name__ == "__main__":
+    main()
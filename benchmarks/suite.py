@@ -0,0 +1,244 @@
+"""
+Microbenchmarks for the prediction and matching hot paths, compared against
+stored baselines. Runs offline: Mongo is an in-memory mongomock database and
+Overpass answers from the recorded fixtures in benchmarks/fixtures.
+
+    python benchmarks/suite.py                      # fail when a case is >30% slower than its baseline
+    python benchmarks/suite.py --only haversine_one_to_many --threshold 0.5
+    python benchmarks/suite.py --update-baselines   # after an intended change, or on new hardware
+
+Each case is compared as a multiple of a fixed reference workload timed right
+around it, which absorbs most of the load and hardware noise; still re-record
+the baselines on the machine that runs the comparison before trusting a
+failure.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nothing below may reach a real Mongo, Redis, Overpass or the model trainer
+for name, value in {
+    'RETRAIN_ENABLED': 'False',
+    'GAZETTEER_ENABLED': 'False',
+    'OSM_LOCAL_ENABLED': 'False',
+    'VENUE_MATRIX_ENABLED': 'False',
+    'RATELIMIT_STORAGE_URL': '',
+    'OVERPASS_RATE_PER_SECOND': '1000000',
+    'OVERPASS_BURST': '1000000',
+}.items():
+    os.environ.setdefault(name, value)
+
+import mongomock
+import numpy as np
+
+from database.db import mongo
+from models.charity_index import charity_index
+from models.charity_model import Charity
+from models.prediction_model import FoodWastagePrediction
+from routes.predict_routes import WASTAGE_RATES, calculate_wastage_percentage, fetch_places_overpass
+from routes.redistribute_routes import find_nearby_charities
+from utils import http_client
+from utils.geo import haversine_many_to_many, haversine_one_to_many
+
+from http_fixtures import ReplayAdapter, load_fixture
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+CENTER = (12.9716, 77.5946)
+FOODS = ['Rice', 'Dal', 'Paneer Curry', 'Chicken Biryani', 'Roti', 'Salad', 'Gulab Jamun', 'Fish Fry',
+         'Curd', 'Sambar', 'Idli', 'Payasam', 'Egg Curry', 'Pulao', 'Raita', 'Fruit Salad']
+
+def food_items(count, rng):
+    return [{
+        'name': f"{rng.choice(FOODS)} {i}" if i >= len(FOODS) else FOODS[i],
+        'quantity': rng.randint(10, 200),
+        'serving_size': rng.choice([1, 2, 5]),
+        'unit': 'servings'
+    } for i in range(count)]
+
+def charity_docs(count, rng):
+    """Charities within ~15 km of CENTER, most verified, some with food restrictions"""
+    docs = []
+    for i in range(count):
+        restricted = rng.sample(FOODS, rng.randint(0, 3)) if rng.random() < 0.4 else []
+        lat = CENTER[0] - 0.13 + rng.random() * 0.27
+        lng = CENTER[1] - 0.13 + rng.random() * 0.27
+        docs.append({
+            'name': f"Charity {i}",
+            'organization_type': rng.choice(['shelter', 'food_bank', 'ngo']),
+            'location': {'type': 'Point', 'coordinates': [lng, lat]},
+            'capacity': rng.randint(100, 2000),
+            'requirements': [{'type': 'restriction', 'items': restricted}] if restricted else [],
+            'active': True,
+            'verified': rng.random() < 0.9,
+            'created_at': datetime(2024, 1, 1),
+            'updated_at': datetime(2024, 1, 1)
+        })
+    return docs
+
+# Each case takes a size and returns the zero-argument callable to time
+def case_calculate_wastage_percentage(size, rng):
+    event_types = [rng.choice(list(WASTAGE_RATES) + ['Conference', 'Party']) for _ in range(size)]
+    return lambda: [calculate_wastage_percentage(event_type) for event_type in event_types]
+
+def case_predict_wastage(size, rng):
+    prediction = FoodWastagePrediction('Wedding', 250, food_items(size, rng))
+    return prediction.predict_wastage
+
+def scattered_points(count, rng):
+    """Latitude and longitude arrays of `count` points within ~30 km of CENTER"""
+    latitudes = np.array([CENTER[0] + rng.uniform(-0.3, 0.3) for _ in range(count)])
+    longitudes = np.array([CENTER[1] + rng.uniform(-0.3, 0.3) for _ in range(count)])
+    return latitudes, longitudes
+
+def case_haversine_one_to_many(size, rng):
+    """One venue against `size` candidate places or indexed charities"""
+    latitudes, longitudes = scattered_points(size, rng)
+    return lambda: haversine_one_to_many(CENTER[0], CENTER[1], latitudes, longitudes)
+
+def case_haversine_many_to_many(size, rng):
+    """A `size` x `size` matrix, as for the assignment planner and the venue matrix blocks"""
+    latitudes1, longitudes1 = scattered_points(size, rng)
+    latitudes2, longitudes2 = scattered_points(size, rng)
+    return lambda: haversine_many_to_many(latitudes1, longitudes1, latitudes2, longitudes2)
+
+def case_is_suitable_for_food(size, rng):
+    charities = [Charity(doc) for doc in charity_docs(size, rng)]
+    items = food_items(8, rng)
+    return lambda: [charity.is_suitable_for_food(items) for charity in charities]
+
+def case_find_nearby_charities(size, rng):
+    mongo.db.charities.drop()
+    mongo.db.charities.insert_many(charity_docs(size, rng))
+    charity_index.rebuild()
+    location = {'lat': CENTER[0], 'lng': CENTER[1]}
+    items = food_items(8, rng)
+    return lambda: find_nearby_charities(location, items, radius_km=10)
+
+def case_overpass_parsing(size, rng):
+    """fetch_places_overpass over the recorded response with its elements repeated `size` times"""
+    fixture = load_fixture('overpass_interpreter.json')
+    elements = fixture['body']['elements']
+    repeated = []
+    for copy in range(size):
+        # Distinct ids, so every copy survives the de-duplication
+        repeated.extend(dict(element, id=element['id'] + copy * 10 ** 10) for element in elements)
+    fixture = dict(fixture, body=dict(fixture['body'], elements=repeated))
+    http_client._get_provider('overpass').session.mount('https://', ReplayAdapter([fixture]))
+    return lambda: fetch_places_overpass(CENTER[0], CENTER[1], 10)
+
+CASES = {
+    'calculate_wastage_percentage': (case_calculate_wastage_percentage, [10, 1000, 100000]),
+    'predict_wastage': (case_predict_wastage, [5, 50, 500]),
+    'haversine_one_to_many': (case_haversine_one_to_many, [100, 1000, 10000]),
+    'haversine_many_to_many': (case_haversine_many_to_many, [50, 300, 1000]),
+    'is_suitable_for_food': (case_is_suitable_for_food, [10, 100, 1000]),
+    'find_nearby_charities': (case_find_nearby_charities, [50, 500, 5000]),
+    'overpass_parsing': (case_overpass_parsing, [1, 4, 16]),
+}
+
+def measure(func, repeat):
+    """Best seconds per call over `repeat` runs of a loop sized to take ~0.2 s"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def reference_workload():
+    """Fixed pure-Python work whose timing tracks how fast this machine is right now"""
+    total = 0
+    for i in range(20000):
+        total += hash(str(i)) & 0xFF
+    return total
+
+def time_case(name, size, repeat):
+    """(seconds per call, seconds per reference workload timed right around it)"""
+    # Fixed seed per case and size, so every run times the same inputs
+    func = CASES[name][0](size, random.Random(f"{name}-{size}"))
+    # The code under test prints progress; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        before = measure(reference_workload, repeat)
+        seconds = measure(func, repeat)
+        after = measure(reference_workload, repeat)
+    return seconds, (before + after) / 2
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {'meta': {}, 'results': {}}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+def format_seconds(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths against stored baselines')
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help='Cases to run (default: all)')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='Allowed slowdown over the baseline as a fraction (default: 0.3)')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='Store the timings of this run as the new baselines')
+    args = parser.parse_args()
+
+    mongo.db = mongomock.MongoClient().db
+    baselines = load_baselines()
+    measured = {}
+    regressions = []
+
+    for name in args.only or list(CASES):
+        for size in CASES[name][1]:
+            seconds, reference = time_case(name, size, args.repeat)
+            # Compared as multiples of the reference workload, so a busier or
+            # slower machine shifts both sides alike
+            relative = seconds / reference
+            baseline = baselines['results'].get(name, {}).get(str(size))
+            if baseline and not args.update_baselines and relative > baseline['relative'] * (1 + args.threshold):
+                # One retry before calling it a regression; a noisy neighbour rarely hits twice
+                retry_seconds, retry_reference = time_case(name, size, args.repeat)
+                if retry_seconds / retry_reference < relative:
+                    seconds, relative = retry_seconds, retry_seconds / retry_reference
+            measured.setdefault(name, {})[str(size)] = {'seconds': seconds, 'relative': relative}
+
+            line = f"{name:<30} {size:>7} {format_seconds(seconds)}"
+            if baseline:
+                change = relative / baseline['relative'] - 1
+                line += f"  baseline {format_seconds(baseline['seconds'])}  {change:+7.1%}"
+                if change > args.threshold:
+                    regressions.append((name, size, change))
+                    line += '  REGRESSION'
+            print(line)
+
+    if args.update_baselines:
+        for name, sizes in measured.items():
+            baselines['results'][name] = sizes
+        baselines['meta'] = {
+            'recorded_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor() or platform.machine()
+        }
+        with open(BASELINES_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baselines written to {BASELINES_PATH}")
+        return
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than their baseline by more than {args.threshold:.0%}:")
+        for name, size, change in regressions:
+            print(f"  {name} at {size}: {change:+.1%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
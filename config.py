@@ -32,11 +32,26 @@ class Config:
     
     # Rate limiting
     RATELIMIT_DEFAULT = os.getenv('RATELIMIT_DEFAULT', '100 per minute')
-    RATELIMIT_STORAGE_URL = REDIS_URL
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', REDIS_URL)  # empty for per-process buckets
+    RATELIMIT_DEFAULT_BURST = int(os.getenv('RATELIMIT_DEFAULT_BURST', 10))
+    RATELIMIT_MAX_WAIT = float(os.getenv('RATELIMIT_MAX_WAIT', 5))  # longest wait for a slot before giving up
+    RATELIMIT_REDIS_TIMEOUT = float(os.getenv('RATELIMIT_REDIS_TIMEOUT', 0.2))
+    RATELIMIT_REDIS_RETRY = float(os.getenv('RATELIMIT_REDIS_RETRY', 30))  # seconds on local buckets after a Redis error
     
     # Security configuration
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'bcrypt')  # 'bcrypt' or 'pbkdf2'
     BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', 260000))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # cores login/register may use at once
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 16))  # waiting hashes before answering 503
+    PASSWORD_HASH_ADMISSION_TIMEOUT = float(os.getenv('PASSWORD_HASH_ADMISSION_TIMEOUT', 0.5))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
     SSL_REDIRECT = os.getenv('SSL_REDIRECT', 'False').lower() == 'true'
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))  # users kept by the Flask-Login loader
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+    USER_STATS_WINDOW_DAYS = int(os.getenv('USER_STATS_WINDOW_DAYS', 30))  # rolling window on the profile page
+    USER_STATS_RETENTION_DAYS = int(os.getenv('USER_STATS_RETENTION_DAYS', 90))  # daily buckets kept per user
+    USER_STATS_RECENT_PREDICTIONS = int(os.getenv('USER_STATS_RECENT_PREDICTIONS', 10))
     
     # Email configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -50,20 +65,88 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max file size
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
+    LISTING_PAGE_SIZE = int(os.getenv('LISTING_PAGE_SIZE', 50))  # documents per page of event/donation listings
+    LISTING_MAX_PAGE_SIZE = int(os.getenv('LISTING_MAX_PAGE_SIZE', 500))
+    LISTING_STREAM_BATCH_SIZE = int(os.getenv('LISTING_STREAM_BATCH_SIZE', 200))  # cursor batch size for NDJSON listings
     
     # Food wastage prediction configuration
     MIN_CONFIDENCE_THRESHOLD = float(os.getenv('MIN_CONFIDENCE_THRESHOLD', 0.7))
     MAX_PREDICTION_DAYS = int(os.getenv('MAX_PREDICTION_DAYS', 7))
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'artifacts'))
+    MODEL_POINTER_CHECK_SECONDS = float(os.getenv('MODEL_POINTER_CHECK_SECONDS', 30))
+    RETRAIN_ENABLED = os.getenv('RETRAIN_ENABLED', 'True').lower() == 'true'
+    RETRAIN_INTERVAL_MINUTES = int(os.getenv('RETRAIN_INTERVAL_MINUTES', 60))
+    RETRAIN_CHUNK_SIZE = int(os.getenv('RETRAIN_CHUNK_SIZE', 1000))
+    RETRAIN_VALIDATION_EVERY = int(os.getenv('RETRAIN_VALIDATION_EVERY', 5))  # hold out every 5th event
+    RETRAIN_MIN_VALIDATION_ROWS = int(os.getenv('RETRAIN_MIN_VALIDATION_ROWS', 20))
+    RETRAIN_LEASE_SECONDS = int(os.getenv('RETRAIN_LEASE_SECONDS', 1800))
+    PREDICT_LATENCY_BUDGET = float(os.getenv('PREDICT_LATENCY_BUDGET', 3.0))  # seconds for /predict/predict
+    PREDICT_PIPELINE_WORKERS = int(os.getenv('PREDICT_PIPELINE_WORKERS', 8))
+    PREDICT_BATCH_CHUNK_SIZE = int(os.getenv('PREDICT_BATCH_CHUNK_SIZE', 1000))  # events scored per vectorized pass
+    PREDICT_BATCH_MAX_EVENTS = int(os.getenv('PREDICT_BATCH_MAX_EVENTS', 100000))
     
     # Charity search configuration
     DEFAULT_SEARCH_RADIUS_KM = float(os.getenv('DEFAULT_SEARCH_RADIUS_KM', 10.0))
     MAX_SEARCH_RADIUS_KM = float(os.getenv('MAX_SEARCH_RADIUS_KM', 50.0))
+    CHARITY_INDEX_CELL_DEG = float(os.getenv('CHARITY_INDEX_CELL_DEG', 0.05))  # ~5.5 km grid cells
+    CHARITY_INDEX_REFRESH_SECONDS = int(os.getenv('CHARITY_INDEX_REFRESH_SECONDS', 60))
+    CHARITY_INDEX_REBUILD_SECONDS = int(os.getenv('CHARITY_INDEX_REBUILD_SECONDS', 3600))
+    ASSIGNMENT_MAX_DISTANCE_KM = float(os.getenv('ASSIGNMENT_MAX_DISTANCE_KM', 20.0))
+    ASSIGNMENT_CANDIDATES = int(os.getenv('ASSIGNMENT_CANDIDATES', 25))  # nearest charities considered per surplus
+    ASSIGNMENT_REPAIR_ROUNDS = int(os.getenv('ASSIGNMENT_REPAIR_ROUNDS', 3))
+    ASSIGNMENT_TIME_BUDGET_MS = float(os.getenv('ASSIGNMENT_TIME_BUDGET_MS', 800))  # repair stops once a plan took this long
+    ASSIGNMENT_MAX_EVENTS = int(os.getenv('ASSIGNMENT_MAX_EVENTS', 5000))
+    DISTANCE_MATRIX_MAX_POINTS = int(os.getenv('DISTANCE_MATRIX_MAX_POINTS', 4000))  # float32, ~64 MB when full
+    VENUE_MATRIX_ENABLED = os.getenv('VENUE_MATRIX_ENABLED', 'True').lower() == 'true'  # shared venue x charity distances in MODEL_DIR
+    VENUE_MATRIX_MAX_BYTES = int(os.getenv('VENUE_MATRIX_MAX_BYTES', 256 * 1024 * 1024))
+    OVERPASS_CACHE_SIZE = int(os.getenv('OVERPASS_CACHE_SIZE', 2000))
+    OVERPASS_CACHE_TTL = int(os.getenv('OVERPASS_CACHE_TTL', 24 * 3600))  # 1 day
+    OSM_LOCAL_ENABLED = os.getenv('OSM_LOCAL_ENABLED', 'True').lower() == 'true'  # search imported OSM extracts before Overpass
+    FIND_CHARITIES_CACHE_SIZE = int(os.getenv('FIND_CHARITIES_CACHE_SIZE', 1000))
+    FIND_CHARITIES_CACHE_TTL = int(os.getenv('FIND_CHARITIES_CACHE_TTL', 300))  # 0 disables the response cache
+    FIND_CHARITIES_MAX_AGE = int(os.getenv('FIND_CHARITIES_MAX_AGE', 60))  # Cache-Control max-age for clients
+    
+    # Pickup route planning (times in minutes)
+    PICKUP_WINDOW_MINUTES = int(os.getenv('PICKUP_WINDOW_MINUTES', 60))  # a donation can be collected up to this long after its pickup time
+    PICKUP_UTC_OFFSET_MINUTES = int(os.getenv('PICKUP_UTC_OFFSET_MINUTES', 330))  # donors enter local (IST) pickup times
+    PICKUP_SERVICE_MINUTES = float(os.getenv('PICKUP_SERVICE_MINUTES', 10))
+    PICKUP_SPEED_KMH = float(os.getenv('PICKUP_SPEED_KMH', 20))
+    PICKUP_ROAD_FACTOR = float(os.getenv('PICKUP_ROAD_FACTOR', 1.3))  # road distance / great-circle distance
+    PICKUP_VEHICLE_CAPACITY = int(os.getenv('PICKUP_VEHICLE_CAPACITY', 200))  # plates
+    PICKUP_HORIZON_HOURS = float(os.getenv('PICKUP_HORIZON_HOURS', 12))
+    PICKUP_SAVINGS_NEIGHBOURS = int(os.getenv('PICKUP_SAVINGS_NEIGHBOURS', 40))  # nearest stops paired per stop
+    PICKUP_TIME_BUDGET_MS = float(os.getenv('PICKUP_TIME_BUDGET_MS', 2000))  # 2-opt stops once a plan took this long
+    PICKUP_MAX_STOPS = int(os.getenv('PICKUP_MAX_STOPS', 1000))
+    
+    # Outbound HTTP configuration (timeouts in seconds)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))
+    HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))
+    HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 5))
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+    HTTP_QUEUE_TIMEOUT = float(os.getenv('HTTP_QUEUE_TIMEOUT', 5))
+    NOMINATIM_READ_TIMEOUT = float(os.getenv('NOMINATIM_READ_TIMEOUT', 5))
+    NOMINATIM_MAX_CONCURRENCY = int(os.getenv('NOMINATIM_MAX_CONCURRENCY', 2))
+    NOMINATIM_RATE_PER_SECOND = float(os.getenv('NOMINATIM_RATE_PER_SECOND', 1.0))  # Nominatim usage policy
+    NOMINATIM_BURST = int(os.getenv('NOMINATIM_BURST', 1))
+    OVERPASS_READ_TIMEOUT = float(os.getenv('OVERPASS_READ_TIMEOUT', 30))
+    OVERPASS_MAX_CONCURRENCY = int(os.getenv('OVERPASS_MAX_CONCURRENCY', 2))
+    OVERPASS_RATE_PER_SECOND = float(os.getenv('OVERPASS_RATE_PER_SECOND', 1.0))
+    OVERPASS_BURST = int(os.getenv('OVERPASS_BURST', 2))  # Overpass grants a couple of slots per IP
     
     # OTP settings
     OTP_EXPIRY = 300  # 5 minutes
     
     # Geocoding settings
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', 'your-google-maps-api-key')
+    GEOCODE_CACHE_SIZE = int(os.getenv('GEOCODE_CACHE_SIZE', 10000))
+    GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+    GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', 3600))  # 1 hour for "not found" results
+    GAZETTEER_ENABLED = os.getenv('GAZETTEER_ENABLED', 'True').lower() == 'true'  # resolve known place names locally
+    GAZETTEER_PLACES_PATH = os.getenv('GAZETTEER_PLACES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geonames', 'IN.txt'))
+    GAZETTEER_ADMIN1_PATH = os.getenv('GAZETTEER_ADMIN1_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geonames', 'admin1CodesASCII.txt'))
+    GAZETTEER_COUNTRIES = os.getenv('GAZETTEER_COUNTRIES', 'IN')  # comma-separated ISO codes kept from the dump
     
     # SMS service settings (for OTP)
     SMS_API_KEY = os.getenv('SMS_API_KEY', 'your-sms-api-key')
@@ -1,8 +1,92 @@
 from flask_pymongo import PyMongo
-from flask import current_app
+from flask import Flask, current_app
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from config import Config
 
 mongo = PyMongo()
 
+# Indexes every collection needs: collection -> [(name, keys, options)]
+INDEXES = {
+    'users': [
+        ('email_unique', [('email', ASCENDING)], {'unique': True}),
+        ('mobile_unique', [('mobile', ASCENDING)], {'unique': True, 'sparse': True}),
+    ],
+    'events': [
+        ('user_id_created_at', [('user_id', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('charity_id_status', [('charity_id', ASCENDING), ('status', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('assignments_charity_id_status', [('assignments.charity_id', ASCENDING), ('status', ASCENDING)], {}),
+        ('location_2dsphere', [('location', GEOSPHERE)], {}),
+    ],
+    'charities': [
+        ('location_2dsphere', [('location', GEOSPHERE)], {}),
+        ('created_at', [('created_at', ASCENDING)], {}),
+        ('updated_at', [('updated_at', ASCENDING)], {}),
+    ],
+    'donations': [
+        ('status_pickup_window', [('status', ASCENDING), ('pickup_window.start', ASCENDING)], {}),
+    ],
+    'osm_places': [
+        ('location_2dsphere', [('location', GEOSPHERE)], {}),
+        ('region_import_id', [('region', ASCENDING), ('import_id', ASCENDING)], {}),
+    ],
+    'geocode_cache': [
+        ('created_at_ttl', [('created_at', ASCENDING)], {'expireAfterSeconds': Config.GEOCODE_CACHE_TTL}),
+    ],
+    'overpass_cache': [
+        ('created_at_ttl', [('created_at', ASCENDING)], {'expireAfterSeconds': Config.OVERPASS_CACHE_TTL}),
+    ],
+}
+
+# Index options compared when deciding whether an existing index must be rebuilt
+_COMPARED_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds')
+
+def _index_matches(existing, keys, options):
+    if [tuple(key) for key in existing['key']] != [tuple(key) for key in keys]:
+        return False
+    return all(existing.get(option) == options.get(option) for option in _COMPARED_OPTIONS)
+
+def ensure_indexes(db=None):
+    """
+    Create missing indexes and rebuild ones whose keys or options drifted.
+
+    Failures are reported per index and do not stop the others; a 2dsphere build
+    fails while documents still hold non-GeoJSON `location` values, which
+    scripts/migrate_geojson_locations.py fixes.
+    """
+    db = db if db is not None else mongo.db
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        try:
+            existing_indexes = collection.index_information()
+        except Exception as e:
+            # Usually means the server is unreachable, so don't wait on every collection
+            print(f"Could not read indexes of {collection_name}: {str(e)}")
+            return
+
+        for name, keys, options in specs:
+            existing = existing_indexes.get(name)
+            if existing is not None:
+                if _index_matches(existing, keys, options):
+                    continue
+                print(f"Rebuilding index {collection_name}.{name}")
+                collection.drop_index(name)
+            try:
+                collection.create_index(keys, name=name, **options)
+            except Exception as e:
+                print(f"Could not create index {collection_name}.{name}: {str(e)}")
+
 def init_db(app):
+    # Indexes are built by scripts/ensure_indexes.py, not on every import of every worker
     app.config['MONGO_URI'] = 'mongodb://localhost:27017/food_wastage'
     mongo.init_app(app)
+
+def init_standalone():
+    """
+    Connect `mongo` to the web app's database for scripts, without importing
+    app.py and with it the retraining scheduler and the gazetteer thread.
+    Returns the bare Flask app, for an app context.
+    """
+    app = Flask('scripts')
+    app.config.from_object(Config)
+    init_db(app)
+    return app
@@ -0,0 +1,69 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import g, has_app_context
+from database.db import mongo
+
+def _id_variants(doc_id):
+    """Ids are stored both as ObjectId and as their string form, so match either"""
+    variants = [doc_id]
+    if isinstance(doc_id, ObjectId):
+        variants.append(str(doc_id))
+    elif isinstance(doc_id, str):
+        try:
+            variants.append(ObjectId(doc_id))
+        except InvalidId:
+            pass
+    return variants
+
+class IdentityMap:
+    """
+    Per-request cache of documents by collection and id.
+
+    Each document is loaded at most once per request, and load_many fetches
+    every id that is not cached yet with a single `$in` query.
+    """
+
+    def __init__(self):
+        self._documents = {}
+
+    def load_many(self, collection_name, doc_ids):
+        """Return {str(id): document or None} for every id, querying only the missing ones"""
+        cache = self._documents.setdefault(collection_name, {})
+        keys = {str(doc_id): doc_id for doc_id in doc_ids if doc_id is not None}
+
+        missing = [doc_id for key, doc_id in keys.items() if key not in cache]
+        if missing:
+            lookup = [variant for doc_id in missing for variant in _id_variants(doc_id)]
+            for doc in mongo.db[collection_name].find({'_id': {'$in': lookup}}):
+                cache[str(doc['_id'])] = doc
+            for doc_id in missing:
+                cache.setdefault(str(doc_id), None)
+
+        return {key: cache[key] for key in keys}
+
+    def load(self, collection_name, doc_id):
+        if doc_id is None:
+            return None
+        return self.load_many(collection_name, [doc_id])[str(doc_id)]
+
+    def forget(self, collection_name, doc_id):
+        """Drop a cached document after writing to it"""
+        self._documents.get(collection_name, {}).pop(str(doc_id), None)
+
+def identity_map():
+    """The current request's IdentityMap (a throwaway one outside an app context)"""
+    if not has_app_context():
+        return IdentityMap()
+    if 'identity_map' not in g:
+        g.identity_map = IdentityMap()
+    return g.identity_map
+
+def attach_charities(events):
+    """Set `event['charity']` on every event with a charity_id, using one query for all of them"""
+    charities = identity_map().load_many('charities', [event['charity_id'] for event in events if 'charity_id' in event])
+    for event in events:
+        if 'charity_id' in event:
+            charity = charities.get(str(event['charity_id']))
+            if charity:
+                event['charity'] = charity
+    return events
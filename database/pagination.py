@@ -0,0 +1,132 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Response, jsonify, request, stream_with_context
+from flask import json as flask_json
+from pymongo import DESCENDING
+
+from config import Config
+
+# Newest first; _id breaks ties between documents created in the same millisecond
+LISTING_SORT = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$')
+
+def encode_cursor(doc):
+    """Opaque token pointing just past `doc` in LISTING_SORT order"""
+    created_at = doc.get('created_at')
+    payload = {
+        'c': created_at.isoformat() if isinstance(created_at, datetime) else None,
+        'i': str(doc['_id']),
+        'o': isinstance(doc['_id'], ObjectId)
+    }
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return token.decode().rstrip('=')
+
+def decode_cursor(token):
+    """Return (created_at, _id) from a token made by encode_cursor; raises ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload['c']) if payload['c'] else None
+        doc_id = ObjectId(payload['i']) if payload['o'] else payload['i']
+        return created_at, doc_id
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError('Invalid cursor')
+
+def after_cursor(created_at, doc_id):
+    """Filter for the documents that follow (created_at, doc_id) in LISTING_SORT order"""
+    if created_at is None:
+        # Documents without created_at sort last, so only the _id tie-break is left
+        return {'created_at': None, '_id': {'$lt': doc_id}}
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': doc_id}},
+        {'created_at': None}
+    ]}
+
+def listing_options(args, always_include=()):
+    """
+    Parse `limit`, `cursor`, `fields` and `format` query arguments.
+
+    `fields` is a comma separated projection; created_at and _id are always
+    returned because the next cursor is built from them. Raises ValueError.
+    """
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not 1 <= limit <= Config.LISTING_MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {Config.LISTING_MAX_PAGE_SIZE}')
+
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+
+    projection = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        invalid = [field for field in fields if not _FIELD_NAME.match(field)]
+        if invalid:
+            raise ValueError(f"Invalid field names: {', '.join(invalid)}")
+        projection = dict.fromkeys(['created_at', *always_include, *fields], 1)
+
+    stream = args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+    return {'limit': limit, 'cursor': cursor, 'projection': projection, 'stream': stream}
+
+def _ndjson_lines(cursor, transform):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= Config.LISTING_STREAM_BATCH_SIZE:
+            yield _encode_batch(batch, transform)
+            batch = []
+    if batch:
+        yield _encode_batch(batch, transform)
+
+def _encode_batch(docs, transform):
+    if transform:
+        transform(docs)
+    return ''.join(flask_json.dumps(doc) + '\n' for doc in docs)
+
+def paginated_listing(collection, query, key, transform=None, always_include=()):
+    """
+    Respond with one keyset-paginated page of `collection` matching `query`.
+
+    The JSON body is `{key: [...], 'next_cursor': token or null}`. With
+    `?format=ndjson` (or `Accept: application/x-ndjson`) every matching
+    document after the cursor is streamed instead, one per line, straight off
+    the Mongo cursor. `transform` is called on each page or streamed batch
+    in place, e.g. to attach related documents.
+    """
+    try:
+        options = listing_options(request.args, always_include)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if options['cursor'] is not None:
+        query = {'$and': [query, after_cursor(*options['cursor'])]}
+    cursor = collection.find(query, options['projection']).sort(LISTING_SORT)
+
+    if options['stream']:
+        if options['limit']:
+            cursor = cursor.limit(options['limit'])
+        cursor = cursor.batch_size(Config.LISTING_STREAM_BATCH_SIZE)
+        return Response(stream_with_context(_ndjson_lines(cursor, transform)), mimetype=NDJSON_MIMETYPE)
+
+    limit = options['limit'] or Config.LISTING_PAGE_SIZE
+    # One extra document tells whether there is a next page
+    docs = list(cursor.limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    docs = docs[:limit]
+    if transform:
+        transform(docs)
+
+    return jsonify({key: docs, 'next_cursor': next_cursor}), 200
@@ -0,0 +1,242 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from config import Config
+from models.charity_model import Charity
+from utils.food_terms import food_vocabulary, normalize_food_name
+from utils.geo import haversine_many_to_many
+
+# Quantities below this are treated as fully assigned (floating point leftovers)
+EPSILON = 1e-6
+
+
+def _restriction_mask(surpluses, charities):
+    """
+    Boolean (surplus x charity) matrix, False where a charity refuses one of the surplus' food items.
+
+    While the shared food vocabulary fits in 64 bits this is one vectorized AND
+    of the surplus and restriction masks; otherwise an inverted index from food
+    term to surpluses means each charity only touches the rows it refuses.
+    """
+    if len(food_vocabulary) <= 64:
+        food_masks = np.array([Charity.food_mask(s['food_items']) for s in surpluses], dtype=np.uint64)
+        restricted = np.array([c['charity'].restricted_mask for c in charities], dtype=np.uint64)
+        return (food_masks[:, np.newaxis] & restricted[np.newaxis, :]) == 0
+
+    mask = np.ones((len(surpluses), len(charities)), dtype=bool)
+    rows_by_food = defaultdict(list)
+    for row, surplus in enumerate(surpluses):
+        for term in {normalize_food_name(item.get('name')) for item in surplus['food_items']}:
+            rows_by_food[term].append(row)
+
+    for column, charity in enumerate(charities):
+        rows = [row for term in charity['charity'].restricted_items for row in rows_by_food.get(term, ())]
+        if rows:
+            mask[rows, column] = False
+    return mask
+
+
+class _Plan:
+    """Greedy flows plus the bookkeeping the repair pass needs"""
+
+    def __init__(self, distances, candidates, quantities, capacities, allow_split):
+        self.distances = distances
+        self.candidates = candidates
+        self.remaining = quantities.copy()
+        self.spare = capacities.copy()
+        self.allow_split = allow_split
+        # charity column -> {surplus row: quantity}
+        self.flows = defaultdict(dict)
+
+    def can_take(self, row, column):
+        if self.remaining[row] <= EPSILON or self.spare[column] <= EPSILON:
+            return False
+        return self.allow_split or self.spare[column] + EPSILON >= self.remaining[row]
+
+    def move(self, row, column, quantity):
+        """Add `quantity` of surplus `row` to charity `column` (negative to take it back)"""
+        flows = self.flows[column]
+        flows[row] = flows.get(row, 0.0) + quantity
+        if flows[row] <= EPSILON:
+            del flows[row]
+        self.spare[column] -= quantity
+
+    def greedy(self):
+        """Fill the globally shortest feasible edges first"""
+        rows, slots = np.nonzero(np.isfinite(self.candidate_distances()))
+        columns = self.candidates[rows, slots]
+        order = np.argsort(self.distances[rows, columns], kind='stable')
+        for row, column in zip(rows[order].tolist(), columns[order].tolist()):
+            if self.can_take(row, column):
+                quantity = min(self.remaining[row], self.spare[column])
+                self.move(row, column, quantity)
+                self.remaining[row] -= quantity
+
+    def candidate_distances(self):
+        return np.take_along_axis(self.distances, self.candidates, axis=1)
+
+    def _best_relocation(self, row, column):
+        """
+        Cheapest way to make room for `row` at the full charity `column` by moving
+        another surplus from there to one of its own candidates with spare capacity.
+        Returns (other row, target column, quantity) or None.
+        """
+        others = np.array([other for other in self.flows[column] if other != row], dtype=np.intp)
+        if not len(others):
+            return None
+        assigned = np.array([self.flows[column][other] for other in others.tolist()])
+        targets = self.candidates[others]
+        spare = self.spare[targets]
+        if self.allow_split:
+            quantity = np.minimum(np.minimum(assigned[:, np.newaxis], spare), self.remaining[row])
+            usable = quantity > EPSILON
+        else:
+            # The whole surplus moves, and must free enough room for all of `row`
+            frees_enough = self.spare[column] + assigned + EPSILON >= self.remaining[row]
+            if not frees_enough.any():
+                return None
+            quantity = assigned[:, np.newaxis]
+            usable = (spare + EPSILON >= quantity) & frees_enough[:, np.newaxis]
+        target_distances = self.distances[others[:, np.newaxis], targets]
+        usable &= np.isfinite(target_distances) & (targets != column)
+        if not usable.any():
+            return None
+
+        # Extra distance per unit: the moved surplus travels further, `row` gets a seat
+        cost = np.where(usable, target_distances - self.distances[others, column][:, np.newaxis], np.inf)
+        i, j = np.unravel_index(np.argmin(cost), cost.shape)
+        return int(others[i]), int(targets[i, j]), float(quantity[i, j] if self.allow_split else assigned[i])
+
+    def _columns_with_relief(self):
+        """Charities where at least one assigned surplus could move to a candidate with spare capacity"""
+        relief = np.zeros(len(self.spare), dtype=bool)
+        pairs = [(other, column) for column, flows in self.flows.items() for other in flows]
+        if not pairs:
+            return relief
+        others, columns = (np.array(values, dtype=np.intp) for values in zip(*pairs))
+        targets = self.candidates[others]
+        movable = ((self.spare[targets] > EPSILON)
+                   & np.isfinite(self.distances[others[:, np.newaxis], targets])
+                   & (targets != columns[:, np.newaxis])).any(axis=1)
+        relief[columns[movable]] = True
+        return relief
+
+    def repair(self, max_rounds, deadline):
+        """Place leftovers by shifting already-assigned surplus to other nearby charities"""
+        for _ in range(max_rounds):
+            relief = self._columns_with_relief()
+            if not relief.any():
+                return
+            improved = False
+            for row in np.argsort(-self.remaining).tolist():
+                if self.remaining[row] <= EPSILON or time.perf_counter() > deadline:
+                    break
+                for column in self.candidates[row].tolist():
+                    if not relief[column] or not np.isfinite(self.distances[row, column]):
+                        continue
+                    relocation = self._best_relocation(row, column)
+                    if relocation is None:
+                        if self.allow_split:
+                            # Does not depend on `row` unless whole surpluses have to fit
+                            relief[column] = False
+                        continue
+                    other, target, quantity = relocation
+                    self.move(other, column, -quantity)
+                    self.move(other, target, quantity)
+                    if self.can_take(row, column):
+                        taken = min(self.remaining[row], self.spare[column])
+                        self.move(row, column, taken)
+                        self.remaining[row] -= taken
+                    improved = True
+                    if self.remaining[row] <= EPSILON:
+                        break
+            if not improved:
+                return
+
+
+def plan_assignments(surpluses, charities, max_distance_km, allow_split=True,
+                     candidates_per_surplus=None, repair_rounds=None, distances=None):
+    """
+    Assign every surplus to charities with spare capacity, as close as possible.
+
+    `surpluses` are dicts with id, lat, lng, quantity and food_items;
+    `charities` are dicts with id, lat, lng, capacity and the Charity object.
+    Only the `candidates_per_surplus` nearest charities within
+    `max_distance_km` that accept all of a surplus' food items are considered.
+    Edges are filled shortest first (greedy); leftovers are then placed by
+    moving other surplus from a full charity to one of its other candidates
+    when that costs the least extra distance (repair), for as long as
+    ASSIGNMENT_TIME_BUDGET_MS allows. With `allow_split` a surplus may be
+    shared between several charities. `distances` (surplus x charity km) is
+    computed with haversine when not given.
+
+    Returns {'assignments', 'unassigned', 'stats'}; quantities are in the
+    units of charity capacity and cost is the sum of quantity x distance.
+    """
+    started = time.perf_counter()
+    candidates_per_surplus = candidates_per_surplus or Config.ASSIGNMENT_CANDIDATES
+    repair_rounds = Config.ASSIGNMENT_REPAIR_ROUNDS if repair_rounds is None else repair_rounds
+
+    quantities = np.array([float(s['quantity']) for s in surpluses], dtype=float)
+    capacities = np.array([float(c['capacity'] or 0) for c in charities], dtype=float)
+    plan = None
+
+    if len(surpluses) and len(charities):
+        if distances is None:
+            distances = haversine_many_to_many(
+                [s['lat'] for s in surpluses], [s['lng'] for s in surpluses],
+                [c['lat'] for c in charities], [c['lng'] for c in charities],
+                dtype=np.float32
+            )
+        feasible = (distances <= max_distance_km) & (capacities > EPSILON)[np.newaxis, :]
+        feasible &= _restriction_mask(surpluses, charities)
+        distances = np.where(feasible, distances, np.float32(np.inf))
+
+        k = min(candidates_per_surplus, len(charities))
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        # Nearest first, so the repair pass tries the best charities first
+        order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+
+        plan = _Plan(distances, candidates, quantities, capacities, allow_split)
+        plan.greedy()
+        # Repair is best effort: it stops when the time budget runs out
+        plan.repair(repair_rounds, started + Config.ASSIGNMENT_TIME_BUDGET_MS / 1000)
+
+    assignments = []
+    total_cost = 0.0
+    if plan is not None:
+        for column, flows in plan.flows.items():
+            for row, quantity in flows.items():
+                distance = float(plan.distances[row, column])
+                total_cost += quantity * distance
+                assignments.append({
+                    'surplus_id': surpluses[row]['id'],
+                    'charity_id': charities[column]['id'],
+                    'quantity': round(float(quantity), 2),
+                    'distance_km': round(distance, 2)
+                })
+        remaining = plan.remaining
+    else:
+        remaining = quantities
+    assignments.sort(key=lambda a: (str(a['surplus_id']), a['distance_km']))
+
+    unassigned = [
+        {'surplus_id': surpluses[row]['id'], 'quantity': round(float(remaining[row]), 2)}
+        for row in np.nonzero(remaining > EPSILON)[0].tolist()
+    ]
+
+    return {
+        'assignments': assignments,
+        'unassigned': unassigned,
+        'stats': {
+            'surpluses': len(surpluses),
+            'charities': len(charities),
+            'total_quantity': round(float(quantities.sum()), 2),
+            'assigned_quantity': round(float(quantities.sum() - remaining.sum()), 2),
+            'cost': round(float(total_cost), 2),
+            'runtime_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+    }
@@ -0,0 +1,126 @@
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+from models.charity_model import Charity
+from database.db import mongo
+from utils.geo import point_coordinates
+from utils.spatial_index import GridIndex
+
+
+# Charities without an `active` flag count as active; `verified` must be set explicitly.
+# ELIGIBLE_QUERY and _is_eligible are the same rule for Mongo and for a single document.
+ELIGIBLE_QUERY = {'active': {'$ne': False}, 'verified': True}
+
+
+def _is_eligible(charity_data):
+    return charity_data.get('active', True) is True and charity_data.get('verified', False) is True
+
+
+class CharityIndex:
+    """
+    Per-process spatial index over active, verified charities.
+
+    Each indexed charity is also kept as a Charity object, so its food
+    restrictions are compiled once per change rather than once per request.
+
+    Built lazily from `mongo.db.charities` on first use. Afterwards only charities
+    created or updated since the last sync are re-read every
+    CHARITY_INDEX_REFRESH_SECONDS, with a full rebuild every
+    CHARITY_INDEX_REBUILD_SECONDS to pick up deletions.
+
+    New charities arrive unverified and stay out of the index until whatever
+    verifies them writes `verified: True` together with a fresh `updated_at`;
+    the next refresh() then picks them up, or the writer can call upsert()
+    straight away.
+    """
+
+    def __init__(self):
+        self._grid = GridIndex(cell_size_deg=Config.CHARITY_INDEX_CELL_DEG)
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._synced_at = None
+        self._watermark = None
+        self._charities = {}
+
+    def _track(self, charity_data):
+        for field in ('created_at', 'updated_at'):
+            stamp = charity_data.get(field)
+            if isinstance(stamp, datetime) and (self._watermark is None or stamp > self._watermark):
+                self._watermark = stamp
+
+    def upsert(self, charity_data):
+        """Add, move or drop a single charity after it was written"""
+        with self._lock:
+            self._track(charity_data)
+            coords = point_coordinates(charity_data)
+            if coords is None or not _is_eligible(charity_data):
+                self._grid.remove(charity_data['_id'])
+                self._charities.pop(charity_data['_id'], None)
+                return
+            self._grid.insert(charity_data['_id'], coords[0], coords[1], charity_data)
+            self._charities[charity_data['_id']] = Charity(charity_data)
+
+    def remove(self, charity_id):
+        with self._lock:
+            self._grid.remove(charity_id)
+            self._charities.pop(charity_id, None)
+
+    def rebuild(self):
+        with self._lock:
+            self._grid.clear()
+            self._charities = {}
+            self._watermark = None
+            for charity_data in mongo.db.charities.find(ELIGIBLE_QUERY):
+                self.upsert(charity_data)
+            self._built_at = self._synced_at = time.monotonic()
+
+    def refresh(self):
+        """Apply charities created or changed since the last sync"""
+        with self._lock:
+            if self._watermark is None:
+                return self.rebuild()
+            changed = mongo.db.charities.find({
+                '$or': [
+                    {'created_at': {'$gt': self._watermark}},
+                    {'updated_at': {'$gt': self._watermark}}
+                ]
+            })
+            for charity_data in changed:
+                self.upsert(charity_data)
+            self._synced_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._built_at is None or now - self._built_at > Config.CHARITY_INDEX_REBUILD_SECONDS:
+            self.rebuild()
+        elif now - self._synced_at > Config.CHARITY_INDEX_REFRESH_SECONDS:
+            self.refresh()
+
+    def within(self, latitude, longitude, radius_km):
+        """Return [(charity_data, distance_km)] within `radius_km`, nearest first"""
+        with self._lock:
+            self._ensure_fresh()
+            results = self._grid.within(latitude, longitude, radius_km)
+        return [(charity_data, distance) for distance, _, charity_data in results]
+
+    def within_charities(self, latitude, longitude, radius_km):
+        """Like within(), but returns [(Charity, distance_km)] with restrictions already compiled"""
+        with self._lock:
+            self._ensure_fresh()
+            results = self._grid.within(latitude, longitude, radius_km)
+            return [(self._charities[charity_id], distance) for distance, charity_id, _ in results]
+
+    def nearest(self, latitude, longitude, k, max_radius_km=None):
+        """Return the `k` nearest [(charity_data, distance_km)]"""
+        with self._lock:
+            self._ensure_fresh()
+            results = self._grid.nearest(latitude, longitude, k, max_radius_km)
+        return [(charity_data, distance) for distance, _, charity_data in results]
+
+    def __len__(self):
+        return len(self._grid)
+
+
+charity_index = CharityIndex()
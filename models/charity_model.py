@@ -1,5 +1,8 @@
 from datetime import datetime
 from database.db import mongo
+from database.loaders import identity_map
+from utils.geo import as_geojson_point, lat_lng_location
+from utils.food_terms import food_vocabulary, normalize_food_name
 
 class Charity:
     def __init__(self, charity_data):
@@ -7,7 +10,7 @@ class Charity:
         self.name = charity_data.get('name')
         self.organization_type = charity_data.get('organization_type')  # shelter, food_bank, ngo, etc.
         self.address = charity_data.get('address')
-        self.location = charity_data.get('location')  # {lat: float, lng: float}
+        self.location = lat_lng_location(charity_data)  # {lat: float, lng: float}
         self.contact_person = charity_data.get('contact_person')
         self.phone = charity_data.get('phone')
         self.email = charity_data.get('email')
@@ -19,6 +22,14 @@ class Charity:
         self.rating = charity_data.get('rating', 0.0)
         self.created_at = charity_data.get('created_at', datetime.utcnow())
         self.updated_at = charity_data.get('updated_at', datetime.utcnow())
+        
+        # Restrictions are compiled once: a normalized set and a mask over the shared food vocabulary
+        self.restricted_items = frozenset(
+            normalize_food_name(item)
+            for requirement in self.requirements if requirement.get('type') == 'restriction'
+            for item in requirement.get('items', [])
+        )
+        self.restricted_mask = food_vocabulary.mask(self.restricted_items, add=True)
 
     def to_dict(self):
         return {
@@ -48,23 +59,31 @@ class Charity:
         """
         Check if the charity can accept the given food items based on their requirements
         """
-        if not self.active or not self.verified:
-            return False
-            
-        # Check if the charity has capacity
+        return bool(Charity.filter_suitable([self], food_items))
+
+    def accepts_food(self, food_items):
+        """Check the charity's food restrictions only (capacity is checked separately)"""
+        return not self.restricted_mask & Charity.food_mask(food_items)
+
+    @staticmethod
+    def food_mask(food_items):
+        """Mask of the food items' names over the shared vocabulary"""
+        return food_vocabulary.mask(item.get('name') for item in food_items)
+
+    @staticmethod
+    def filter_suitable(charities, food_items):
+        """
+        The charities that are active, verified, have the capacity for and accept all
+        of `food_items`. The items are summed and masked once for the whole list.
+        """
         total_quantity = sum(item.get('quantity', 0) for item in food_items)
-        if total_quantity > self.capacity:
-            return False
-            
-        # Check if food items meet the charity's requirements
-        for requirement in self.requirements:
-            if requirement.get('type') == 'restriction':
-                restricted_items = requirement.get('items', [])
-                for food_item in food_items:
-                    if food_item['name'].lower() in [item.lower() for item in restricted_items]:
-                        return False
-                        
-        return True
+        food_mask = Charity.food_mask(food_items)
+        return [
+            charity for charity in charities
+            if charity.active and charity.verified
+            and charity.capacity is not None and total_quantity <= charity.capacity
+            and not charity.restricted_mask & food_mask
+        ]
 
     def save(self):
         return mongo.db.charities.insert_one({
@@ -72,7 +91,7 @@ class Charity:
             'address': self.address,
             'phone': self.phone,
             'email': self.email,
-            'location': self.location,
+            'location': as_geojson_point(self.location),
             'capacity': self.capacity,
             'created_at': self.created_at,
             'rating': self.rating,
@@ -92,4 +111,9 @@ class Charity:
 
     @staticmethod
     def find_by_id(charity_id):
-        return mongo.db.charities.find_one({'_id': charity_id}) 
\ No newline at end of file
+        return identity_map().load('charities', charity_id)
+
+    @staticmethod
+    def find_by_ids(charity_ids):
+        """Load many charities with one query; returns {str(id): charity or None}"""
+        return identity_map().load_many('charities', charity_ids) 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from datetime import datetime
 from database.db import mongo
+from utils.geo import as_geojson_point, lat_lng_location
 
 class Event:
     def __init__(self, event_data):
@@ -8,7 +9,7 @@ class Event:
         self.event_name = event_data.get('event_name')
         self.event_type = event_data.get('event_type')
         self.date = event_data.get('date')
-        self.location = event_data.get('location')
+        self.location = lat_lng_location(event_data)  # {lat: float, lng: float}, or the raw value when it has no coordinates
         self.expected_attendees = event_data.get('expected_attendees')
         self.food_items = event_data.get('food_items', [])  # List of food items with quantities
         self.wasted_food = event_data.get('wasted_food', [])  # Actual wasted food items
@@ -44,7 +45,7 @@ class Event:
             'event_type': self.event_type,
             'food_items': self.food_items,
             'quantity': self.quantity,
-            'location': self.location,
+            'location': as_geojson_point(self.location),
             'created_at': self.created_at,
             'status': self.status
         })
@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+
+
+class LinearModel:
+    """
+    A fitted linear model as the registry stores it: one coefficient per named
+    feature plus an intercept. Plain numbers in JSON, so an artifact loads under
+    any numpy version and without the library that trained it.
+    """
+
+    def __init__(self, coef, intercept, features):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = float(intercept)
+        self.features = tuple(features)
+
+    @classmethod
+    def from_model(cls, model, features):
+        """Copy the weights of any fitted model exposing coef_/intercept_"""
+        return cls(np.ravel(model.coef_), float(np.ravel(model.intercept_)[0]), features)
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        if artifact.get('type') != 'linear':
+            raise ValueError(f"Unsupported model type: {artifact.get('type')}")
+        return cls(artifact['coef'], artifact['intercept'], artifact['features'])
+
+    def to_artifact(self):
+        return {
+            'type': 'linear',
+            'features': list(self.features),
+            'coef': self.coef_.tolist(),
+            'intercept': self.intercept_
+        }
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.coef_))
+        return X @ self.coef_ + self.intercept_
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk, loaded at most once per process.
+
+    Artifacts live in `directory` as `<name>-<version>.json` (see LinearModel);
+    `<name>.current` holds the active version. Nothing is read until the first
+    prediction. Afterwards the pointer file is re-checked every
+    MODEL_POINTER_CHECK_SECONDS, so publishing or activating a version
+    hot-swaps it in every worker.
+    """
+
+    def __init__(self, name, features, directory=None):
+        self.name = name
+        self.features = tuple(features)
+        self.directory = directory or Config.MODEL_DIR
+        self._lock = threading.Lock()
+        self._model = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.directory, f"{self.name}.current")
+
+    def artifact_path(self, version):
+        return os.path.join(self.directory, f"{self.name}-{version}.json")
+
+    def versions(self):
+        pattern = re.compile(rf"^{re.escape(self.name)}-(v\d+)\.json$")
+        found = [match.group(1) for match in map(pattern.match, os.listdir(self.directory)) if match]
+        return sorted(found, key=lambda version: int(version[1:]))
+
+    def _read_pointer(self):
+        with open(self.pointer_path) as f:
+            return f.read().strip()
+
+    def _atomic_write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load_current(self):
+        version = self._read_pointer()
+        if version != self._version:
+            with open(self.artifact_path(version)) as f:
+                model = LinearModel.from_artifact(json.load(f))
+            if model.features != self.features:
+                raise ValueError(f"{self.name} {version} expects features {model.features}, not {self.features}")
+            self._model, self._version = model, version
+            print(f"Loaded {self.name} {version}")
+
+    def get(self):
+        """Return (version, model), loading or hot-swapping it when needed"""
+        now = time.monotonic()
+        if self._model is not None and now - self._checked_at < Config.MODEL_POINTER_CHECK_SECONDS:
+            return self._version, self._model
+
+        with self._lock:
+            if self._model is None or now - self._checked_at >= Config.MODEL_POINTER_CHECK_SECONDS:
+                self._checked_at = now
+                try:
+                    self._load_current()
+                except Exception as e:
+                    if self._model is None:
+                        raise
+                    # Keep serving the loaded version if the new one can't be read
+                    print(f"Could not reload {self.name}: {str(e)}")
+            return self._version, self._model
+
+    def predict(self, features):
+        """Predict for a single feature row"""
+        return float(self.predict_many([features])[0])
+
+    def predict_many(self, rows):
+        """Predict for a 2-D array-like of feature rows in one call"""
+        _, model = self.get()
+        return model.predict(np.asarray(rows, dtype=float))
+
+    def publish(self, model, version=None):
+        """
+        Write the weights of a fitted linear model (anything with coef_ and
+        intercept_, in `features` order) as a new artifact and make it the
+        active version; returns the version.
+        """
+        model = LinearModel.from_model(model, self.features)
+        os.makedirs(self.directory, exist_ok=True)
+        if version is None:
+            existing = self.versions()
+            version = f"v{int(existing[-1][1:]) + 1}" if existing else 'v1'
+        self._atomic_write(self.artifact_path(version), json.dumps(model.to_artifact(), indent=2).encode())
+        self.activate(version)
+        with self._lock:
+            self._model, self._version = model, version
+        return version
+
+    def activate(self, version):
+        """Point every worker at an existing version (also used for rollbacks)"""
+        if not os.path.exists(self.artifact_path(version)):
+            raise ValueError(f"Unknown {self.name} version: {version}")
+        self._atomic_write(self.pointer_path, f"{version}\n".encode())
+        # Force the next get() to re-read the pointer in this process
+        self._checked_at = 0.0
+
+
+# Features in the order models.retraining.model_features builds them
+food_model_registry = ModelRegistry('food_model', features=('event_type_code', 'attendees'))
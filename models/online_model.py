@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class IncrementalLinearModel:
+    """
+    Linear regression updated from mini-batches via accumulated normal equations.
+
+    Each partial_fit adds X^T X and X^T y for the new rows only, so training cost
+    grows with the new data rather than the full history. A ridge prior pulls
+    the weights towards `coef`/`intercept`, which lets a new learner start from
+    an existing model instead of from zero.
+    """
+
+    def __init__(self, n_features, ridge=1.0, coef=None, intercept=0.0):
+        self.n_features = n_features
+        prior = np.append(np.zeros(n_features) if coef is None else np.asarray(coef, dtype=float), intercept)
+        self.xtx = ridge * np.eye(n_features + 1)
+        self.xty = ridge * prior
+        self.n_samples = 0
+        self._solve()
+
+    @classmethod
+    def from_model(cls, model, n_features, ridge=1.0):
+        """Warm-start from any fitted model exposing coef_/intercept_ (e.g. the registry's LinearModel)"""
+        if isinstance(model, cls):
+            return model.copy()
+        return cls(n_features, ridge=ridge, coef=np.ravel(model.coef_), intercept=float(np.ravel(model.intercept_)[0]))
+
+    @classmethod
+    def from_state(cls, state):
+        model = cls(state['n_features'])
+        model.xtx = np.asarray(state['xtx'], dtype=float)
+        model.xty = np.asarray(state['xty'], dtype=float)
+        model.n_samples = state['n_samples']
+        model._solve()
+        return model
+
+    def to_state(self):
+        return {
+            'n_features': self.n_features,
+            'xtx': self.xtx.tolist(),
+            'xty': self.xty.tolist(),
+            'n_samples': self.n_samples
+        }
+
+    def copy(self):
+        return IncrementalLinearModel.from_state(self.to_state())
+
+    def _solve(self):
+        weights = np.linalg.solve(self.xtx, self.xty)
+        self.coef_ = weights[:-1]
+        self.intercept_ = weights[-1]
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=float).reshape(-1, self.n_features)
+        y = np.asarray(y, dtype=float)
+        augmented = np.hstack([X, np.ones((len(X), 1))])
+        self.xtx += augmented.T @ augmented
+        self.xty += augmented.T @ y
+        self.n_samples += len(X)
+        self._solve()
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float).reshape(-1, self.n_features)
+        return X @ self.coef_ + self.intercept_
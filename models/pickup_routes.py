@@ -0,0 +1,228 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from config import Config
+from utils.distance_matrix import distance_matrix
+
+# Minutes of slack when comparing arrival times with window ends
+EPSILON = 1e-6
+
+
+class _Fleet:
+    """Route feasibility for one plan. Node 0 is the depot, stop i is node i + 1."""
+
+    def __init__(self, distances, ready, due, service, plates, capacity, horizon):
+        self.distances = distances.tolist()
+        minutes_per_km = Config.PICKUP_ROAD_FACTOR / Config.PICKUP_SPEED_KMH * 60
+        self.travel = (distances * minutes_per_km).tolist()
+        self.ready = ready
+        self.due = due
+        self.service = service
+        self.plates = plates
+        self.capacity = capacity
+        self.horizon = horizon
+
+    def schedule(self, route):
+        """Arrival minute at each stop of `route`, or None when a window or the horizon is missed"""
+        travel = self.travel
+        clock = 0.0
+        previous = 0
+        arrivals = []
+        for node in route:
+            clock = max(clock + travel[previous][node], self.ready[node])
+            if clock > self.due[node] + EPSILON:
+                return None
+            arrivals.append(clock)
+            clock += self.service[node]
+            previous = node
+        if clock + travel[previous][0] > self.horizon + EPSILON:
+            return None
+        return arrivals
+
+    def length(self, route):
+        distances = self.distances
+        path = [0] + route + [0]
+        return sum(distances[a][b] for a, b in zip(path, path[1:]))
+
+    def savings(self, neighbours):
+        """Clarke-Wright savings d(0,i) + d(0,j) - d(i,j) > 0 between each stop and its nearest neighbours"""
+        distances = np.asarray(self.distances, dtype=np.float32)
+        count = len(distances) - 1
+        if count < 2:
+            return []
+        between = distances[1:, 1:].copy()
+        np.fill_diagonal(between, np.inf)
+        k = min(neighbours, count - 1)
+        nearest = np.argpartition(between, k - 1, axis=1)[:, :k]
+        rows = np.repeat(np.arange(count), k)
+        columns = nearest.ravel()
+        # Each pair once, whichever of the two found it
+        first, second = np.minimum(rows, columns), np.maximum(rows, columns)
+        pairs = np.unique(first * count + second)
+        first, second = pairs // count, pairs % count
+        saving = distances[0, first + 1] + distances[0, second + 1] - distances[first + 1, second + 1]
+        keep = saving > EPSILON
+        order = np.argsort(-saving[keep], kind='stable')
+        return list(zip((first[keep][order] + 1).tolist(), (second[keep][order] + 1).tolist()))
+
+    def merge(self, left, right):
+        """`left` then `right`, or the reverse of that, whichever keeps every window"""
+        if sum(self.plates[node] for node in left) + sum(self.plates[node] for node in right) > self.capacity:
+            return None
+        joined = left + right
+        for candidate in (joined, joined[::-1]):
+            if self.schedule(candidate) is not None:
+                return candidate
+        return None
+
+    def two_opt(self, route, deadline):
+        """Reverse segments while that shortens the route and keeps every window"""
+        distances = self.distances
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            path = [0] + route + [0]
+            for a in range(1, len(path) - 2):
+                for b in range(a + 1, len(path) - 1):
+                    delta = (distances[path[a - 1]][path[b]] + distances[path[a]][path[b + 1]]
+                             - distances[path[a - 1]][path[a]] - distances[path[b]][path[b + 1]])
+                    if delta >= -EPSILON:
+                        continue
+                    candidate = route[:a - 1] + route[a - 1:b][::-1] + route[b:]
+                    if self.schedule(candidate) is not None:
+                        route = candidate
+                        improved = True
+                        break
+                if improved:
+                    break
+        return route
+
+    def cheapest_insertion(self, node, routes):
+        """(route index, position) adding the least distance for `node`, or None"""
+        distances = self.distances
+        best = None
+        for index, route in enumerate(routes):
+            if sum(self.plates[other] for other in route) + self.plates[node] > self.capacity:
+                continue
+            path = [0] + route + [0]
+            for position in range(len(route) + 1):
+                added = (distances[path[position]][node] + distances[node][path[position + 1]]
+                         - distances[path[position]][path[position + 1]])
+                if best is not None and added >= best[0]:
+                    continue
+                if self.schedule(route[:position] + [node] + route[position:]) is not None:
+                    best = (added, index, position)
+        return None if best is None else best[1:]
+
+
+def plan_pickup_routes(stops, depot, start, end, vehicle_count, vehicle_capacity):
+    """
+    Group pickups into multi-stop routes from a depot, one per vehicle.
+
+    `stops` are dicts with id, lat, lng, plates and window_start/window_end
+    datetimes; `depot` is (lat, lng) and vehicles leave it at `start` and must
+    be back by `end`. Routes are built with Clarke-Wright savings under the
+    plate capacity and pickup windows, then shortened with 2-opt. When there
+    are more routes than vehicles the fullest routes are kept and the other
+    stops are inserted into them where they still fit.
+
+    Returns {'routes', 'unassigned', 'stats'}; distances are great-circle km
+    scaled by PICKUP_ROAD_FACTOR for travel times.
+    """
+    started = time.perf_counter()
+    deadline = started + Config.PICKUP_TIME_BUDGET_MS / 1000
+    horizon = (end - start).total_seconds() / 60
+
+    distances = distance_matrix.matrix([depot] + [(stop['lat'], stop['lng']) for stop in stops])
+    fleet = _Fleet(
+        distances,
+        ready=[0.0] + [max((stop['window_start'] - start).total_seconds() / 60, 0.0) for stop in stops],
+        due=[horizon] + [min((stop['window_end'] - start).total_seconds() / 60, horizon) for stop in stops],
+        service=[0.0] + [float(Config.PICKUP_SERVICE_MINUTES)] * len(stops),
+        plates=[0] + [stop['plates'] for stop in stops],
+        capacity=vehicle_capacity,
+        horizon=horizon
+    )
+
+    unassigned = []
+    route_of = {}
+    routes = {}
+    for node in range(1, len(stops) + 1):
+        if fleet.plates[node] > vehicle_capacity:
+            unassigned.append((node, 'over_capacity'))
+        elif fleet.schedule([node]) is None:
+            unassigned.append((node, 'window_unreachable'))
+        else:
+            routes[node] = [node]
+            route_of[node] = node
+
+    for i, j in fleet.savings(Config.PICKUP_SAVINGS_NEIGHBOURS):
+        if i not in route_of or j not in route_of:
+            continue
+        if route_of[i] == route_of[j]:
+            continue
+        left, right = routes[route_of[i]], routes[route_of[j]]
+        # Only route ends can be joined; reversed copies cover the four end pairings
+        if i == left[0]:
+            left = left[::-1]
+        if j == right[-1]:
+            right = right[::-1]
+        if left[-1] != i or right[0] != j:
+            continue
+        merged = fleet.merge(left, right)
+        if merged is None:
+            continue
+        key = route_of[i]
+        del routes[route_of[j]]
+        routes[key] = merged
+        for node in merged:
+            route_of[node] = key
+
+    # Fullest routes get the vehicles; stops of the others are placed where they fit
+    ranked = sorted(routes.values(), key=lambda route: -sum(fleet.plates[node] for node in route))
+    kept = ranked[:vehicle_count]
+    for route in ranked[vehicle_count:]:
+        for node in route:
+            insertion = fleet.cheapest_insertion(node, kept)
+            if insertion is None:
+                unassigned.append((node, 'no_vehicle'))
+            else:
+                index, position = insertion
+                kept[index].insert(position, node)
+
+    kept = [fleet.two_opt(route, deadline) for route in kept]
+
+    planned = []
+    total_distance = 0.0
+    for vehicle, route in enumerate(kept, start=1):
+        arrivals = fleet.schedule(route)
+        distance = fleet.length(route)
+        total_distance += distance
+        planned.append({
+            'vehicle': vehicle,
+            'stops': [{
+                'donation_id': stops[node - 1]['id'],
+                'sequence': sequence,
+                'eta': start + timedelta(minutes=arrival),
+                'plates': stops[node - 1]['plates']
+            } for sequence, (node, arrival) in enumerate(zip(route, arrivals), start=1)],
+            'plates': sum(fleet.plates[node] for node in route),
+            'distance_km': round(distance, 2),
+            'return_at': start + timedelta(
+                minutes=arrivals[-1] + fleet.service[route[-1]] + fleet.travel[route[-1]][0]
+            )
+        })
+
+    return {
+        'routes': planned,
+        'unassigned': [{'donation_id': stops[node - 1]['id'], 'reason': reason} for node, reason in unassigned],
+        'stats': {
+            'stops': len(stops),
+            'routed_stops': sum(len(route) for route in kept),
+            'vehicles_used': len(kept),
+            'distance_km': round(total_distance, 2),
+            'runtime_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+    }
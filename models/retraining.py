@@ -0,0 +1,176 @@
+import os
+import socket
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import Config
+from database.db import mongo
+from models.model_registry import food_model_registry
+from models.online_model import IncrementalLinearModel
+
+# Numeric event type codes used as the first model feature (matches the seed training data)
+MODEL_EVENT_TYPE_CODES = {
+    'wedding': 1,
+    'corporate': 2,
+    'festival': 3,
+    'birthday': 4,
+    'other': 5
+}
+
+N_FEATURES = 2
+STATE_ID = 'food_model'
+
+
+def model_features(event_type, attendees):
+    code = MODEL_EVENT_TYPE_CODES.get(str(event_type).lower(), MODEL_EVENT_TYPE_CODES['other'])
+    return [code, float(attendees or 0)]
+
+
+def total_wasted_kg(wasted_food):
+    """`wasted_food` may be a number, a list of items with quantities, or a {name: quantity} map"""
+    if isinstance(wasted_food, (int, float)) and not isinstance(wasted_food, bool):
+        return float(wasted_food)
+    if isinstance(wasted_food, dict):
+        return float(sum(v for v in wasted_food.values() if isinstance(v, (int, float))))
+    if isinstance(wasted_food, list):
+        return float(sum(item.get('quantity', 0) for item in wasted_food if isinstance(item, dict)))
+    return None
+
+
+def _iter_chunks(cursor, size):
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _acquire_lease(owner):
+    """Only one worker retrains at a time; the lease expires in case that worker dies"""
+    now = datetime.utcnow()
+    state = mongo.db.model_training_state.find_one_and_update(
+        {'_id': STATE_ID, '$or': [{'lease_until': {'$lt': now}}, {'lease_until': {'$exists': False}}]},
+        {'$set': {'lease_owner': owner, 'lease_until': now + timedelta(seconds=Config.RETRAIN_LEASE_SECONDS)}}
+    )
+    if state is None:
+        try:
+            mongo.db.model_training_state.insert_one({
+                '_id': STATE_ID,
+                'lease_owner': owner,
+                'lease_until': now + timedelta(seconds=Config.RETRAIN_LEASE_SECONDS)
+            })
+            return {'_id': STATE_ID}
+        except Exception:
+            # Someone else holds the lease (or created the document first)
+            return None
+    return state
+
+
+def _mean_absolute_error(model, features, targets):
+    return float(np.mean(np.abs(np.asarray(model.predict(features)) - targets)))
+
+
+def retrain_food_model():
+    """
+    Learn from events completed since the last run and publish a better model.
+
+    Completed events are streamed from Mongo in RETRAIN_CHUNK_SIZE chunks past
+    the stored `updated_at` watermark. Every RETRAIN_VALIDATION_EVERY-th row is
+    held out; the rest update an IncrementalLinearModel whose sufficient
+    statistics persist between runs. The learner is published only when it has
+    a lower mean absolute error than the current model on the held-out rows.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    state = _acquire_lease(owner)
+    if state is None:
+        return None
+
+    try:
+        current_version, current_model = food_model_registry.get()
+        if state.get('learner'):
+            learner = IncrementalLinearModel.from_state(state['learner'])
+        else:
+            learner = IncrementalLinearModel.from_model(current_model, N_FEATURES)
+
+        query = {'status': 'completed', 'wasted_food': {'$exists': True}}
+        watermark = state.get('watermark')
+        if watermark is not None:
+            query['updated_at'] = {'$gt': watermark}
+        cursor = mongo.db.events.find(
+            query,
+            {'event_type': 1, 'expected_attendees': 1, 'wasted_food': 1, 'updated_at': 1}
+        ).sort('updated_at', 1).batch_size(Config.RETRAIN_CHUNK_SIZE)
+
+        trained = 0
+        validation_features, validation_targets = [], []
+        for chunk in _iter_chunks(cursor, Config.RETRAIN_CHUNK_SIZE):
+            features, targets = [], []
+            for position, event in enumerate(chunk):
+                target = total_wasted_kg(event.get('wasted_food'))
+                if target is None:
+                    continue
+                row = model_features(event.get('event_type'), event.get('expected_attendees'))
+                if (trained + position) % Config.RETRAIN_VALIDATION_EVERY == 0:
+                    validation_features.append(row)
+                    validation_targets.append(target)
+                else:
+                    features.append(row)
+                    targets.append(target)
+            if features:
+                learner.partial_fit(features, targets)
+            trained += len(chunk)
+            watermark = chunk[-1].get('updated_at', watermark)
+
+        if trained == 0:
+            return None
+
+        published = None
+        if len(validation_targets) >= Config.RETRAIN_MIN_VALIDATION_ROWS:
+            targets = np.asarray(validation_targets, dtype=float)
+            candidate_error = _mean_absolute_error(learner, validation_features, targets)
+            current_error = _mean_absolute_error(current_model, validation_features, targets)
+            print(f"Retraining: candidate MAE {candidate_error:.3f} vs {current_version} MAE {current_error:.3f}")
+            if candidate_error < current_error:
+                published = food_model_registry.publish(learner.copy())
+                print(f"Published food_model {published}")
+
+        # Once evaluated, the held-out rows are learned from as well
+        if validation_features:
+            learner.partial_fit(validation_features, validation_targets)
+
+        mongo.db.model_training_state.update_one(
+            {'_id': STATE_ID, 'lease_owner': owner},
+            {'$set': {
+                'learner': learner.to_state(),
+                'watermark': watermark,
+                'last_run_at': datetime.utcnow(),
+                'last_published': published or state.get('last_published')
+            }}
+        )
+        return published
+    finally:
+        mongo.db.model_training_state.update_one(
+            {'_id': STATE_ID, 'lease_owner': owner},
+            {'$unset': {'lease_owner': '', 'lease_until': ''}}
+        )
+
+
+def start_retraining_scheduler():
+    """Run retrain_food_model every RETRAIN_INTERVAL_MINUTES in a background thread"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(
+        retrain_food_model,
+        'interval',
+        minutes=Config.RETRAIN_INTERVAL_MINUTES,
+        id='retrain_food_model',
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.start()
+    return scheduler
@@ -1,6 +1,15 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from config import Config
+from database.db import mongo
+from utils.cache import TTLCache
+from utils.passwords import PasswordHashingBusy, hash_password, verify_password, needs_rehash
+
+# Users by id for the Flask-Login loader. Per process: other workers see an
+# update once their entry expires, so USER_CACHE_TTL bounds the staleness.
+_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
 
 class User(UserMixin):
     def __init__(self, email, name='', mobile=''):
@@ -13,10 +22,20 @@ class User(UserMixin):
         self.password_hash = None
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify a password, upgrading the stored hash if the configured policy changed"""
+        if not verify_password(self.password_hash, password):
+            return False
+        if self._id is not None and needs_rehash(self.password_hash):
+            try:
+                self.password_hash = hash_password(password)
+                User.update(self._id, {'password': self.password_hash})
+            except PasswordHashingBusy:
+                # Upgrade on a later login instead
+                pass
+        return True
 
     def get_id(self):
         return str(self._id)
@@ -37,6 +56,48 @@ class User(UserMixin):
     def is_anonymous(self):
         return False
 
+    @classmethod
+    def from_document(cls, user_data):
+        user = cls(
+            email=user_data.get('email'),
+            mobile=user_data.get('mobile'),
+            name=user_data.get('name')
+        )
+        user._id = user_data['_id']
+        user.password_hash = user_data.get('password', user_data.get('password_hash'))
+        user.is_active = user_data.get('is_active', True)
+        if user_data.get('created_at'):
+            user.created_at = user_data['created_at']
+        return user
+
+    @classmethod
+    def get(cls, user_id):
+        """Load a user by id through the per-process cache; None if unknown"""
+        key = str(user_id)
+        user = _cache.get(key)
+        if user is not None:
+            return user
+        try:
+            user_data = mongo.db.users.find_one({'_id': ObjectId(key)})
+        except InvalidId:
+            return None
+        if not user_data:
+            return None
+        user = cls.from_document(user_data)
+        _cache.set(key, user)
+        return user
+
+    @staticmethod
+    def update(user_id, fields):
+        """Update a user document and drop its cached copy"""
+        result = mongo.db.users.update_one({'_id': ObjectId(str(user_id))}, {'$set': fields})
+        invalidate_user(user_id)
+        return result
+
+    @staticmethod
+    def deactivate(user_id):
+        return User.update(user_id, {'is_active': False, 'deactivated_at': datetime.utcnow()})
+
     def to_dict(self):
         return {
             'id': str(self._id),
@@ -44,4 +105,10 @@ class User(UserMixin):
             'mobile': self.mobile,
             'name': self.name,
             'created_at': self.created_at
-        } 
\ No newline at end of file
+        } 
+
+def invalidate_user(user_id):
+    _cache.pop(str(user_id))
+
+def cache_stats():
+    return _cache.stats()
\ No newline at end of file
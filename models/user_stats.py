@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+from config import Config
+from database.db import mongo
+
+# One document per user in `user_stats`, keyed by the user id as a string:
+#   predictions/events/donations/actual_wastage: lifetime counters
+#   daily.<YYYY-MM-DD>: the same counters per day, for rolling windows
+#   recent_predictions: the latest USER_STATS_RECENT_PREDICTIONS predictions
+# Every write is a single atomic upsert, so no history is scanned on reads.
+# Day buckets follow the `created_at` of the document a write describes, the
+# same timestamp scripts/rebuild_user_stats.py buckets by, so a rebuild
+# reproduces the live rollup.
+
+def _day(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def _increment(user_id, counters, maximums=None, push=None, at=None):
+    """$inc `counters` both lifetime and in the bucket of day `at` (default today), $max `maximums`"""
+    now = datetime.utcnow()
+    day = _day(at or now)
+    inc = {}
+    for field, amount in counters.items():
+        inc[field] = amount
+        inc[f"daily.{day}.{field.replace('.', '_')}"] = amount
+
+    update = {
+        '$inc': inc,
+        '$max': {'last_activity_at': now, **(maximums or {})},
+        '$setOnInsert': {'created_at': now}
+    }
+    if push:
+        update['$push'] = push
+    try:
+        mongo.db.user_stats.update_one({'_id': str(user_id)}, update, upsert=True)
+    except Exception as e:
+        # Statistics must never fail the write they describe
+        print(f"Error updating user stats: {str(e)}")
+
+def record_prediction(user_id, event_type, attendance, estimated_wastage):
+    now = datetime.utcnow()
+    prediction = {
+        'created_at': now,
+        'event_type': event_type,
+        'attendance': attendance,
+        'estimated_wastage': estimated_wastage
+    }
+    _increment(
+        user_id,
+        {'predictions.count': 1, 'predictions.estimated_wastage': estimated_wastage},
+        maximums={'predictions.max_estimated_wastage': estimated_wastage},
+        push={'recent_predictions': {
+            '$each': [prediction],
+            '$position': 0,
+            '$slice': Config.USER_STATS_RECENT_PREDICTIONS
+        }},
+        at=now
+    )
+
+def record_event(user_id, expected_attendees, predicted_wastage, at=None):
+    _increment(user_id, {
+        'events.count': 1,
+        'events.expected_attendees': expected_attendees,
+        'events.predicted_wastage': predicted_wastage
+    }, maximums={'events.max_expected_attendees': expected_attendees}, at=at)
+
+def record_donation(user_id, plates=0, at=None):
+    """`at` is the donation's created_at, or its event's for a redistribution"""
+    _increment(user_id, {'donations.count': 1, 'donations.plates': plates}, at=at)
+
+def record_actual_wastage(user_id, wasted_kg, previous_kg=None, at=None):
+    """Count an event's actual wastage in its event's day; re-reports only add the difference"""
+    counters = {'actual_wastage.kg': wasted_kg - (previous_kg or 0)}
+    if previous_kg is None:
+        counters['actual_wastage.count'] = 1
+    _increment(user_id, counters, maximums={'actual_wastage.max_kg': wasted_kg}, at=at)
+
+def _average(total, count):
+    return total / count if count else 0
+
+def get_user_stats(user_id, window_days=None):
+    """
+    Lifetime and rolling-window statistics for a user, from one document.
+
+    Day buckets older than USER_STATS_RETENTION_DAYS are dropped while reading.
+    """
+    window_days = window_days or Config.USER_STATS_WINDOW_DAYS
+    stats = mongo.db.user_stats.find_one({'_id': str(user_id)}) or {}
+
+    predictions = stats.get('predictions', {})
+    events = stats.get('events', {})
+    donations = stats.get('donations', {})
+    actual = stats.get('actual_wastage', {})
+
+    today = datetime.utcnow()
+    window_start = _day(today - timedelta(days=window_days - 1))
+    retention_start = _day(today - timedelta(days=Config.USER_STATS_RETENTION_DAYS))
+    window = {}
+    expired = []
+    for day, counters in stats.get('daily', {}).items():
+        if day < retention_start:
+            expired.append(f"daily.{day}")
+        elif day >= window_start:
+            for field, value in counters.items():
+                window[field] = window.get(field, 0) + value
+    if expired:
+        mongo.db.user_stats.update_one({'_id': str(user_id)}, {'$unset': dict.fromkeys(expired, '')})
+
+    return {
+        'window_days': window_days,
+        'predictions': {
+            'count': predictions.get('count', 0),
+            'estimated_wastage': predictions.get('estimated_wastage', 0),
+            'average_estimated_wastage': _average(predictions.get('estimated_wastage', 0), predictions.get('count', 0)),
+            'max_estimated_wastage': predictions.get('max_estimated_wastage', 0)
+        },
+        'events': {
+            'count': events.get('count', 0),
+            'expected_attendees': events.get('expected_attendees', 0),
+            'predicted_wastage': events.get('predicted_wastage', 0),
+            'average_expected_attendees': _average(events.get('expected_attendees', 0), events.get('count', 0))
+        },
+        'donations': {
+            'count': donations.get('count', 0),
+            'plates': donations.get('plates', 0)
+        },
+        'actual_wastage': {
+            'count': actual.get('count', 0),
+            'kg': actual.get('kg', 0),
+            'average_kg': _average(actual.get('kg', 0), actual.get('count', 0)),
+            'max_kg': actual.get('max_kg', 0)
+        },
+        'window': {
+            'predictions': window.get('predictions_count', 0),
+            'estimated_wastage': window.get('predictions_estimated_wastage', 0),
+            'average_estimated_wastage': _average(window.get('predictions_estimated_wastage', 0),
+                                                  window.get('predictions_count', 0)),
+            'events': window.get('events_count', 0),
+            'donations': window.get('donations_count', 0),
+            'donated_plates': window.get('donations_plates', 0),
+            'actual_wastage_kg': window.get('actual_wastage_kg', 0)
+        },
+        'recent_predictions': stats.get('recent_predictions', []),
+        'last_activity_at': stats.get('last_activity_at')
+    }
@@ -0,0 +1,240 @@
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from config import Config
+from utils.geo import haversine_many_to_many
+
+try:
+    import fcntl
+except ImportError:  # POSIX only; elsewhere writers are only serialised within a process
+    fcntl = None
+
+# Venues are keyed at ~10 m precision, so repeat events at one venue share a row
+_VENUE_DECIMALS = 4
+_INITIAL_CAPACITY = (256, 64)
+
+
+class VenueMatrixFull(Exception):
+    """Raised when adding venues or charities would grow the matrix past VENUE_MATRIX_MAX_BYTES"""
+
+
+class VenueMatrix:
+    """
+    Venue x charity distances (km) in a float32 file every worker memory-maps.
+
+    `<name>.json` lists the venues (rows) and charities (columns) in order,
+    with the generation of the `<name>-<generation>.f32` file holding them.
+    The data file is allocated with spare rows and columns: a new venue or
+    charity is written into the spare space and then published by replacing
+    the JSON, so readers never see a cell before it is filled. When the spare
+    space runs out the next generation is allocated at double the size.
+    Writers take an exclusive lock on `<name>.lock`.
+
+    A charity that moves has its column rewritten in place; until that is
+    done readers may see some of its old distances.
+    """
+
+    def __init__(self, name='venue_matrix', directory=None, max_bytes=None):
+        self.name = name
+        self.directory = directory or Config.MODEL_DIR
+        self.max_bytes = max_bytes or Config.VENUE_MATRIX_MAX_BYTES
+        self._lock = threading.Lock()
+        self._meta = None
+        self._meta_version = None
+        self._data = None
+        self._venues = {}
+        self._charities = {}
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, f"{self.name}.json")
+
+    def data_path(self, generation):
+        return os.path.join(self.directory, f"{self.name}-{generation}.f32")
+
+    def _open(self, meta):
+        shape = (meta['row_capacity'], meta['column_capacity'])
+        return np.memmap(self.data_path(meta['generation']), dtype=np.float32, mode='r+', shape=shape)
+
+    def _use(self, meta, version):
+        if self._meta is None or meta['generation'] != self._meta['generation']:
+            self._data = self._open(meta)
+        self._meta, self._meta_version = meta, version
+        self._venues = {tuple(venue): row for row, venue in enumerate(meta['venues'])}
+        self._charities = {charity[0]: column for column, charity in enumerate(meta['charities'])}
+
+    def _refresh(self):
+        """Pick up what other workers published; callers hold self._lock"""
+        for attempt in range(2):
+            try:
+                stat = os.stat(self.meta_path)
+                # The JSON is replaced, never rewritten, so a new inode means a new version
+                version = (stat.st_ino, stat.st_mtime_ns)
+                if version != self._meta_version:
+                    with open(self.meta_path) as f:
+                        self._use(json.load(f), version)
+                return
+            except FileNotFoundError:
+                # No matrix yet, or a writer replaced its data file while we read the JSON
+                if not os.path.exists(self.meta_path):
+                    return
+                if attempt:
+                    raise
+
+    def _write_meta(self, meta):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(meta, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.meta_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        stat = os.stat(self.meta_path)
+        self._use(meta, (stat.st_ino, stat.st_mtime_ns))
+
+    def _allocate(self, meta, rows, columns):
+        """Move to a new generation that fits `rows` x `columns`"""
+        row_capacity = max(meta['row_capacity'] if meta else _INITIAL_CAPACITY[0], 1)
+        column_capacity = max(meta['column_capacity'] if meta else _INITIAL_CAPACITY[1], 1)
+        while row_capacity < rows:
+            row_capacity *= 2
+        while column_capacity < columns:
+            column_capacity *= 2
+        if row_capacity * column_capacity * 4 > self.max_bytes:
+            raise VenueMatrixFull(f"{rows} venues x {columns} charities exceeds {self.max_bytes} bytes")
+
+        generation = meta['generation'] + 1 if meta else 1
+        path = self.data_path(generation)
+        data = np.memmap(path, dtype=np.float32, mode='w+', shape=(row_capacity, column_capacity))
+        if meta:
+            used_rows, used_columns = len(meta['venues']), len(meta['charities'])
+            data[:used_rows, :used_columns] = self._data[:used_rows, :used_columns]
+        data.flush()
+        del data
+        return dict(meta or {'venues': [], 'charities': []},
+                    generation=generation, row_capacity=row_capacity, column_capacity=column_capacity)
+
+    def _extend(self, venues, charities):
+        """Add missing venues and new or moved charities; callers hold both locks"""
+        self._refresh()
+        meta = self._meta
+        known_venues = meta['venues'] if meta else []
+        known_charities = list(meta['charities']) if meta else []
+
+        new_venues = [venue for venue in dict.fromkeys(venues) if venue not in self._venues]
+        moved = {}
+        new_charities = {}
+        for charity_id, lat, lng in charities:
+            column = self._charities.get(charity_id)
+            if column is None:
+                new_charities.setdefault(charity_id, [charity_id, lat, lng])
+            elif known_charities[column][1:] != [lat, lng]:
+                moved[column] = [charity_id, lat, lng]
+        new_charities = list(new_charities.values())
+        if not (new_venues or new_charities or moved):
+            return
+
+        rows = len(known_venues) + len(new_venues)
+        columns = len(known_charities) + len(new_charities)
+        old_generation = meta['generation'] if meta else None
+        if meta is None or rows > meta['row_capacity'] or columns > meta['column_capacity']:
+            meta = self._allocate(meta, rows, columns)
+        data = self._open(meta)
+
+        for column, charity in moved.items():
+            known_charities[column] = charity
+        all_venues = [list(venue) for venue in known_venues] + [list(venue) for venue in new_venues]
+        all_charities = known_charities + new_charities
+
+        def fill(venue_slice, charity_slice):
+            block_venues, block_charities = all_venues[venue_slice], all_charities[charity_slice]
+            if block_venues and block_charities:
+                data[venue_slice, charity_slice] = haversine_many_to_many(
+                    [v[0] for v in block_venues], [v[1] for v in block_venues],
+                    [c[1] for c in block_charities], [c[2] for c in block_charities],
+                    dtype=np.float32
+                )
+
+        # New rows against every column, new columns against the old rows, moved columns in full
+        fill(slice(len(known_venues), rows), slice(0, columns))
+        fill(slice(0, len(known_venues)), slice(len(known_charities), columns))
+        for column in moved:
+            fill(slice(0, len(known_venues)), slice(column, column + 1))
+        data.flush()
+
+        self._write_meta(dict(meta, venues=all_venues, charities=all_charities))
+        if old_generation is not None and old_generation != meta['generation']:
+            # Workers still mapping it keep their pages until they move on
+            os.remove(self.data_path(old_generation))
+
+    def _is_complete(self, venues, charities):
+        if any(venue not in self._venues for venue in venues):
+            return False
+        known = self._meta['charities'] if self._meta else []
+        for charity_id, lat, lng in charities:
+            column = self._charities.get(charity_id)
+            if column is None or known[column][1:] != [lat, lng]:
+                return False
+        return True
+
+    def _locked_extend(self, venues, charities):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{self.name}.lock"), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._extend(venues, charities)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def distances(self, venues, charities):
+        """
+        (len(venues) x len(charities)) float32 km for venues as (lat, lng) and
+        charities as (id, lat, lng), adding whatever the matrix is missing.
+        """
+        venue_keys = [(round(float(lat), _VENUE_DECIMALS), round(float(lng), _VENUE_DECIMALS)) for lat, lng in venues]
+        charity_keys = [(str(charity_id), float(lat), float(lng)) for charity_id, lat, lng in charities]
+        with self._lock:
+            self._refresh()
+            if not self._is_complete(venue_keys, charity_keys):
+                self._locked_extend(venue_keys, charity_keys)
+            rows = np.array([self._venues[venue] for venue in venue_keys], dtype=np.intp)
+            columns = np.array([self._charities[c[0]] for c in charity_keys], dtype=np.intp)
+            return self._data[np.ix_(rows, columns)]
+
+    def row(self, latitude, longitude):
+        """
+        Zero-copy view of one known venue's distances to every charity, with the
+        {charity_id: column} map it is indexed by; None for an unknown venue.
+        """
+        venue = (round(float(latitude), _VENUE_DECIMALS), round(float(longitude), _VENUE_DECIMALS))
+        with self._lock:
+            self._refresh()
+            row = self._venues.get(venue)
+            if row is None:
+                return None
+            return self._data[row, :len(self._charities)], dict(self._charities)
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            if self._meta is None:
+                return {'venues': 0, 'charities': 0}
+            return {
+                'venues': len(self._venues),
+                'charities': len(self._charities),
+                'generation': self._meta['generation'],
+                'bytes': self._meta['row_capacity'] * self._meta['column_capacity'] * 4
+            }
+
+
+venue_matrix = VenueMatrix()
@@ -1,23 +1,14 @@
 from flask import Blueprint, request, jsonify, redirect, url_for, render_template, flash
-from werkzeug.security import generate_password_hash, check_password_hash
 from database.db import mongo
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime
-import json
 from bson import ObjectId
 from models.user import User
+from models.user_stats import get_user_stats
+from utils.passwords import PasswordHashingBusy
 from flask_login import login_user, logout_user, current_user, login_required
 
 auth_bp = Blueprint('auth', __name__)
 
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        if isinstance(o, datetime):
-            return o.isoformat()
-        return json.JSONEncoder.default(self, o)
-
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -70,6 +61,10 @@ def register():
             flash('Registration successful!', 'success')
             return redirect(url_for('predict.predict_page'))
             
+        except PasswordHashingBusy:
+            # Hashing is saturated; shed this request rather than tie up the worker
+            flash('Too many sign-in requests right now. Please try again in a moment.', 'error')
+            return render_template('auth/register.html'), 503
         except Exception as e:
             flash(f'An error occurred: {str(e)}', 'error')
             return render_template('auth/register.html')
@@ -102,20 +97,18 @@ def login():
                 flash('Invalid login credentials', 'error')
                 return render_template('auth/login.html')
             
-            # Create User object
-            user = User(
-                email=user_data['email'],
-                name=user_data.get('name', ''),
-                mobile=user_data.get('mobile', '')
-            )
-            user._id = user_data['_id']
-            user.password_hash = user_data['password']
+            user = User.from_document(user_data)
             
             # Verify password
             if not user.check_password(password):
                 flash('Invalid login credentials', 'error')
                 return render_template('auth/login.html')
             
+            # Deactivated accounts keep their credentials but may not sign in
+            if not user.is_active:
+                flash('This account has been deactivated', 'error')
+                return render_template('auth/login.html'), 403
+            
             # Log the user in
             login_user(user)
             
@@ -127,6 +120,10 @@ def login():
             flash('Login successful!', 'success')
             return redirect(next_page)
             
+        except PasswordHashingBusy:
+            # Hashing is saturated; shed this request rather than tie up the worker
+            flash('Too many sign-in requests right now. Please try again in a moment.', 'error')
+            return render_template('auth/login.html'), 503
         except Exception as e:
             flash(f'An error occurred: {str(e)}', 'error')
             return render_template('auth/login.html')
@@ -144,18 +141,13 @@ def logout():
 @login_required
 def get_profile():
     try:
-        # Get user's predictions
-        predictions = list(mongo.db.predictions.find({
-            'user_id': current_user._id
-        }).sort('created_at', -1).limit(10))
-
-        # Calculate average wastage
-        total_wastage = sum(p.get('estimated_wastage', 0) for p in predictions)
-        average_wastage = total_wastage / len(predictions) if predictions else 0
+        # One rollup document, however much history the user has
+        stats = get_user_stats(current_user._id)
 
         return render_template('profile.html',
-                             predictions=predictions,
-                             average_wastage=average_wastage)
+                             stats=stats,
+                             predictions=stats['recent_predictions'],
+                             average_wastage=stats['predictions']['average_estimated_wastage'])
     except Exception as e:
         flash('Error loading profile: ' + str(e), 'danger')
         return redirect(url_for('index'))
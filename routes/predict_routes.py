@@ -1,167 +1,147 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database.db import mongo
+from database.pagination import paginated_listing
 from models.event_model import Event
 from models.prediction_model import FoodWastagePrediction
-from datetime import datetime
-from math import radians, sin, cos, sqrt, atan2
+from models.charity_index import charity_index
+from models import user_stats
+from models.model_registry import food_model_registry
+from models.retraining import model_features, total_wasted_kg
+from datetime import datetime, timedelta
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import json
+import numpy as np
 import requests
 import time
 from config import Config
-from geopy.geocoders import Nominatim
+from utils.geocoding import geocode, normalize_location_query
+from utils.gazetteer import gazetteer
+from utils.cache import TTLCache
+from utils import http_client, osm_places, overpass_cache
+from utils.osm_places import element_point, place_from_tags
+from utils.geo import haversine_one_to_many, point_coordinates, as_geojson_point, to_geojson_point
 from flask_login import login_required, current_user
 
 predict_bp = Blueprint('predict', __name__)
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth's radius in kilometers
+# Shared by /predict/predict to run geocoding and the organization search off the request thread
+_pipeline_executor = ThreadPoolExecutor(max_workers=Config.PREDICT_PIPELINE_WORKERS, thread_name_prefix='predict')
 
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    distance = R * c
-
-    return distance
+# Serialized GET /find-charities responses by (normalized location, radius)
+_find_charities_cache = TTLCache(maxsize=Config.FIND_CHARITIES_CACHE_SIZE, ttl=Config.FIND_CHARITIES_CACHE_TTL)
+FIND_CHARITIES_RADIUS_KM = 20
 
 def get_coordinates_from_location(location):
-    try:
-        # Use Nominatim (OpenStreetMap) for geocoding
-        nominatim_url = "https://nominatim.openstreetmap.org/search"
-        headers = {'User-Agent': 'FoodWastageApp/1.0'}
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'in'  # Limit to India
-        }
-        
-        print(f"Making geocoding request for location: {location}")
-        response = requests.get(nominatim_url, headers=headers, params=params)
-        
-        if not response.ok:
-            print(f"Geocoding request failed with status {response.status_code}")
-            return None, None
-            
-        data = response.json()
-        print(f"Geocoding response: {data}")
+    # Nominatim lookups are cached and coalesced in utils.geocoding
+    return geocode(location, countrycodes='in')
+
+def fetch_places_overpass(latitude, longitude, radius_km):
+    """Run the live Overpass query and parse every matching place with its coordinates"""
+    # Convert radius to meters
+    radius_m = radius_km * 1000
+    
+    # Overpass API query to find charities, NGOs, and old age homes
+    overpass_url = "https://overpass-api.de/api/interpreter"
+    
+    # Query for amenities that could be charities or old age homes
+    query = f"""
+    [out:json][timeout:25];
+    (
+      // Old age homes and nursing homes
+      node["social_facility"~"nursing_home|group_home|shelter|elderly_nursing_home"](around:{radius_m},{latitude},{longitude});
+      way["social_facility"~"nursing_home|group_home|shelter|elderly_nursing_home"](around:{radius_m},{latitude},{longitude});
+      
+      // Social facilities and centers
+      node["amenity"~"social_facility|social_centre|community_centre"](around:{radius_m},{latitude},{longitude});
+      way["amenity"~"social_facility|social_centre|community_centre"](around:{radius_m},{latitude},{longitude});
+      
+      // NGOs and charities
+      node["office"~"ngo|charity"](around:{radius_m},{latitude},{longitude});
+      way["office"~"ngo|charity"](around:{radius_m},{latitude},{longitude});
+      
+      // Additional social services
+      node["social_facility"="food_bank"](around:{radius_m},{latitude},{longitude});
+      way["social_facility"="food_bank"](around:{radius_m},{latitude},{longitude});
+    );
+    out center;
+    """
+    
+    print(f"Searching for places near {latitude}, {longitude}")
+    response = http_client.post('overpass', overpass_url, data=query, dedupe=True)
+    
+    if not response.ok:
+        # Raise instead of returning [] so a failed lookup is never cached
+        raise requests.HTTPError(f"Overpass request failed with status {response.status_code}")
         
-        if data and len(data) > 0:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            print(f"Found coordinates: {lat}, {lon}")
-            return lat, lon
-        else:
-            print("No results found for this location")
-            return None, None
-            
-    except Exception as e:
-        print(f"Error getting coordinates: {str(e)}")
-        return None, None
+    data = response.json()
+    print(f"Found {len(data.get('elements', []))} elements")
+    
+    elements = data.get('elements', [])
+    # Ways carry a `center`; responses that list member nodes instead resolve through them
+    nodes = {e['id']: (e['lat'], e['lon']) for e in elements if e.get('type') == 'node' and 'lat' in e}
+    
+    places = []
+    seen_places = set()
+    
+    for element in elements:
+        # Untagged elements are member nodes, not places
+        if element.get('type') in ['node', 'way'] and element.get('tags'):
+            place_id = (element['type'], element.get('id'))
+            if place_id not in seen_places:
+                point = element_point(element, nodes)
+                if point is None:
+                    continue
+                seen_places.add(place_id)
+                places.append(place_from_tags(element['tags'], point[0], point[1]))
+    
+    return places
 
 def search_places_overpass(latitude, longitude, radius_km):
+    """Places within `radius_km`, or [] when the lookup fails"""
     try:
-        # Convert radius to meters
-        radius_m = radius_km * 1000
-        
-        # Overpass API query to find charities, NGOs, and old age homes
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        
-        # Query for amenities that could be charities or old age homes
-        query = f"""
-        [out:json][timeout:25];
-        (
-          // Old age homes and nursing homes
-          node["social_facility"~"nursing_home|group_home|shelter|elderly_nursing_home"](around:{radius_m},{latitude},{longitude});
-          way["social_facility"~"nursing_home|group_home|shelter|elderly_nursing_home"](around:{radius_m},{latitude},{longitude});
-          
-          // Social facilities and centers
-          node["amenity"~"social_facility|social_centre|community_centre"](around:{radius_m},{latitude},{longitude});
-          way["amenity"~"social_facility|social_centre|community_centre"](around:{radius_m},{latitude},{longitude});
-          
-          // NGOs and charities
-          node["office"~"ngo|charity"](around:{radius_m},{latitude},{longitude});
-          way["office"~"ngo|charity"](around:{radius_m},{latitude},{longitude});
-          
-          // Additional social services
-          node["social_facility"="food_bank"](around:{radius_m},{latitude},{longitude});
-          way["social_facility"="food_bank"](around:{radius_m},{latitude},{longitude});
-        );
-        out body;
-        >;
-        out skel qt;
-        """
-        
-        print(f"Searching for places near {latitude}, {longitude}")
-        response = requests.post(overpass_url, data=query)
-        
-        if not response.ok:
-            print(f"Overpass request failed with status {response.status_code}")
-            return []
-            
-        data = response.json()
-        print(f"Found {len(data.get('elements', []))} elements")
-        
-        places = []
-        seen_places = set()
-        
-        for element in data.get('elements', []):
-            if element.get('type') in ['node', 'way']:
-                place_id = element.get('id')
-                if place_id not in seen_places:
-                    seen_places.add(place_id)
-                    
-                    tags = element.get('tags', {})
-                    place_lat = element.get('lat', latitude)
-                    place_lon = element.get('lon', longitude)
-                    
-                    # Calculate distance
-                    distance = haversine_distance(
-                        latitude, longitude,
-                        place_lat, place_lon
-                    )
-                    
-                    if distance <= radius_km:
-                        # Get a better name for the type
-                        place_type = tags.get('social_facility', 
-                                    tags.get('amenity',
-                                    tags.get('office', 'NGO/Charity')))
-                        
-                        # Clean up the type name
-                        place_type = place_type.replace('_', ' ').title()
-                        
-                        # Get the best available address
-                        address_parts = []
-                        if tags.get('addr:street'):
-                            address_parts.append(tags.get('addr:street'))
-                        if tags.get('addr:housenumber'):
-                            address_parts.append(tags.get('addr:housenumber'))
-                        if tags.get('addr:city'):
-                            address_parts.append(tags.get('addr:city'))
-                        if not address_parts and tags.get('addr:full'):
-                            address_parts.append(tags.get('addr:full'))
-                        
-                        address = ', '.join(address_parts) if address_parts else 'Address not available'
-                        
-                        place_data = {
-                            'name': tags.get('name', 'Unnamed Place'),
-                            'address': address,
-                            'phone': tags.get('phone', tags.get('contact:phone', 'Phone not available')),
-                            'website': tags.get('website', tags.get('contact:website', '')),
-                            'type': place_type,
-                            'distance': round(distance, 1)
-                        }
-                        places.append(place_data)
-        
-        print(f"Returning {len(places)} places within {radius_km}km")
-        return places
-        
+        return _search_places(latitude, longitude, radius_km)
     except Exception as e:
         print(f"Error searching places: {str(e)}")
         return []
 
+def _search_places(latitude, longitude, radius_km):
+    """Places within `radius_km` with their distance; Overpass and cache errors propagate"""
+    # Served from the imported OSM extract when it covers the area, otherwise
+    # from the tile cache when a nearby search already covered it
+    candidates = osm_places.local_candidates(latitude, longitude, radius_km)
+    if candidates is None:
+        candidates = overpass_cache.get_candidate_places(
+            latitude, longitude, radius_km, fetch=fetch_places_overpass
+        )
+    
+    if not candidates:
+        return []
+    
+    # Calculate all distances in one vectorized pass
+    distances = haversine_one_to_many(
+        latitude, longitude,
+        [candidate['latitude'] for candidate in candidates],
+        [candidate['longitude'] for candidate in candidates]
+    )
+    
+    places = []
+    for index in np.flatnonzero(distances <= radius_km):
+        candidate = candidates[index]
+        place_data = {
+            'name': candidate['name'],
+            'address': candidate['address'],
+            'phone': candidate['phone'],
+            'website': candidate['website'],
+            'type': candidate['type'],
+            'distance': round(float(distances[index]), 1)
+        }
+        places.append(place_data)
+    
+    print(f"Returning {len(places)} places within {radius_km}km")
+    return places
+
 def predict_wastage(event_type, expected_attendees, actual_attendees):
     # Base wastage rates per person (in grams)
     base_rates = {
@@ -254,9 +234,36 @@ def get_default_organizations(latitude, longitude):
         ]
     }
 
+def find_nearby_organizations(latitude, longitude, radius_km=5):
+    """Group nearby places into NGOs, charities and old age homes"""
+    nearby = search_places_overpass(latitude, longitude, radius_km=radius_km)
+    if not nearby:
+        raise Exception("No organizations found")
+        
+    organizations = {
+        'ngos': [],
+        'charities': [],
+        'old_age_homes': []
+    }
+    
+    for place in nearby:
+        if 'ngo' in place['type'].lower():
+            organizations['ngos'].append(place)
+        elif 'charity' in place['type'].lower():
+            organizations['charities'].append(place)
+        elif 'home' in place['type'].lower() or 'elderly' in place['type'].lower():
+            organizations['old_age_homes'].append(place)
+    return organizations
+
+def _remaining_budget(deadline):
+    return max(deadline - time.monotonic(), 0)
+
 @predict_bp.route('/predict', methods=['POST'])
 @login_required
 def predict():
+    # Steps that miss the overall budget fall back to default organizations. Their
+    # futures keep running in the background and still warm the geocode/Overpass caches.
+    deadline = time.monotonic() + Config.PREDICT_LATENCY_BUDGET
     try:
         data = request.get_json()
         
@@ -270,53 +277,61 @@ def predict():
         if not all([event_type, plates, location]):
             return jsonify({'error': 'Missing required fields'}), 400
             
-        # Get coordinates based on location type
         try:
+            # Start the slow lookups first so the wastage estimate overlaps with them
             if 'latitude' in location and 'longitude' in location:
                 # Using current location
                 latitude = float(location['latitude'])
                 longitude = float(location['longitude'])
+                coords_future = None
+                organizations_future = _pipeline_executor.submit(find_nearby_organizations, latitude, longitude)
             else:
                 # Using manual location
                 location_str = f"{location.get('city', '')}, {location.get('state', '')}, {location.get('country', 'India')}"
-                coords = get_coordinates_from_location(location_str)
-                if not coords:
-                    return jsonify({'error': 'Could not find coordinates for the given location'}), 400
-                latitude, longitude = coords
+                coords_future = _pipeline_executor.submit(get_coordinates_from_location, location_str)
+                organizations_future = None
                 
             # Calculate food wastage prediction
             wastage_percentage = calculate_wastage_percentage(event_type)
             estimated_wastage = round(plates * wastage_percentage)
             recommended_plates = plates - estimated_wastage
+            wastage_kg, model_version = model_wastage_kg([(event_type, plates)])
             
-            # Try to get organizations from API, fallback to default if fails
-            try:
-                nearby = search_places_overpass(latitude, longitude, radius_km=5)
-                if not nearby:
-                    raise Exception("No organizations found")
-                    
-                organizations = {
-                    'ngos': [],
-                    'charities': [],
-                    'old_age_homes': []
-                }
-                
-                for place in nearby:
-                    if 'ngo' in place['type'].lower():
-                        organizations['ngos'].append(place)
-                    elif 'charity' in place['type'].lower():
-                        organizations['charities'].append(place)
-                    elif 'home' in place['type'].lower() or 'elderly' in place['type'].lower():
-                        organizations['old_age_homes'].append(place)
-            except Exception as e:
-                print(f"Error fetching organizations: {str(e)}")
+            if coords_future is not None:
+                try:
+                    latitude, longitude = coords_future.result(timeout=_remaining_budget(deadline))
+                except FuturesTimeoutError:
+                    print("Geocoding missed the latency budget")
+                    latitude, longitude = None, None
+                else:
+                    if latitude is None or longitude is None:
+                        return jsonify({'error': 'Could not find coordinates for the given location'}), 400
+                    organizations_future = _pipeline_executor.submit(find_nearby_organizations, latitude, longitude)
+            
+            # Try to get organizations from API, fallback to default if fails or runs out of time
+            organizations = None
+            if organizations_future is not None:
+                try:
+                    organizations = organizations_future.result(timeout=_remaining_budget(deadline))
+                except FuturesTimeoutError:
+                    print("Organization search missed the latency budget")
+                except Exception as e:
+                    print(f"Error fetching organizations: {str(e)}")
+            
+            live_data = organizations is not None
+            if not live_data:
                 organizations = get_default_organizations(latitude, longitude)
             
+            user_stats.record_prediction(current_user._id, event_type, plates, estimated_wastage)
+            
             return jsonify({
                 'recommended_plates': recommended_plates,
                 'estimated_wastage': estimated_wastage,
+                'estimated_wastage_kg': wastage_kg[0] if wastage_kg else None,
+                'model_version': model_version,
                 'nearby_organizations': organizations,
-                'message': 'Using default organizations as live data could not be fetched' if not nearby else None
+                'location': {'latitude': latitude, 'longitude': longitude},
+                'message': 'Using default organizations as live data could not be fetched' if not live_data else None
             })
             
         except Exception as e:
@@ -325,16 +340,159 @@ def predict():
     except Exception as e:
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+# Expected wastage percentage per event type
+WASTAGE_RATES = {
+    'Wedding': 0.15,  # 15% wastage
+    'Corporate': 0.10,  # 10% wastage
+    'Birthday': 0.08,  # 8% wastage
+    'Festival': 0.20,  # 20% wastage
+    'Other': 0.12  # 12% wastage
+}
+
 def calculate_wastage_percentage(event_type):
     """Calculate the expected wastage percentage based on event type."""
-    wastage_rates = {
-        'Wedding': 0.15,  # 15% wastage
-        'Corporate': 0.10,  # 10% wastage
-        'Birthday': 0.08,  # 8% wastage
-        'Festival': 0.20,  # 20% wastage
-        'Other': 0.12  # 12% wastage
-    }
-    return wastage_rates.get(event_type, wastage_rates['Other'])
+    return WASTAGE_RATES.get(event_type, WASTAGE_RATES['Other'])
+
+def model_wastage_kg(rows):
+    """
+    Wastage in kg for [(event_type, attendees)] from the active food model, and
+    that model's version. Follows publish()/activate() in the registry without
+    a restart; (None, None) when no model can be loaded.
+    """
+    try:
+        version, model = food_model_registry.get()
+        predicted = model.predict([model_features(event_type, attendees) for event_type, attendees in rows])
+    except Exception as e:
+        print(f"Food model unavailable: {str(e)}")
+        return None, None
+    # A linear fit can dip below zero for tiny events
+    return [round(max(float(kg), 0.0), 2) for kg in predicted], version
+
+def _validate_batch_event(event):
+    """Return an error message for a malformed batch entry, or None"""
+    if not isinstance(event, dict):
+        return 'Event must be an object'
+    if not isinstance(event.get('event_type'), str):
+        return 'Missing event_type'
+    if 'plates' not in event and 'food_items' not in event:
+        return 'Provide plates and/or food_items'
+    plates = event.get('plates')
+    if 'plates' in event and (isinstance(plates, bool) or not isinstance(plates, (int, float)) or plates < 0):
+        return 'plates must be a non-negative number'
+    food_items = event.get('food_items', [])
+    if not isinstance(food_items, list) or not all(_is_valid_food_item(item) for item in food_items):
+        return 'food_items must be a list of items with a name, a numeric quantity and a non-zero serving_size'
+    return None
+
+def _is_valid_food_item(item):
+    if not isinstance(item, dict) or 'name' not in item:
+        return False
+    quantity = item.get('quantity', 0)
+    serving_size = item.get('serving_size', 1)
+    return (isinstance(quantity, (int, float)) and isinstance(serving_size, (int, float))
+            and not isinstance(quantity, bool) and not isinstance(serving_size, bool) and serving_size != 0)
+
+def score_events_batch(events):
+    """
+    Score a chunk of events in one vectorized pass.
+
+    Returns one result dict per event, in input order. Plate estimates use
+    calculate_wastage_percentage's rates as a lookup array, with the food
+    model's kg estimate from one predict call for the chunk, and food items go
+    through FoodWastagePrediction.predict_wastage_batch.
+    """
+    results = [{'index': index} for index, _ in events]
+    valid = []
+    for position, (_, event) in enumerate(events):
+        error = _validate_batch_event(event)
+        if error:
+            results[position]['error'] = error
+        else:
+            valid.append(position)
+    
+    with_plates = [position for position in valid if 'plates' in events[position][1]]
+    if with_plates:
+        event_types = list(WASTAGE_RATES)
+        rates = np.array([WASTAGE_RATES[event_type] for event_type in event_types])
+        type_codes = {event_type: code for code, event_type in enumerate(event_types)}
+        codes = np.array([type_codes.get(events[position][1]['event_type'], type_codes['Other'])
+                          for position in with_plates], dtype=np.intp)
+        plates = np.array([events[position][1]['plates'] for position in with_plates], dtype=float)
+        
+        estimated = np.round(plates * rates[codes])
+        recommended = plates - estimated
+        wastage_kg, model_version = model_wastage_kg(
+            [(events[position][1]['event_type'], events[position][1]['plates']) for position in with_plates]
+        )
+        for offset, (position, wastage, recommendation) in enumerate(zip(with_plates, estimated.tolist(), recommended.tolist())):
+            results[position]['estimated_wastage'] = int(wastage)
+            if wastage_kg is not None:
+                results[position]['estimated_wastage_kg'] = wastage_kg[offset]
+                results[position]['model_version'] = model_version
+            # Match /predict/predict, which keeps integer plate counts integral
+            if isinstance(events[position][1]['plates'], int):
+                recommendation = int(recommendation)
+            results[position]['recommended_plates'] = recommendation
+    
+    with_items = [position for position in valid if events[position][1].get('food_items')]
+    if with_items:
+        predictions = FoodWastagePrediction.predict_wastage_batch(
+            [(events[position][1]['event_type'], events[position][1]['food_items']) for position in with_items]
+        )
+        for position, wastage_predictions in zip(with_items, predictions):
+            results[position]['wastage_predictions'] = wastage_predictions
+    
+    return results
+
+def _iter_batch_events():
+    """Yield (index, event) from a JSON array, {"events": [...]} or an NDJSON body"""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            yield index, event
+            index += 1
+        return
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of events, {"events": [...]} or an NDJSON body')
+    yield from enumerate(data)
+
+@predict_bp.route('/predict-batch', methods=['POST'])
+@login_required
+def predict_batch():
+    """Score many events in one request, streaming NDJSON results back in input order"""
+    events = _iter_batch_events()
+    try:
+        first = next(events, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if first is None:
+        return jsonify({'error': 'No events provided'}), 400
+    
+    def generate():
+        chunk = [first]
+        for index, event in events:
+            if index >= Config.PREDICT_BATCH_MAX_EVENTS:
+                yield json.dumps({'index': index, 'error': f'Batch limit of {Config.PREDICT_BATCH_MAX_EVENTS} events reached'}) + '\n'
+                return
+            chunk.append((index, event))
+            if len(chunk) >= Config.PREDICT_BATCH_CHUNK_SIZE:
+                yield ''.join(json.dumps(result) + '\n' for result in score_events_batch(chunk))
+                chunk = []
+        if chunk:
+            yield ''.join(json.dumps(result) + '\n' for result in score_events_batch(chunk))
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @predict_bp.route('/create-event', methods=['POST'])
 @jwt_required()
@@ -354,13 +512,18 @@ def create_event():
         'event_name': data['event_name'],
         'event_type': data['event_type'],
         'date': data['date'],
-        'location': data['location'],
         'expected_attendees': data['expected_attendees'],
         'food_items': data['food_items'],
         'status': 'pending',
         'created_at': datetime.utcnow()
     }
     
+    # `location` is 2dsphere-indexed, so only GeoJSON goes there; plain addresses are kept separately
+    if point_coordinates(data['location']):
+        event_data['location'] = as_geojson_point(data['location'])
+    else:
+        event_data['address'] = data['location']
+    
     # Get wastage predictions
     predictor = FoodWastagePrediction(
         event_type=data['event_type'],
@@ -370,10 +533,23 @@ def create_event():
     predictions = predictor.predict_wastage()
     event_data['wastage_predictions'] = predictions
     
+    # The registry's model; retraining learns from how far this was off
+    wastage_kg, model_version = model_wastage_kg([(data['event_type'], data['expected_attendees'])])
+    if wastage_kg is not None:
+        event_data['predicted_wastage_kg'] = wastage_kg[0]
+        event_data['model_version'] = model_version
+    
     # Save event to database
     result = mongo.db.events.insert_one(event_data)
     event_data['_id'] = result.inserted_id
     
+    user_stats.record_event(
+        event_data['user_id'],
+        data['expected_attendees'],
+        sum(item['predicted_wastage'] for item in predictions.values()),
+        at=event_data['created_at']
+    )
+    
     return jsonify({
         'message': 'Event created successfully',
         'event': event_data
@@ -389,8 +565,8 @@ def update_actual_wastage(event_id):
     if 'wasted_food' not in data:
         return jsonify({'error': 'Missing wasted food data'}), 400
         
-    # Update event with actual wastage
-    result = mongo.db.events.update_one(
+    # Update event with actual wastage; the previous value keeps the user's totals exact on re-reports
+    previous = mongo.db.events.find_one_and_update(
         {'_id': event_id},
         {
             '$set': {
@@ -398,11 +574,17 @@ def update_actual_wastage(event_id):
                 'status': 'completed',
                 'updated_at': datetime.utcnow()
             }
-        }
+        },
+        projection={'user_id': 1, 'wasted_food': 1, 'created_at': 1}
     )
     
-    if result.modified_count == 0:
+    if previous is None:
         return jsonify({'error': 'Event not found'}), 404
+    
+    wasted_kg = total_wasted_kg(data['wasted_food'])
+    if wasted_kg is not None and previous.get('user_id'):
+        previous_kg = total_wasted_kg(previous['wasted_food']) if 'wasted_food' in previous else None
+        user_stats.record_actual_wastage(previous['user_id'], wasted_kg, previous_kg, at=previous.get('created_at'))
         
     return jsonify({
         'message': 'Actual wastage updated successfully'
@@ -421,13 +603,9 @@ def get_event(event_id):
 @predict_bp.route('/events', methods=['GET'])
 @jwt_required()
 def get_user_events():
-    """Get all events for the current user"""
+    """Get the current user's events, newest first, one page at a time"""
     user_id = get_jwt_identity()
-    events = list(mongo.db.events.find({'user_id': user_id}))
-    
-    return jsonify({
-        'events': events
-    })
+    return paginated_listing(mongo.db.events, {'user_id': user_id}, 'events')
 
 @predict_bp.route('/add-charity', methods=['POST'])
 def add_charity():
@@ -439,17 +617,23 @@ def add_charity():
             return jsonify({'error': 'Missing required fields'}), 400
         
         # Add charity to database
-        result = mongo.db.charities.insert_one({
+        charity_data = {
             'name': data['name'],
             'address': data['address'],
             'phone': data['phone'],
             'email': data['email'],
             'latitude': float(data['latitude']),
             'longitude': float(data['longitude']),
+            'location': to_geojson_point(data['latitude'], data['longitude']),
             'capacity': int(data['capacity']),
             'rating': float(data.get('rating', 5.0)),
             'created_at': datetime.utcnow()
-        })
+        }
+        result = mongo.db.charities.insert_one(charity_data)
+        
+        # New charities are unverified, so this only records the sync watermark; they
+        # join the index once verification sets `verified` and bumps `updated_at`
+        charity_index.upsert(charity_data)
         
         return jsonify({
             'message': 'Charity added successfully',
@@ -460,53 +644,138 @@ def add_charity():
         print(f"Add charity error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _search_radius(value):
+    """Radius in km from a request, defaulting to FIND_CHARITIES_RADIUS_KM; raises ValueError"""
+    if value is None or value == '':
+        return FIND_CHARITIES_RADIUS_KM
+    radius = float(value)
+    if not 0 < radius <= Config.MAX_SEARCH_RADIUS_KM:
+        raise ValueError(f'radius must be between 0 and {Config.MAX_SEARCH_RADIUS_KM:g} km')
+    return radius
+
+def _charities_near(latitude, longitude, radius_km):
+    """
+    Nearby places as the /find-charities body. A failed lookup is answered
+    with `degraded: true` and no places, which callers must not cache.
+    """
+    try:
+        # Search for places using OpenStreetMap
+        places = _search_places(latitude, longitude, radius_km)
+    except Exception as e:
+        print(f"Error searching places: {str(e)}")
+        return {
+            'charities': [],
+            'degraded': True,
+            'message': 'Place search is unavailable right now, please try again shortly'
+        }
+    
+    # Sort by distance
+    places.sort(key=lambda x: x['distance'])
+    
+    return {
+        'charities': places,
+        'degraded': False,
+        'message': f'Found {len(places)} places within {radius_km:g}km'
+    }
+
+def _cacheable_json(body):
+    """A JSON response with a strong ETag, answering 304 when If-None-Match matches"""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.sha256(body).hexdigest()[:32])
+    response.headers['Cache-Control'] = f'public, max-age={Config.FIND_CHARITIES_MAX_AGE}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response.make_conditional(request)
+
 @predict_bp.route('/find-charities', methods=['GET', 'POST'])
 def find_charities():
     try:
-        max_distance = 20  # Maximum distance in kilometers
-        
         if request.method == 'GET':
             location = request.args.get('location')
             if not location:
                 return jsonify({'error': 'Location is required'}), 400
+            try:
+                radius_km = _search_radius(request.args.get('radius'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            print(f"Searching for location: {location}")    
-            latitude, longitude = get_coordinates_from_location(location)
-            
-            if not latitude or not longitude:
-                return jsonify({
-                    'error': 'Could not find coordinates for the given location',
-                    'possible_reasons': [
-                        'Location not found',
-                        'Invalid location name',
-                        'Network error'
-                    ]
-                }), 400
+            # Repeat lookups are served from the response cache and mostly end in a 304
+            cache_key = (normalize_location_query(location), round(radius_km, 1))
+            body = _find_charities_cache.get(cache_key)
+            if body is None:
+                print(f"Searching for location: {location}")    
+                latitude, longitude = get_coordinates_from_location(location)
                 
-            print(f"Found coordinates: {latitude}, {longitude}")
-        else:
-            data = request.get_json()
-            if not data or 'latitude' not in data or 'longitude' not in data:
-                return jsonify({'error': 'Coordinates are required'}), 400
+                if not latitude or not longitude:
+                    return jsonify({
+                        'error': 'Could not find coordinates for the given location',
+                        'possible_reasons': [
+                            'Location not found',
+                            'Invalid location name',
+                            'Network error'
+                        ]
+                    }), 400
+                    
+                print(f"Found coordinates: {latitude}, {longitude}")
+                result = _charities_near(latitude, longitude, radius_km)
+                if result['degraded']:
+                    # Never cached anywhere, so the next request retries the lookup
+                    response = jsonify(result)
+                    response.headers['Cache-Control'] = 'no-store'
+                    return response
+                body = jsonify(result).get_data()
+                if Config.FIND_CHARITIES_CACHE_TTL > 0:
+                    _find_charities_cache.set(cache_key, body)
             
-            latitude = float(data['latitude'])
-            longitude = float(data['longitude'])
+            return _cacheable_json(body)
         
-        # Search for places using OpenStreetMap
-        places = search_places_overpass(latitude, longitude, max_distance)
+        data = request.get_json()
+        if not data or 'latitude' not in data or 'longitude' not in data:
+            return jsonify({'error': 'Coordinates are required'}), 400
+        try:
+            radius_km = _search_radius(data.get('radius'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Sort by distance
-        places.sort(key=lambda x: x['distance'])
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
         
-        return jsonify({
-            'charities': places,
-            'message': f'Found {len(places)} places within {max_distance}km'
-        }), 200
+        return jsonify(_charities_near(latitude, longitude, radius_km)), 200
         
     except Exception as e:
         print(f"Find charities error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@predict_bp.route('/autocomplete-location', methods=['GET'])
+def autocomplete_location():
+    """Place names starting with `q`, most populous first, from the local gazetteer"""
+    prefix = request.args.get('q', '')
+    if len(prefix.strip()) < 2:
+        return jsonify({'suggestions': []})
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    response = jsonify({'suggestions': gazetteer.suggest(prefix, limit)})
+    response.headers['Cache-Control'] = f'public, max-age={Config.FIND_CHARITIES_MAX_AGE}'
+    return response
+
+def _pickup_window(pickup_time):
+    """
+    UTC window for a local 'HH:MM' pickup time: the next time that clock time
+    comes round, plus PICKUP_WINDOW_MINUTES. None when the time can't be read.
+    """
+    try:
+        hours, minutes = (int(part) for part in str(pickup_time).split(':')[:2])
+        offset = timedelta(minutes=Config.PICKUP_UTC_OFFSET_MINUTES)
+        local_now = datetime.utcnow() + offset
+        local_start = local_now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    except ValueError:
+        return None
+    if local_start < local_now:
+        local_start += timedelta(days=1)
+    start = local_start - offset
+    return {'start': start, 'end': start + timedelta(minutes=Config.PICKUP_WINDOW_MINUTES)}
+
 @predict_bp.route('/confirm-donation', methods=['POST'])
 @login_required
 def confirm_donation():
@@ -536,8 +805,17 @@ def confirm_donation():
             'created_at': datetime.utcnow()
         }
         
+        # Where and when to collect, for the pickup route planner
+        coords = point_coordinates(data.get('pickupLocation'))
+        if coords is not None:
+            donation['pickup_location'] = to_geojson_point(*coords)
+        pickup_window = _pickup_window(data['pickupTime'])
+        if pickup_window is not None:
+            donation['pickup_window'] = pickup_window
+        
         # Save to database
         result = mongo.db.donations.insert_one(donation)
+        user_stats.record_donation(current_user._id, donation['plate_count'], at=donation['created_at'])
         
         # In a real application, you would send notifications here
         # For now, we'll just return a success message
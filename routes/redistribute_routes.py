@@ -3,53 +3,26 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from database.db import mongo
 from models.event_model import Event
 from models.charity_model import Charity
-from datetime import datetime
-import requests
-from math import radians, sin, cos, sqrt, atan2
+from models.charity_index import charity_index
+from database.loaders import identity_map, attach_charities
+from database.pagination import paginated_listing
+from models import user_stats
+from models.assignment import plan_assignments
+from models.pickup_routes import plan_pickup_routes
+from models.venue_matrix import venue_matrix, VenueMatrixFull
+from models.retraining import total_wasted_kg
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from config import Config
+from utils.geocoding import geocode
+from utils.geo import point_coordinates
 
 redistribute_bp = Blueprint('redistribute', __name__)
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate the great circle distance between two points on the earth"""
-    R = 6371  # Earth's radius in kilometers
-
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    distance = R * c
-
-    return distance
-
 def get_coordinates_from_location(location):
     """Get coordinates from location name using Nominatim"""
-    try:
-        nominatim_url = "https://nominatim.openstreetmap.org/search"
-        headers = {'User-Agent': 'FoodWastageApp/1.0'}
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1
-        }
-        
-        response = requests.get(nominatim_url, headers=headers, params=params)
-        
-        if not response.ok:
-            return None, None
-            
-        data = response.json()
-        
-        if data and len(data) > 0:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            return lat, lon
-        return None, None
-            
-    except Exception as e:
-        print(f"Error getting coordinates: {str(e)}")
-        return None, None
+    return geocode(location)
 
 @redistribute_bp.route('/', methods=['GET'])
 def get_locations():
@@ -66,11 +39,12 @@ def select_charity():
     if not all(k in data for k in ['charity_id', 'event_id']):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    event = Event.find_by_id(data['event_id'])
+    loader = identity_map()
+    event = loader.load('events', data['event_id'])
     if not event:
         return jsonify({'error': 'Event not found'}), 404
     
-    charity = Charity.find_by_id(data['charity_id'])
+    charity = loader.load('charities', data['charity_id'])
     if not charity:
         return jsonify({'error': 'Charity not found'}), 404
     
@@ -91,6 +65,8 @@ def select_charity():
         {'_id': charity['_id']},
         {'$inc': {'total_donations': 1}}
     )
+    loader.forget('events', event['_id'])
+    loader.forget('charities', charity['_id'])
     
     return jsonify({
         'message': 'Charity assigned successfully',
@@ -102,30 +78,39 @@ def select_charity():
 @jwt_required()
 def get_my_donations():
     user_id = get_jwt_identity()
-    events = Event.find_by_user_id(user_id)
-    
-    # Get charity details for each event
-    for event in events:
-        if 'charity_id' in event:
-            charity = Charity.find_by_id(event['charity_id'])
-            if charity:
-                event['charity'] = charity
-    
-    return jsonify({
-        'donations': events
-    }), 200
+    # Charity details for each page come from a single $in query
+    return paginated_listing(
+        mongo.db.events,
+        {'user_id': user_id},
+        'donations',
+        transform=attach_charities,
+        always_include=['charity_id']
+    )
+
+def _charity_share(charity_id, event):
+    """The part of an assigned event's surplus that goes to `charity_id`"""
+    if event.get('assignments'):
+        return sum(share.get('quantity', 0) for share in event['assignments']
+                   if str(share.get('charity_id')) == charity_id)
+    return _event_surplus(event)
 
 @redistribute_bp.route('/charity-donations/<charity_id>', methods=['GET'])
 @jwt_required()
 def get_charity_donations(charity_id):
-    events = list(mongo.db.events.find({
-        'charity_id': charity_id,
-        'status': 'assigned'
-    }))
+    """Assigned events with a share for the charity, each with `share_quantity`"""
+    def attach_shares(events):
+        for event in events:
+            event['share_quantity'] = _charity_share(charity_id, event)
+        return events
     
-    return jsonify({
-        'donations': events
-    }), 200
+    # A split plan names only its largest recipient in charity_id; the others are in assignments
+    return paginated_listing(
+        mongo.db.events,
+        {'status': 'assigned', '$or': [{'charity_id': charity_id}, {'assignments.charity_id': charity_id}]},
+        'donations',
+        transform=attach_shares,
+        always_include=['charity_id', 'assignments', 'wasted_food', 'wastage_predictions']
+    )
 
 @redistribute_bp.route('/suggest-locations', methods=['POST'])
 @jwt_required()
@@ -158,8 +143,9 @@ def confirm_redistribution():
     food_items = data.get('food_items', [])
     
     # Validate event and charity
-    event_data = mongo.db.events.find_one({'_id': event_id})
-    charity_data = mongo.db.charities.find_one({'_id': charity_id})
+    loader = identity_map()
+    event_data = loader.load('events', event_id)
+    charity_data = loader.load('charities', charity_id)
     
     if not event_data or not charity_data:
         return jsonify({'error': 'Invalid event or charity ID'}), 404
@@ -182,7 +168,7 @@ def confirm_redistribution():
     
     # Update event status
     mongo.db.events.update_one(
-        {'_id': event_id},
+        {'_id': event_data['_id']},
         {
             '$set': {
                 'status': 'redistribution_pending',
@@ -190,6 +176,10 @@ def confirm_redistribution():
             }
         }
     )
+    loader.forget('events', event_data['_id'])
+    if event_data.get('user_id'):
+        # Bucketed by the event, as the stats rebuild counts it
+        user_stats.record_donation(event_data['user_id'], at=event_data.get('created_at'))
     
     # Notify charity (implement notification logic here)
     
@@ -208,33 +198,276 @@ def track_redistribution(redistribution_id):
         
     return jsonify(redistribution)
 
+def _event_surplus(event):
+    """Surplus to redistribute: the recorded wastage when known, otherwise the predicted wastage"""
+    wasted = total_wasted_kg(event.get('wasted_food'))
+    if wasted is not None:
+        return wasted
+    return sum(p.get('predicted_wastage', 0) for p in (event.get('wastage_predictions') or {}).values())
+
+def _charity_capacity(charity):
+    capacity = charity.capacity
+    if isinstance(capacity, bool) or not isinstance(capacity, (int, float)):
+        return 0
+    return capacity
+
+def _open_commitments(charity_ids, exclude_event_ids):
+    """Surplus already assigned to each charity (by str id) and not yet delivered"""
+    committed = defaultdict(float)
+    if not charity_ids:
+        return committed
+    events = mongo.db.events.find(
+        {
+            'status': 'assigned',
+            '_id': {'$nin': list(exclude_event_ids)},
+            '$or': [
+                {'charity_id': {'$in': charity_ids}},
+                {'assignments.charity_id': {'$in': charity_ids}}
+            ]
+        },
+        {'charity_id': 1, 'assignments': 1, 'wasted_food': 1, 'wastage_predictions': 1}
+    )
+    for event in events:
+        if event.get('assignments'):
+            # Planned events record each charity's share
+            for share in event['assignments']:
+                committed[str(share['charity_id'])] += share.get('quantity', 0)
+        else:
+            # Chosen through select_charity: the whole surplus goes to one charity
+            committed[str(event['charity_id'])] += _event_surplus(event)
+    return committed
+
+def _apply_plan(plan):
+    """Assign every planned event to its charities, like select_charity does for one"""
+    shares = defaultdict(list)
+    for assignment in plan['assignments']:
+        shares[assignment['surplus_id']].append({
+            'charity_id': str(assignment['charity_id']),
+            'quantity': assignment['quantity'],
+            'distance_km': assignment['distance_km']
+        })
+    
+    now = datetime.utcnow()
+    event_updates = []
+    donations = defaultdict(int)
+    for event_id, event_shares in shares.items():
+        primary = max(event_shares, key=lambda share: share['quantity'])
+        event_updates.append(UpdateOne({'_id': event_id}, {'$set': {
+            'status': 'assigned',
+            'charity_id': primary['charity_id'],
+            'assignments': event_shares,
+            'assigned_at': now
+        }}))
+        for share in event_shares:
+            donations[share['charity_id']] += 1
+    
+    charity_ids = {str(a['charity_id']): a['charity_id'] for a in plan['assignments']}
+    charity_updates = [
+        UpdateOne({'_id': charity_ids[charity_id]}, {'$inc': {'total_donations': count}})
+        for charity_id, count in donations.items()
+    ]
+    if event_updates:
+        mongo.db.events.bulk_write(event_updates, ordered=False)
+    if charity_updates:
+        mongo.db.charities.bulk_write(charity_updates, ordered=False)
+
+@redistribute_bp.route('/plan', methods=['POST'])
+@jwt_required()
+def plan_redistribution():
+    """
+    Assign pending surplus to charities with spare capacity, as one batch.
+    Spare capacity is a charity's capacity less the surplus of events already
+    assigned to it and not yet delivered.
+    
+    Takes `event_ids` (default: every pending event with a location),
+    `max_distance_km`, `allow_split` (default true) and `commit`. With commit
+    the plan is written: events become assigned and charities' donation
+    counts go up.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        max_distance = float(data.get('max_distance_km', Config.ASSIGNMENT_MAX_DISTANCE_KM))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_distance_km must be a number'}), 400
+    if not 0 < max_distance <= Config.MAX_SEARCH_RADIUS_KM:
+        return jsonify({'error': f'max_distance_km must be between 0 and {Config.MAX_SEARCH_RADIUS_KM:g}'}), 400
+    
+    event_ids = data.get('event_ids')
+    if event_ids is not None and (not isinstance(event_ids, list) or not all(isinstance(i, str) for i in event_ids)):
+        return jsonify({'error': 'event_ids must be a list of event ids'}), 400
+    
+    if event_ids:
+        events = [event for event in identity_map().load_many('events', event_ids).values() if event]
+    else:
+        events = mongo.db.events.find(
+            {'status': 'pending', 'location': {'$exists': True}},
+            {'location': 1, 'food_items': 1, 'wasted_food': 1, 'wastage_predictions': 1}
+        ).limit(Config.ASSIGNMENT_MAX_EVENTS)
+    
+    surpluses = []
+    for event in events:
+        coords = point_coordinates(event.get('location'))
+        quantity = _event_surplus(event)
+        if coords is None or quantity <= 0:
+            continue
+        surpluses.append({
+            'id': event['_id'],
+            'lat': coords[0],
+            'lng': coords[1],
+            'quantity': quantity,
+            'food_items': event.get('food_items', [])
+        })
+    
+    # Active, verified charities near any of the surpluses, from the in-memory spatial index
+    nearby = {}
+    for surplus in surpluses:
+        for charity, _ in charity_index.within_charities(surplus['lat'], surplus['lng'], max_distance):
+            nearby.setdefault(str(charity.id), charity)
+    # Capacity is what is left after assignments not yet delivered, so
+    # successive plans never book a charity beyond its limit
+    committed = _open_commitments(list(nearby), [surplus['id'] for surplus in surpluses])
+    charities = []
+    for charity_id, charity in nearby.items():
+        capacity = _charity_capacity(charity) - committed[charity_id]
+        if capacity <= 0:
+            continue
+        charities.append({
+            'id': charity.id,
+            'lat': charity.location['lat'],
+            'lng': charity.location['lng'],
+            'capacity': capacity,
+            'charity': charity
+        })
+    
+    # Event venues recur, so their distances usually come straight from the shared matrix
+    distances = None
+    if Config.VENUE_MATRIX_ENABLED and surpluses and charities:
+        try:
+            distances = venue_matrix.distances(
+                [(s['lat'], s['lng']) for s in surpluses],
+                [(c['id'], c['lat'], c['lng']) for c in charities]
+            )
+        except (VenueMatrixFull, OSError) as e:
+            print(f"Venue distance matrix unavailable ({str(e)}), computing distances")
+    
+    plan = plan_assignments(surpluses, charities, max_distance,
+                            allow_split=bool(data.get('allow_split', True)), distances=distances)
+    
+    if data.get('commit'):
+        _apply_plan(plan)
+        plan['committed'] = True
+    
+    return jsonify(plan), 200
+
+def _parse_time(value, default):
+    if not value:
+        return default
+    # Naive UTC, like every stored timestamp
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+def _apply_pickup_routes(routes):
+    """Schedule every routed donation with its vehicle, stop number and ETA"""
+    now = datetime.utcnow()
+    updates = [
+        UpdateOne({'_id': stop['donation_id']}, {'$set': {
+            'status': 'scheduled',
+            'pickup_route': {
+                'vehicle': route['vehicle'],
+                'sequence': stop['sequence'],
+                'eta': stop['eta'],
+                'planned_at': now
+            }
+        }})
+        for route in routes for stop in route['stops']
+    ]
+    if updates:
+        mongo.db.donations.bulk_write(updates, ordered=False)
+
+@redistribute_bp.route('/pickup-routes', methods=['POST'])
+@jwt_required()
+def plan_pickup():
+    """
+    Plan multi-stop pickup routes for pending donations.
+    
+    Takes the depot as `charity_id` or `depot` {latitude, longitude},
+    `window_start`/`window_end` (ISO, default now and PICKUP_HORIZON_HOURS
+    later), `vehicles`, `vehicle_capacity` in plates, an optional
+    `organization_name` and `commit`. With commit the routed donations
+    become scheduled.
+    """
+    data = request.get_json(silent=True) or {}
+    
+    if data.get('charity_id'):
+        charity = Charity.find_by_id(data['charity_id'])
+        depot = point_coordinates(charity.location) if charity else None
+    else:
+        depot = point_coordinates(data.get('depot'))
+    if depot is None:
+        return jsonify({'error': 'A depot location or a charity with a location is required'}), 400
+    
+    try:
+        start = _parse_time(data.get('window_start'), datetime.utcnow())
+        end = _parse_time(data.get('window_end'), start + timedelta(hours=Config.PICKUP_HORIZON_HOURS))
+        vehicles = int(data.get('vehicles', 1))
+        vehicle_capacity = int(data.get('vehicle_capacity', Config.PICKUP_VEHICLE_CAPACITY))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid window, vehicles or vehicle_capacity'}), 400
+    if end <= start or vehicles < 1 or vehicle_capacity < 1:
+        return jsonify({'error': 'window_end must follow window_start and vehicles must be positive'}), 400
+    
+    # Donations whose pickup window overlaps the planning window
+    query = {
+        'status': 'pending',
+        'pickup_location': {'$exists': True},
+        'pickup_window.start': {'$lt': end},
+        'pickup_window.end': {'$gt': start}
+    }
+    if data.get('organization_name'):
+        query['organization_name'] = data['organization_name']
+    donations = mongo.db.donations.find(
+        query, {'pickup_location': 1, 'pickup_window': 1, 'plate_count': 1}
+    ).sort('pickup_window.start', 1).limit(Config.PICKUP_MAX_STOPS)
+    
+    stops = []
+    for donation in donations:
+        coords = point_coordinates(donation['pickup_location'])
+        if coords is None:
+            continue
+        stops.append({
+            'id': donation['_id'],
+            'lat': coords[0],
+            'lng': coords[1],
+            'plates': donation.get('plate_count') or 0,
+            'window_start': donation['pickup_window']['start'],
+            'window_end': donation['pickup_window']['end']
+        })
+    
+    plan = plan_pickup_routes(stops, depot, start, end, vehicles, vehicle_capacity)
+    
+    if data.get('commit'):
+        _apply_pickup_routes(plan['routes'])
+        plan['committed'] = True
+    
+    return jsonify(plan), 200
+
 def find_nearby_charities(location, food_items, radius_km=10):
     """Find nearby charities that can accept the food items"""
     try:
-        # Get all active and verified charities
-        charities = mongo.db.charities.find({
-            'active': True,
-            'verified': True
-        })
+        # Active, verified charities come from the in-memory spatial index, already compiled
+        candidates = charity_index.within_charities(location['lat'], location['lng'], radius_km)
+        distances = {id(charity): distance for charity, distance in candidates}
         
+        # One pass over all candidates with the food items summed and masked once
         nearby_charities = []
-        for charity_data in charities:
-            charity = Charity(charity_data)
-            
-            # Calculate distance using Haversine formula
-            distance = haversine_distance(
-                location['lat'], location['lng'],
-                charity.location['lat'], charity.location['lng']
-            )
-            
-            if distance <= radius_km and charity.is_suitable_for_food(food_items):
-                charity_info = charity.to_dict()
-                charity_info['distance'] = round(distance, 2)
-                nearby_charities.append(charity_info)
-        
-        # Sort by distance
-        nearby_charities.sort(key=lambda x: x['distance'])
+        for charity in Charity.filter_suitable([charity for charity, _ in candidates], food_items):
+            charity_info = charity.to_dict()
+            charity_info['distance'] = round(distances[id(charity)], 2)
+            nearby_charities.append(charity_info)
         
+        # Candidates are already ordered by distance
         return nearby_charities
         
     except Exception as e:
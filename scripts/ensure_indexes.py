@@ -0,0 +1,28 @@
+"""
+Create missing MongoDB indexes and rebuild ones whose keys or options drifted.
+
+    python scripts/ensure_indexes.py
+
+Run it once per deploy, before starting the workers; the app itself never
+builds indexes. On a database with legacy locations run
+scripts/migrate_geojson_locations.py instead, which ends with this step.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import INDEXES, ensure_indexes, init_standalone, mongo
+
+def main():
+    parser = argparse.ArgumentParser(description='Create or rebuild the MongoDB indexes the app expects')
+    parser.parse_args()
+
+    app = init_standalone()
+    with app.app_context():
+        ensure_indexes()
+        print(f"Checked indexes of {len(INDEXES)} collections on {mongo.db.name}")
+
+if __name__ == "__main__":
+    main()
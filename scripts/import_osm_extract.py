@@ -0,0 +1,172 @@
+"""
+Load charities, NGOs, old age homes and food banks from a local OSM extract
+into `osm_places`, which /predict and /find-charities then search instead of
+the live Overpass API wherever an imported region covers the query.
+
+    python scripts/import_osm_extract.py southern-zone-latest.osm.pbf --region south-india
+    python scripts/import_osm_extract.py bangalore.json --region bangalore --bbox 12.7,77.3,13.3,77.9
+
+PBF extracts need the `osmium` package (pyosmium); Overpass JSON dumps (e.g.
+from `[out:json]` with `out center;` or with the member nodes) do not.
+Re-running for a region replaces its previous import.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+
+from pymongo import ReplaceOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import mongo, ensure_indexes, init_standalone
+from utils.geo import to_geojson_point
+from utils.osm_places import PLACE_TAG_FILTERS, centroid, element_point, matches_place_tags, place_from_tags
+
+try:
+    import osmium
+except ImportError:  # only needed for .pbf extracts
+    osmium = None
+
+PLACE_TAG_KEYS = sorted({key for key, _ in PLACE_TAG_FILTERS})
+
+def read_overpass_json(path):
+    """Yield (osm id, tags, (lat, lng)) for matching nodes and ways of an Overpass JSON dump"""
+    with open(path) as f:
+        elements = json.load(f).get('elements', [])
+
+    nodes = {e['id']: (e['lat'], e['lon']) for e in elements if e.get('type') == 'node' and 'lat' in e}
+    for element in elements:
+        tags = element.get('tags') or {}
+        if element.get('type') not in ('node', 'way') or not matches_place_tags(tags):
+            continue
+        point = element_point(element, nodes)
+        if point is not None:
+            yield f"{element['type']}/{element['id']}", tags, point
+
+def read_pbf(path):
+    """[(osm id, tags, (lat, lng))] for matching nodes and ways of a PBF extract"""
+    if osmium is None:
+        raise SystemExit("Reading .pbf extracts needs the osmium package (pip install osmium)")
+
+    found = []
+
+    class PlaceHandler(osmium.SimpleHandler):
+        def node(self, node):
+            if not any(key in node.tags for key in PLACE_TAG_KEYS):
+                return
+            tags = {tag.k: tag.v for tag in node.tags}
+            if matches_place_tags(tags) and node.location.valid():
+                found.append((f"node/{node.id}", tags, (node.location.lat, node.location.lon)))
+
+        def way(self, way):
+            if not any(key in way.tags for key in PLACE_TAG_KEYS):
+                return
+            tags = {tag.k: tag.v for tag in way.tags}
+            if matches_place_tags(tags):
+                point = centroid((n.lat, n.lon) for n in way.nodes if n.location.valid())
+                if point is not None:
+                    found.append((f"way/{way.id}", tags, point))
+
+    # locations=True keeps node coordinates around so ways can be resolved
+    PlaceHandler().apply_file(path, locations=True)
+    return found
+
+def pbf_bounds(path):
+    """(min_lat, min_lng, max_lat, max_lng) from the extract's header, if it has one"""
+    reader = osmium.io.Reader(path, osmium.osm.osm_entity_bits.NOTHING)
+    try:
+        box = reader.header().box()
+    finally:
+        reader.close()
+    if not box.valid():
+        return None
+    return [box.bottom_left.lat, box.bottom_left.lon, box.top_right.lat, box.top_right.lon]
+
+def parse_bbox(value):
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4 or parts[0] >= parts[2] or parts[1] >= parts[3]:
+        raise argparse.ArgumentTypeError('bbox must be min_lat,min_lng,max_lat,max_lng')
+    return parts
+
+def import_places(db, places, region, bbox, source, batch_size=1000, dry_run=False):
+    """Upsert `places` for `region`, then drop what an earlier import of it left behind"""
+    import_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    count = 0
+    extent = [90.0, 180.0, -90.0, -180.0]
+    operations = []
+
+    for osm_id, tags, (lat, lng) in places:
+        if bbox and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
+            continue
+        extent = [min(extent[0], lat), min(extent[1], lng), max(extent[2], lat), max(extent[3], lng)]
+        doc = place_from_tags(tags, lat, lng)
+        del doc['latitude'], doc['longitude']
+        doc.update({
+            '_id': osm_id,
+            'location': to_geojson_point(lat, lng),
+            'region': region,
+            'import_id': import_id,
+            'imported_at': now
+        })
+        operations.append(ReplaceOne({'_id': osm_id}, doc, upsert=True))
+        count += 1
+
+        if len(operations) >= batch_size:
+            if not dry_run:
+                db.osm_places.bulk_write(operations, ordered=False)
+            operations = []
+
+    if dry_run:
+        return count, 0
+    if operations:
+        db.osm_places.bulk_write(operations, ordered=False)
+
+    removed = db.osm_places.delete_many({'region': region, 'import_id': {'$ne': import_id}}).deleted_count
+    if count:
+        db.osm_imports.replace_one({'_id': region}, {
+            '_id': region,
+            'bbox': bbox or extent,
+            'import_id': import_id,
+            'source': os.path.basename(source),
+            'places': count,
+            'imported_at': now
+        }, upsert=True)
+    else:
+        # Nothing to serve locally; searches in the region go back to Overpass
+        db.osm_imports.delete_one({'_id': region})
+    return count, removed
+
+def main():
+    parser = argparse.ArgumentParser(description='Import places from a local OSM extract (PBF or Overpass JSON)')
+    parser.add_argument('path', help='.osm.pbf extract or Overpass JSON dump')
+    parser.add_argument('--region', help='Name of the covered region (default: the file name)')
+    parser.add_argument('--bbox', type=parse_bbox,
+                        help='min_lat,min_lng,max_lat,max_lng to keep and to serve locally '
+                             '(default: the PBF header box, else the extent of the imported places)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='Parse and count without writing')
+    args = parser.parse_args()
+
+    region = args.region or os.path.basename(args.path).split('.')[0]
+    if args.path.endswith('.pbf'):
+        places = read_pbf(args.path)
+        bbox = args.bbox or pbf_bounds(args.path)
+    else:
+        places = read_overpass_json(args.path)
+        bbox = args.bbox
+
+    # Not the web app: importing it would start its background jobs
+    app = init_standalone()
+
+    with app.app_context():
+        if not args.dry_run:
+            ensure_indexes()
+        count, removed = import_places(mongo.db, places, region, bbox, args.path, args.batch_size, args.dry_run)
+        print(f"{region}: {count} places imported, {removed} stale places removed")
+
+if __name__ == "__main__":
+    main()
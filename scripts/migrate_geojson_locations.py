@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import mongo, ensure_indexes, init_standalone
+from utils.geo import point_coordinates, to_geojson_point
+
+COLLECTIONS = ['charities', 'events']
+
+# Documents whose `location` is not GeoJSON yet, or that only carry flat latitude/longitude
+LEGACY_LOCATION_QUERY = {
+    '$or': [
+        {'location': {'$exists': True}, 'location.type': {'$ne': 'Point'}},
+        {'location': {'$exists': False}, 'latitude': {'$exists': True}, 'longitude': {'$exists': True}}
+    ]
+}
+
+def location_update(doc):
+    """Build the update that gives `doc` a GeoJSON location, or moves an unusable one aside"""
+    coords = point_coordinates(doc)
+    if coords is not None:
+        return {'$set': {'location': to_geojson_point(*coords)}}
+
+    # No coordinates (e.g. a free-text address): keep the value but out of the 2dsphere-indexed field
+    location = doc.get('location')
+    if isinstance(location, str) and not doc.get('address'):
+        return {'$set': {'address': location}, '$unset': {'location': ''}}
+    return {'$set': {'location_raw': location}, '$unset': {'location': ''}}
+
+def migrate_collection(collection, batch_size=500, dry_run=False):
+    converted = moved = 0
+    operations = []
+
+    cursor = collection.find(
+        LEGACY_LOCATION_QUERY,
+        {'location': 1, 'latitude': 1, 'longitude': 1, 'address': 1}
+    ).batch_size(batch_size)
+
+    for doc in cursor:
+        update = location_update(doc)
+        if 'location' in update.get('$set', {}):
+            converted += 1
+        else:
+            moved += 1
+        operations.append(UpdateOne({'_id': doc['_id']}, update))
+
+        if len(operations) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(operations, ordered=False)
+            operations = []
+
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+
+    return converted, moved
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill GeoJSON `location` fields on charities and events')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+
+    # Not the web app: importing it would start its background jobs
+    app = init_standalone()
+
+    with app.app_context():
+        for name in COLLECTIONS:
+            converted, moved = migrate_collection(mongo.db[name], args.batch_size, args.dry_run)
+            print(f"{name}: {converted} converted to GeoJSON, {moved} without coordinates moved aside")
+
+        if not args.dry_run:
+            # The 2dsphere indexes can only be built once every location is GeoJSON
+            ensure_indexes()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database.db import init_standalone, mongo
+from models.retraining import total_wasted_kg
+
+# Counters that can be recomputed from stored events and donations. Predictions
+# are not stored individually, so their counters and recent list are kept.
+REBUILT_SECTIONS = ['events', 'donations', 'actual_wastage']
+
+def _add(totals, user_id, day, field, amount):
+    totals[user_id][field] = totals[user_id].get(field, 0) + amount
+    if day is not None:
+        bucket = totals[user_id].setdefault('daily', {}).setdefault(day, {})
+        key = field.replace('.', '_')
+        bucket[key] = bucket.get(key, 0) + amount
+
+def _day(doc, retention_start):
+    created_at = doc.get('created_at')
+    if isinstance(created_at, datetime) and created_at >= retention_start:
+        return created_at.strftime('%Y-%m-%d')
+    return None
+
+def collect_totals(db, batch_size=1000):
+    retention_start = datetime.utcnow() - timedelta(days=Config.USER_STATS_RETENTION_DAYS)
+    totals = defaultdict(dict)
+
+    events = db.events.find(
+        {'user_id': {'$exists': True}},
+        {'user_id': 1, 'created_at': 1, 'expected_attendees': 1, 'wastage_predictions': 1,
+         'wasted_food': 1, 'redistribution_details': 1}
+    ).batch_size(batch_size)
+    for event in events:
+        user_id = str(event['user_id'])
+        day = _day(event, retention_start)
+        attendees = event.get('expected_attendees') or 0
+        predicted = sum(p.get('predicted_wastage', 0) for p in (event.get('wastage_predictions') or {}).values())
+        _add(totals, user_id, day, 'events.count', 1)
+        _add(totals, user_id, day, 'events.expected_attendees', attendees)
+        _add(totals, user_id, day, 'events.predicted_wastage', predicted)
+        totals[user_id]['events.max_expected_attendees'] = max(totals[user_id].get('events.max_expected_attendees', 0), attendees)
+
+        wasted_kg = total_wasted_kg(event.get('wasted_food'))
+        if wasted_kg is not None:
+            _add(totals, user_id, day, 'actual_wastage.count', 1)
+            _add(totals, user_id, day, 'actual_wastage.kg', wasted_kg)
+            totals[user_id]['actual_wastage.max_kg'] = max(totals[user_id].get('actual_wastage.max_kg', 0), wasted_kg)
+        if event.get('redistribution_details'):
+            _add(totals, user_id, day, 'donations.count', 1)
+
+    donations = db.donations.find({'user_id': {'$exists': True}}, {'user_id': 1, 'created_at': 1, 'plate_count': 1})
+    for donation in donations.batch_size(batch_size):
+        user_id = str(donation['user_id'])
+        day = _day(donation, retention_start)
+        _add(totals, user_id, day, 'donations.count', 1)
+        _add(totals, user_id, day, 'donations.plates', donation.get('plate_count') or 0)
+
+    return totals
+
+def write_totals(db, totals):
+    for user_id, fields in totals.items():
+        stats = db.user_stats.find_one({'_id': user_id}) or {}
+        daily = fields.pop('daily', {})
+        # Keep the per-day prediction counters, which cannot be recomputed
+        for day, counters in stats.get('daily', {}).items():
+            for key, value in counters.items():
+                if key.startswith('predictions_'):
+                    daily.setdefault(day, {})[key] = value
+
+        update = {'$set': {'daily': daily}, '$setOnInsert': {'created_at': datetime.utcnow()}}
+        unset = {section: '' for section in REBUILT_SECTIONS}
+        db.user_stats.update_one({'_id': user_id}, {'$unset': unset}, upsert=True)
+        for field, value in fields.items():
+            update['$set'][field] = value
+        db.user_stats.update_one({'_id': user_id}, update, upsert=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute user_stats rollups from stored events and donations')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='Report the users that would be updated without writing')
+    args = parser.parse_args()
+
+    # Not the web app: importing it would start its background jobs
+    app = init_standalone()
+
+    with app.app_context():
+        totals = collect_totals(mongo.db, args.batch_size)
+        print(f"Recomputed statistics for {len(totals)} users")
+        if not args.dry_run:
+            write_totals(mongo.db, totals)
+
+if __name__ == "__main__":
+    main()
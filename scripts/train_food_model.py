@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.model_registry import LinearModel, food_model_registry
+
+# Seed data: [event_type, attendees] -> wastage_kg
+SEED_FEATURES = [[1, 50], [2, 100], [1, 200], [2, 500], [3, 1000]]
+SEED_WASTAGE_KG = [5, 15, 30, 80, 150]
+
+def train_seed_model():
+    """Ordinary least squares with an intercept, as LinearRegression would fit it"""
+    features = np.asarray(SEED_FEATURES, dtype=float)
+    augmented = np.hstack([features, np.ones((len(features), 1))])
+    weights, *_ = np.linalg.lstsq(augmented, np.asarray(SEED_WASTAGE_KG, dtype=float), rcond=None)
+    return LinearModel(weights[:-1], weights[-1], food_model_registry.features)
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the seed food wastage model and publish it to the registry')
+    parser.add_argument('--version', help='Version to publish as (defaults to the next free vN)')
+    args = parser.parse_args()
+
+    version = food_model_registry.publish(train_seed_model(), version=args.version)
+    print(f"Published food_model {version}")
+
+if __name__ == "__main__":
+    main()
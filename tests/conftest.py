@@ -0,0 +1,41 @@
+import os
+
+# Set before the app is imported: no scheduler, gazetteer thread, shared files or Redis
+for name, value in {
+    'RETRAIN_ENABLED': 'False',
+    'GAZETTEER_ENABLED': 'False',
+    'OSM_LOCAL_ENABLED': 'False',
+    'VENUE_MATRIX_ENABLED': 'False',
+    'RATELIMIT_STORAGE_URL': '',
+}.items():
+    os.environ.setdefault(name, value)
+
+import mongomock
+import pytest
+
+from app import app as flask_app
+from database.db import mongo
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory database behind `mongo.db`"""
+    mongo.db = mongomock.MongoClient().db
+    return mongo.db
+
+
+@pytest.fixture
+def client(db):
+    flask_app.config['TESTING'] = True
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def auth_headers(db):
+    """Bearer token of an active user, for the JWT-protected API routes"""
+    from flask_jwt_extended import create_access_token
+
+    user_id = db.users.insert_one({'email': 'donor@example.com', 'password': 'x', 'is_active': True}).inserted_id
+    with flask_app.app_context():
+        token = create_access_token(identity=str(user_id))
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+
+def test_split_plan_is_listed_for_every_charity_with_its_share(client, db, auth_headers):
+    db.events.insert_many([
+        {
+            'status': 'assigned',
+            'charity_id': 'big',
+            'assignments': [
+                {'charity_id': 'big', 'quantity': 60, 'distance_km': 2.0},
+                {'charity_id': 'small', 'quantity': 25, 'distance_km': 3.5}
+            ],
+            'created_at': datetime(2024, 1, 2)
+        },
+        {
+            # Chosen through select_charity: the whole surplus goes to one charity
+            'status': 'assigned',
+            'charity_id': 'small',
+            'wastage_predictions': {'Rice': {'predicted_wastage': 12}},
+            'created_at': datetime(2024, 1, 1)
+        },
+        {
+            'status': 'completed',
+            'charity_id': 'small',
+            'assignments': [{'charity_id': 'small', 'quantity': 40, 'distance_km': 1.0}],
+            'created_at': datetime(2024, 1, 3)
+        }
+    ])
+
+    small = client.get('/api/redistribute/charity-donations/small', headers=auth_headers).get_json()
+    assert [donation['share_quantity'] for donation in small['donations']] == [25, 12]
+
+    big = client.get('/api/redistribute/charity-donations/big', headers=auth_headers).get_json()
+    assert [donation['share_quantity'] for donation in big['donations']] == [60]
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from models.charity_index import CharityIndex
+
+
+def charity(name, **flags):
+    return dict({
+        'name': name,
+        'location': {'type': 'Point', 'coordinates': [77.5946, 12.9716]},
+        'created_at': datetime(2024, 1, 1)
+    }, **flags)
+
+
+def test_rebuild_and_upsert_agree_on_eligibility(db):
+    db.charities.insert_many([
+        charity('no active flag', verified=True),
+        charity('active', active=True, verified=True),
+        charity('inactive', active=False, verified=True),
+        charity('unverified', active=True),
+    ])
+
+    rebuilt = CharityIndex()
+    rebuilt.rebuild()
+    upserted = CharityIndex()
+    for charity_data in db.charities.find():
+        upserted.upsert(charity_data)
+
+    names = lambda index: sorted(data['name'] for data, _ in index.within(12.9716, 77.5946, 1))
+    assert names(rebuilt) == names(upserted) == ['active', 'no active flag']
+
+
+def test_verified_charity_joins_the_index_on_refresh(db):
+    charity_id = db.charities.insert_one(charity('new')).inserted_id
+    index = CharityIndex()
+    index.rebuild()
+    assert len(index) == 0
+
+    db.charities.update_one({'_id': charity_id}, {'$set': {
+        'verified': True,
+        'updated_at': datetime(2024, 1, 1) + timedelta(days=1)
+    }})
+    index.refresh()
+    assert len(index) == 1
@@ -0,0 +1,53 @@
+import pytest
+import requests
+
+from routes import predict_routes
+from utils import overpass_cache
+
+
+@pytest.fixture
+def overpass(monkeypatch):
+    """Stub Overpass: counts calls and fails while `calls['fail']` is set"""
+    calls = {'count': 0, 'fail': True}
+
+    def fetch(latitude, longitude, radius_km):
+        calls['count'] += 1
+        if calls['fail']:
+            raise requests.Timeout('Overpass timed out')
+        return [{
+            'latitude': latitude, 'longitude': longitude, 'name': 'Food Bank', 'address': 'MG Road',
+            'phone': '', 'website': '', 'type': 'Food Bank'
+        }]
+
+    monkeypatch.setattr(predict_routes, 'fetch_places_overpass', fetch)
+    monkeypatch.setattr(predict_routes, 'get_coordinates_from_location', lambda location: (12.9716, 77.5946))
+    predict_routes._find_charities_cache.clear()
+    overpass_cache._cache.clear()
+    return calls
+
+
+def test_failed_lookup_is_not_cached_and_retried(client, overpass):
+    first = client.get('/predict/find-charities?location=Bengaluru')
+    assert first.status_code == 200
+    assert first.get_json()['degraded'] is True
+    assert first.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in first.headers
+
+    second = client.get('/predict/find-charities?location=Bengaluru')
+    assert second.get_json()['degraded'] is True
+    assert overpass['count'] == 2
+
+
+def test_successful_lookup_is_cached_after_a_failure(client, overpass):
+    client.get('/predict/find-charities?location=Bengaluru')
+    overpass['fail'] = False
+
+    recovered = client.get('/predict/find-charities?location=Bengaluru')
+    assert recovered.get_json()['degraded'] is False
+    assert [place['name'] for place in recovered.get_json()['charities']] == ['Food Bank']
+    assert recovered.headers['Cache-Control'].startswith('public')
+    assert recovered.headers.get('ETag')
+
+    again = client.get('/predict/find-charities?location=Bengaluru')
+    assert again.get_json() == recovered.get_json()
+    assert overpass['count'] == 2
@@ -0,0 +1,40 @@
+import pytest
+
+from utils import overpass_cache
+
+CENTER = (12.9716, 77.5946)
+
+
+@pytest.fixture
+def fetch(db):
+    overpass_cache._cache.clear()
+    calls = []
+
+    def fetch(latitude, longitude, radius_km):
+        calls.append((latitude, longitude, radius_km))
+        return [{'latitude': latitude, 'longitude': longitude}]
+
+    fetch.calls = calls
+    return fetch
+
+
+def test_point_across_a_tile_border_reuses_the_neighbouring_tile(fetch):
+    overpass_cache.get_candidate_places(*CENTER, 1, fetch)
+    min_lat, min_lon, max_lat, max_lon = overpass_cache.geohash_bounds(overpass_cache.geohash_encode(*CENTER, 6))
+    # ~50 m east of the tile, well inside the circle that tile fetched
+    across = ((min_lat + max_lat) / 2, max_lon + 0.0005)
+    assert overpass_cache.geohash_encode(*across, 6) != overpass_cache.geohash_encode(*CENTER, 6)
+
+    overpass_cache.get_candidate_places(*across, 0.5, fetch)
+    assert len(fetch.calls) == 1
+
+
+def test_neighbour_that_does_not_cover_the_query_is_not_reused(fetch):
+    overpass_cache.get_candidate_places(*CENTER, 1, fetch)
+    min_lat, min_lon, max_lat, max_lon = overpass_cache.geohash_bounds(overpass_cache.geohash_encode(*CENTER, 6))
+    # ~1 km east, still the neighbouring tile, but its circle reaches past what that tile fetched
+    across = ((min_lat + max_lat) / 2, max_lon + 0.009)
+    assert overpass_cache.geohash_encode(*across, 6) in overpass_cache._neighbour_tiles(overpass_cache.geohash_encode(*CENTER, 6))
+
+    overpass_cache.get_candidate_places(*across, 1, fetch)
+    assert len(fetch.calls) == 2
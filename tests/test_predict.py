@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from models.model_registry import food_model_registry
+from routes import predict_routes
+
+
+@pytest.fixture
+def logged_in(client, auth_headers, db, monkeypatch):
+    """A browser session for the user behind auth_headers, with no live place search"""
+    monkeypatch.setattr(predict_routes, 'find_nearby_organizations', lambda latitude, longitude: None)
+    with client.session_transaction() as session:
+        session['_user_id'] = str(db.users.find_one()['_id'])
+    return client
+
+
+def test_predict_reports_the_food_model_estimate(logged_in):
+    version, _ = food_model_registry.get()
+    expected = predict_routes.model_wastage_kg([('Wedding', 200)])[0][0]
+
+    response = logged_in.post('/predict/predict', json={
+        'event_type': 'Wedding',
+        'plates': 200,
+        'location': {'latitude': 12.9716, 'longitude': 77.5946}
+    })
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['estimated_wastage_kg'] == expected
+    assert body['model_version'] == version
+
+
+def test_predict_batch_reports_the_food_model_estimate_per_event(logged_in):
+    version, _ = food_model_registry.get()
+
+    response = logged_in.post('/predict/predict-batch', json=[
+        {'event_type': 'Wedding', 'plates': 200},
+        {'event_type': 'Conference', 'plates': 80}
+    ])
+
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    expected, _ = predict_routes.model_wastage_kg([('Wedding', 200), ('Conference', 80)])
+    assert [result['estimated_wastage_kg'] for result in results] == expected
+    assert {result['model_version'] for result in results} == {version}
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+
+from config import Config
+from utils.geo import haversine_many_to_many
+
+# Coordinates are keyed at ~1 m precision
+_KEY_DECIMALS = 5
+
+
+class DistanceMatrixCache:
+    """
+    Great-circle distances (km) between recently seen points, grown incrementally.
+
+    Points keep their row once computed, so re-planning after one new donation
+    only computes that donation's row. The matrix is float32 and starts over
+    when it would hold more than DISTANCE_MATRIX_MAX_POINTS points.
+    """
+
+    def __init__(self, max_points=None):
+        self.max_points = max_points or Config.DISTANCE_MATRIX_MAX_POINTS
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'resets': 0}
+        self._reset()
+
+    def _reset(self):
+        self._index = {}
+        self._latitudes = []
+        self._longitudes = []
+        self._buffer = np.zeros((0, 0), dtype=np.float32)
+
+    def _grow(self, keys):
+        """Add `keys` and fill in their rows and columns"""
+        start = len(self._index)
+        for key in keys:
+            self._index[key] = len(self._index)
+            self._latitudes.append(key[0])
+            self._longitudes.append(key[1])
+        size = len(self._index)
+
+        if size > len(self._buffer):
+            # Double the allocation so a run of single additions stays amortized O(n) each
+            buffer = np.zeros((min(max(size, 2 * len(self._buffer)), self.max_points),) * 2, dtype=np.float32)
+            buffer[:start, :start] = self._buffer[:start, :start]
+            self._buffer = buffer
+
+        rows = haversine_many_to_many(
+            self._latitudes[start:], self._longitudes[start:],
+            self._latitudes, self._longitudes,
+            dtype=np.float32
+        )
+        self._buffer[start:size, :size] = rows
+        self._buffer[:size, start:size] = rows.T
+
+    def matrix(self, points):
+        """(len(points) x len(points)) distances in km for a list of (lat, lng)"""
+        keys = [(round(float(lat), _KEY_DECIMALS), round(float(lng), _KEY_DECIMALS)) for lat, lng in points]
+        unique = list(dict.fromkeys(keys))
+        if len(unique) > self.max_points:
+            # Too big to keep; compute without caching
+            latitudes, longitudes = zip(*keys) if keys else ((), ())
+            return haversine_many_to_many(latitudes, longitudes, latitudes, longitudes, dtype=np.float32)
+
+        with self._lock:
+            missing = [key for key in unique if key not in self._index]
+            self._stats['hits'] += len(unique) - len(missing)
+            self._stats['misses'] += len(missing)
+            if len(self._index) + len(missing) > self.max_points:
+                self._stats['resets'] += 1
+                self._reset()
+                missing = unique
+            if missing:
+                self._grow(missing)
+            rows = np.array([self._index[key] for key in keys], dtype=np.intp)
+            return self._buffer[np.ix_(rows, rows)]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, points=len(self._index))
+
+
+distance_matrix = DistanceMatrixCache()
@@ -0,0 +1,43 @@
+import re
+import threading
+import unicodedata
+
+
+def normalize_food_name(name):
+    """Canonical form of a food name: NFKC, case-folded, single spaces"""
+    text = unicodedata.normalize('NFKC', str(name or '')).casefold()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class FoodVocabulary:
+    """
+    Shared food-term -> bit mapping, so sets of foods compare as integer masks.
+
+    Terms are only added for charity restrictions; a food nobody restricts
+    has no bit and can never make a charity refuse a donation.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._lock = threading.Lock()
+
+    def mask(self, names, add=False):
+        mask = 0
+        for name in names:
+            term = normalize_food_name(name)
+            if not term:
+                continue
+            bit = self._bits.get(term)
+            if bit is None:
+                if not add:
+                    continue
+                with self._lock:
+                    bit = self._bits.setdefault(term, len(self._bits))
+            mask |= 1 << bit
+        return mask
+
+    def __len__(self):
+        return len(self._bits)
+
+
+food_vocabulary = FoodVocabulary()
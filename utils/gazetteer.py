@@ -0,0 +1,264 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from config import Config
+
+# Columns of a GeoNames dump (cities500.txt, IN.txt, ...)
+_NAME, _ASCII_NAME, _ALTERNATE_NAMES = 1, 2, 3
+_LATITUDE, _LONGITUDE, _FEATURE_CLASS, _FEATURE_CODE = 4, 5, 6, 7
+_COUNTRY, _ADMIN1, _POPULATION = 8, 10, 14
+
+# Names a query's last part may use for the country, by ISO code
+COUNTRY_NAMES = {
+    'IN': ('india', 'bharat', 'in', 'ind'),
+}
+
+# Romanisations of Indian names differ mostly in aspiration, vowel length and
+# doubled letters (Thiruvananthapuram / Tiruvanantapuram, Kozhikode / Kozikode)
+_FOLDS = (
+    (re.compile(r'([a-z])\1+'), r'\1'),
+    (re.compile(r'([bcdgjkpt])h'), r'\1'),
+    (re.compile(r'zh'), 'z'),
+    (re.compile(r'ee|ii'), 'i'),
+    (re.compile(r'oo|uu'), 'u'),
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'([a-z])\1+'), r'\1'),
+)
+
+
+def normalize_place_name(name):
+    """Case-folded, accent-free, punctuation-free name with single spaces; other scripts are kept"""
+    text = unicodedata.normalize('NFKD', str(name or ''))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = re.sub(r"['’`.]", '', text)
+    text = re.sub(r'[\W_]+', ' ', text)
+    return text.strip()
+
+
+def fold_place_name(normalized):
+    """Spelling-insensitive key for a Latin-script normalized name"""
+    folded = normalized.replace(' ', '')
+    for pattern, replacement in _FOLDS:
+        folded = pattern.sub(replacement, folded)
+    return folded
+
+
+class Gazetteer:
+    """
+    In-memory place-name index built from a GeoNames dump.
+
+    Populated places (feature class P) and first- and second-level admin areas
+    of GAZETTEER_COUNTRIES are indexed by their name, ASCII name and every
+    alternate name (which covers other scripts and historic names) after
+    normalize_place_name, plus a folded spelling key. State names come from
+    an admin1CodesASCII.txt file when there is one. Coordinates and
+    populations are kept in float32/int64 arrays; keys map to tuples of
+    place numbers, and a sorted key list serves prefix lookups.
+
+    Files are read in a background thread, started by load_in_background() or
+    the first lookup; lookups miss until the index is ready, and always
+    without the files. load() reads them synchronously, for scripts.
+    """
+
+    def __init__(self, places_path=None, admin1_path=None, countries=None):
+        self.places_path = places_path or Config.GAZETTEER_PLACES_PATH
+        self.admin1_path = admin1_path or Config.GAZETTEER_ADMIN1_PATH
+        self.countries = countries or {code.strip().upper() for code in Config.GAZETTEER_COUNTRIES.split(',') if code.strip()}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._loading = False
+        self._loaded = False
+
+    def _load_admin1(self):
+        """{'IN.19': ('Karnataka', {'karnataka', ...})}"""
+        states = {}
+        if not self.admin1_path or not os.path.exists(self.admin1_path):
+            return states
+        with open(self.admin1_path, encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) < 3 or fields[0].split('.')[0] not in self.countries:
+                    continue
+                keys = {normalize_place_name(fields[1]), normalize_place_name(fields[2])}
+                states[fields[0]] = (fields[1], keys)
+        return states
+
+    def _load(self):
+        names, states, countries, latitudes, longitudes, populations = [], [], [], [], [], []
+        index = {}
+        admin1 = self._load_admin1()
+
+        with open(self.places_path, encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) < 15 or fields[_COUNTRY] not in self.countries:
+                    continue
+                if fields[_FEATURE_CLASS] != 'P' and fields[_FEATURE_CODE] not in ('ADM1', 'ADM2'):
+                    continue
+
+                number = len(names)
+                admin1_code = f"{fields[_COUNTRY]}.{fields[_ADMIN1]}"
+                if fields[_FEATURE_CODE] == 'ADM1' and admin1_code not in admin1:
+                    # Dumps with admin areas name their states themselves
+                    admin1[admin1_code] = (fields[_NAME], {normalize_place_name(fields[_NAME])})
+                names.append(fields[_NAME])
+                states.append(admin1_code)
+                countries.append(fields[_COUNTRY])
+                latitudes.append(float(fields[_LATITUDE]))
+                longitudes.append(float(fields[_LONGITUDE]))
+                populations.append(int(fields[_POPULATION] or 0))
+
+                aliases = {fields[_NAME], fields[_ASCII_NAME]}
+                aliases.update(fields[_ALTERNATE_NAMES].split(','))
+                for alias in aliases:
+                    key = normalize_place_name(alias)
+                    if key:
+                        index.setdefault(key, set()).add(number)
+                        index.setdefault('~' + fold_place_name(key), set()).add(number)
+
+        populations = np.array(populations, dtype=np.int64)
+        # Most populous first, so the first candidate that passes the filters wins
+        self._index = {
+            key: tuple(sorted(numbers, key=lambda n: -populations[n])) for key, numbers in index.items()
+        }
+        self._keys = sorted(key for key in self._index if not key.startswith('~'))
+        self._names = names
+        self._states = states
+        self._countries = countries
+        self._latitudes = np.array(latitudes, dtype=np.float32)
+        self._longitudes = np.array(longitudes, dtype=np.float32)
+        self._populations = populations
+        self._admin1 = admin1
+        self._state_codes = {}
+        for code, (_, keys) in admin1.items():
+            for key in keys:
+                self._state_codes.setdefault(key, set()).add(code)
+                self._state_codes.setdefault('~' + fold_place_name(key), set()).add(code)
+        print(f"Gazetteer loaded {len(names)} places and {len(self._keys)} names")
+
+    def load(self):
+        """Read the files now, blocking until done; True when places were loaded"""
+        with self._lock:
+            if not self._loaded:
+                self._loading = True
+                try:
+                    if not self.places_path or not os.path.exists(self.places_path):
+                        print(f"Gazetteer file {self.places_path} not found; geocoding goes to Nominatim")
+                        self._clear()
+                    else:
+                        self._load()
+                except Exception as e:
+                    # A broken dump leaves the gazetteer empty rather than retried on every lookup
+                    print(f"Gazetteer load failed: {str(e)}")
+                    self._clear()
+                self._loaded = True
+        return bool(self._index)
+
+    def _clear(self):
+        self._index, self._keys = {}, []
+        self._admin1, self._state_codes = {}, {}
+
+    def load_in_background(self):
+        """Build the index off the request path; lookups miss until it is ready"""
+        with self._start_lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self.load, name='gazetteer-load', daemon=True).start()
+
+    def _ready(self):
+        """True once the index is loaded and has places; never waits for a load in progress"""
+        if not self._loaded:
+            self.load_in_background()
+            return False
+        return bool(self._index)
+
+    def _candidates(self, part):
+        key = normalize_place_name(part)
+        if not key:
+            return ()
+        return self._index.get(key) or self._index.get('~' + fold_place_name(key), ())
+
+    def _states_matching(self, part):
+        key = normalize_place_name(part)
+        return self._state_codes.get(key) or self._state_codes.get('~' + fold_place_name(key)) or set()
+
+    def lookup(self, location, countrycodes=None):
+        """
+        (latitude, longitude) for 'place[, ..., state][, country]', or None on a miss.
+
+        The first part naming a known place whose later parts are all states
+        holding it wins, the most populous such place first. Queries ending in
+        an unknown country, or naming a place outside the given state, miss.
+        """
+        if not Config.GAZETTEER_ENABLED or not self._ready():
+            return None
+        countries = {code.strip().upper() for code in (countrycodes or '').split(',') if code.strip()}
+        if countries and not countries & self.countries:
+            return None
+
+        parts = [part for part in str(location or '').split(',') if normalize_place_name(part)]
+        country_aliases = {alias for code in self.countries for alias in COUNTRY_NAMES.get(code, ())}
+        if parts and normalize_place_name(parts[-1]) in country_aliases:
+            parts = parts[:-1]
+        elif len(parts) > 1 and not (self._states_matching(parts[-1]) or self._candidates(parts[-1])):
+            # Most likely another country ("Hyderabad, Sindh, Pakistan"); Nominatim knows it
+            return None
+
+        for position, part in enumerate(parts):
+            numbers = self._candidates(part)
+            if countries:
+                numbers = [n for n in numbers if self._countries[n] in countries]
+            if not numbers:
+                continue
+            # Later parts must all be states holding the place; otherwise this part
+            # is a street or locality ("Main, Pune") and a later part names the place
+            states = [self._states_matching(later) for later in parts[position + 1:]]
+            if not all(states):
+                continue
+            for codes in states:
+                numbers = [n for n in numbers if self._states[n] in codes]
+            if not numbers:
+                return None
+            number = numbers[0]
+            return round(float(self._latitudes[number]), 5), round(float(self._longitudes[number]), 5)
+        return None
+
+    def _describe(self, number):
+        state = self._admin1.get(self._states[number])
+        return {
+            'name': self._names[number],
+            'state': state[0] if state else None,
+            'country': self._countries[number],
+            'latitude': round(float(self._latitudes[number]), 5),
+            'longitude': round(float(self._longitudes[number]), 5),
+            'population': int(self._populations[number])
+        }
+
+    def suggest(self, prefix, limit=10):
+        """The `limit` most populous places with a name or alias starting with `prefix`"""
+        if not Config.GAZETTEER_ENABLED or not self._ready():
+            return []
+        key = normalize_place_name(prefix)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_left(self._keys, key + '\uffff')
+        numbers = {number for name in self._keys[start:end] for number in self._index[name]}
+        best = heapq.nlargest(limit, numbers, key=lambda n: (self._populations[n], -n))
+        return [self._describe(number) for number in best]
+
+    def stats(self):
+        if not self._loaded or not self._index:
+            return {'places': 0, 'names': 0}
+        return {'places': len(self._names), 'names': len(self._keys)}
+
+
+gazetteer = Gazetteer()
@@ -0,0 +1,86 @@
+from math import radians, sin, cos, sqrt, atan2
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate the great circle distance between two points on the earth"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1-a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def _haversine(lat1, lon1, lat2, lon2, dtype):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=dtype)) for v in (lat1, lon1, lat2, lon2))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    # arcsin form; clipping guards against rounding pushing sqrt(a) just above 1
+    return (2 * EARTH_RADIUS_KM) * np.arcsin(np.sqrt(np.clip(a, 0, 1))).astype(dtype, copy=False)
+
+
+def haversine_one_to_many(latitude, longitude, latitudes, longitudes, dtype=np.float64):
+    """
+    Distances in km from one point to every point of the `latitudes`/`longitudes` arrays.
+
+    Pass dtype=np.float32 to halve memory and bandwidth when metre-level precision is enough.
+    """
+    return _haversine(latitude, longitude, latitudes, longitudes, dtype)
+
+
+def haversine_many_to_many(latitudes1, longitudes1, latitudes2, longitudes2, dtype=np.float64):
+    """Distance matrix in km with shape (len(latitudes1), len(latitudes2))"""
+    lat1 = np.asarray(latitudes1, dtype=dtype)[:, np.newaxis]
+    lon1 = np.asarray(longitudes1, dtype=dtype)[:, np.newaxis]
+    lat2 = np.asarray(latitudes2, dtype=dtype)[np.newaxis, :]
+    lon2 = np.asarray(longitudes2, dtype=dtype)[np.newaxis, :]
+    return _haversine(lat1, lon1, lat2, lon2, dtype)
+
+
+def point_coordinates(value):
+    """
+    Return (lat, lng) from a GeoJSON Point, a {lat, lng} sub-document or a document
+    with flat latitude/longitude fields (or its `location`), or None when there is none.
+    """
+    if not isinstance(value, dict):
+        return None
+    try:
+        if value.get('type') == 'Point':
+            lng, lat = value['coordinates'][:2]
+            return float(lat), float(lng)
+        if 'lat' in value and 'lng' in value:
+            return float(value['lat']), float(value['lng'])
+        if 'location' in value:
+            coords = point_coordinates(value['location'])
+            if coords is not None:
+                return coords
+        if 'latitude' in value and 'longitude' in value:
+            return float(value['latitude']), float(value['longitude'])
+    except (TypeError, ValueError, KeyError):
+        return None
+    return None
+
+
+def to_geojson_point(latitude, longitude):
+    # GeoJSON orders coordinates as [longitude, latitude]
+    return {'type': 'Point', 'coordinates': [float(longitude), float(latitude)]}
+
+
+def lat_lng_location(data):
+    """{lat, lng} for a document's coordinates, or its raw `location` when it has none"""
+    coords = point_coordinates(data)
+    if coords is None:
+        return data.get('location')
+    return {'lat': coords[0], 'lng': coords[1]}
+
+
+def as_geojson_point(location):
+    """GeoJSON Point for any supported location shape; other values are returned unchanged"""
+    coords = point_coordinates(location)
+    return to_geojson_point(*coords) if coords else location
@@ -0,0 +1,141 @@
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+import requests
+
+from config import Config
+from database.db import mongo
+from utils import http_client
+from utils.cache import TTLCache, SingleFlight
+from utils.gazetteer import gazetteer
+from utils.rate_limiter import BudgetExhausted
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+_cache = TTLCache(maxsize=Config.GEOCODE_CACHE_SIZE, ttl=Config.GEOCODE_CACHE_TTL)
+_inflight = SingleFlight()
+
+# Marker stored for queries Nominatim could not resolve, so they are not retried on every request
+_NOT_FOUND = (None, None)
+
+
+def normalize_location_query(location):
+    """Normalise a free-text location so equivalent spellings share a cache entry"""
+    text = unicodedata.normalize('NFKC', str(location or '')).lower()
+    parts = [re.sub(r'\s+', ' ', part).strip(' .') for part in text.split(',')]
+    return ', '.join(part for part in parts if part)
+
+
+def _cache_key(query, countrycodes):
+    return f"{countrycodes or '*'}|{query}"
+
+
+def _load_persisted(key):
+    try:
+        doc = mongo.db.geocode_cache.find_one({'_id': key})
+    except Exception as e:
+        print(f"Geocode cache read failed: {str(e)}")
+        return None
+    if not doc:
+        return None
+
+    ttl = Config.GEOCODE_CACHE_TTL if doc.get('found') else Config.GEOCODE_NEGATIVE_TTL
+    if doc.get('created_at', datetime.min) < datetime.utcnow() - timedelta(seconds=ttl):
+        return None
+    if not doc.get('found'):
+        return _NOT_FOUND
+    return doc['lat'], doc['lon']
+
+
+def _persist(key, query, coords):
+    try:
+        mongo.db.geocode_cache.replace_one(
+            {'_id': key},
+            {
+                '_id': key,
+                'query': query,
+                'found': coords != _NOT_FOUND,
+                'lat': coords[0],
+                'lon': coords[1],
+                'created_at': datetime.utcnow()
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Geocode cache write failed: {str(e)}")
+
+
+def _fetch_from_nominatim(query, countrycodes):
+    params = {
+        'q': query,
+        'format': 'json',
+        'limit': 1
+    }
+    if countrycodes:
+        params['countrycodes'] = countrycodes
+
+    print(f"Making geocoding request for location: {query}")
+    response = http_client.get('nominatim', NOMINATIM_URL, params=params)
+
+    if not response.ok:
+        # Upstream failures are not cached so the next request tries again
+        raise requests.HTTPError(f"Geocoding request failed with status {response.status_code}")
+
+    data = response.json()
+    if data:
+        return float(data[0]['lat']), float(data[0]['lon'])
+    return _NOT_FOUND
+
+
+def _resolve(key, query, countrycodes):
+    coords = _load_persisted(key)
+    if coords is None:
+        coords = _fetch_from_nominatim(query, countrycodes)
+        _persist(key, query, coords)
+
+    ttl = Config.GEOCODE_CACHE_TTL if coords != _NOT_FOUND else Config.GEOCODE_NEGATIVE_TTL
+    _cache.set(key, coords, ttl=ttl)
+    return coords
+
+
+def geocode(location, countrycodes=None):
+    """
+    Resolve a location string to (latitude, longitude).
+
+    Known place names are answered from the local gazetteer. Other lookups go
+    through an in-process LRU, then the persistent `geocode_cache` collection,
+    and only then to Nominatim. Concurrent misses for the same query share one
+    upstream call. Returns (None, None) when nothing is found.
+    """
+    query = normalize_location_query(location)
+    if not query:
+        return _NOT_FOUND
+
+    try:
+        coords = gazetteer.lookup(query, countrycodes)
+    except Exception as e:
+        # The remote provider still answers when the local index misbehaves
+        print(f"Gazetteer lookup failed: {str(e)}")
+        coords = None
+    if coords is not None:
+        return coords
+
+    key = _cache_key(query, countrycodes)
+    coords = _cache.get(key)
+    if coords is not None:
+        return coords
+
+    try:
+        return _inflight.do(key, lambda: _resolve(key, query, countrycodes))
+    except BudgetExhausted as e:
+        # Nothing is cached, so the query is retried once Nominatim's budget refills
+        print(f"Geocoding skipped: {str(e)}")
+        return _NOT_FOUND
+    except Exception as e:
+        print(f"Error getting coordinates: {str(e)}")
+        return _NOT_FOUND
+
+
+def cache_stats():
+    return _cache.stats()
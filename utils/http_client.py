@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils.cache import SingleFlight
+from utils.rate_limiter import rate_limiter
+
+USER_AGENT = 'FoodWastageApp/1.0'
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Per-provider outbound limits. Timeouts are (connect, read) in seconds.
+PROVIDERS = {
+    'nominatim': {
+        'timeout': (Config.HTTP_CONNECT_TIMEOUT, Config.NOMINATIM_READ_TIMEOUT),
+        'max_concurrency': Config.NOMINATIM_MAX_CONCURRENCY,
+    },
+    'overpass': {
+        'timeout': (Config.HTTP_CONNECT_TIMEOUT, Config.OVERPASS_READ_TIMEOUT),
+        'max_concurrency': Config.OVERPASS_MAX_CONCURRENCY,
+    },
+    'default': {
+        'timeout': (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT),
+        'max_concurrency': Config.HTTP_POOL_MAXSIZE,
+    },
+}
+
+
+class ProviderBusy(requests.RequestException):
+    """Raised when a provider's concurrency cap stays saturated for longer than the queue timeout"""
+
+
+class _Provider:
+    def __init__(self, name, settings):
+        self.name = name
+        self.timeout = settings['timeout']
+        self.slots = threading.BoundedSemaphore(settings['max_concurrency'])
+
+        # One session per provider keeps its keep-alive pool separate from the others
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(settings['max_concurrency'], 1),
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+_inflight = SingleFlight()
+
+
+def _get_provider(name):
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _Provider(name, PROVIDERS.get(name, PROVIDERS['default']))
+                _providers[name] = provider
+    return provider
+
+
+def _backoff_delay(attempt, response=None):
+    """Full-jitter exponential backoff, honouring a short Retry-After when the server sends one"""
+    delay = random.uniform(0, Config.HTTP_BACKOFF_BASE * (2 ** attempt))
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+    return min(delay, Config.HTTP_BACKOFF_MAX)
+
+
+def _request_key(provider_name, method, url, kwargs):
+    params = kwargs.get('params') or {}
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    return (provider_name, method, url, repr(params), repr(kwargs.get('data')), repr(kwargs.get('json')))
+
+
+def request(provider_name, method, url, dedupe=False, max_wait=None, **kwargs):
+    """
+    Send a request through the pooled session of `provider_name`.
+
+    Every attempt first waits for a slot in the provider's rate budget, which
+    raises BudgetExhausted when it is more than `max_wait` seconds away.
+    Connection errors, timeouts and 429/502/503/504 responses are retried up to
+    HTTP_MAX_RETRIES times with jittered backoff. The final response is returned
+    even when it is not ok; exceptions from the last attempt are re-raised.
+
+    With `dedupe`, identical requests already in flight in this process share
+    one upstream call and its response.
+    """
+    if dedupe:
+        key = _request_key(provider_name, method, url, kwargs)
+        return _inflight.do(key, lambda: _send(provider_name, method, url, max_wait, kwargs))
+    return _send(provider_name, method, url, max_wait, kwargs)
+
+
+def _send(provider_name, method, url, max_wait, kwargs):
+    provider = _get_provider(provider_name)
+    kwargs.setdefault('timeout', provider.timeout)
+
+    if not provider.slots.acquire(timeout=Config.HTTP_QUEUE_TIMEOUT):
+        raise ProviderBusy(f"Too many concurrent {provider_name} requests")
+
+    try:
+        for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+            is_last = attempt == Config.HTTP_MAX_RETRIES
+            rate_limiter.acquire(provider_name, max_wait)
+            try:
+                response = provider.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if is_last:
+                    raise
+                print(f"{provider_name} request failed ({str(e)}), retrying")
+                time.sleep(_backoff_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and not is_last:
+                print(f"{provider_name} returned {response.status_code}, retrying")
+                time.sleep(_backoff_delay(attempt, response))
+                continue
+            return response
+    finally:
+        provider.slots.release()
+
+
+def get(provider_name, url, **kwargs):
+    kwargs.setdefault('dedupe', True)
+    return request(provider_name, 'GET', url, **kwargs)
+
+
+def post(provider_name, url, **kwargs):
+    """POST, e.g. an Overpass query; pass dedupe=True when the call is a read"""
+    return request(provider_name, 'POST', url, **kwargs)
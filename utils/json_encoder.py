@@ -0,0 +1,58 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+def bson_default(o):
+    """Encode the BSON types Mongo documents carry; None if `o` is not one of them"""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal128):
+        # As a string so no precision is lost
+        return str(o.to_decimal())
+    if isinstance(o, Decimal):
+        return str(o)
+    return None
+
+class MongoJSONEncoder(JSONEncoder):
+    """
+    JSON encoder for raw Mongo documents, registered as `app.json_encoder`.
+
+    ObjectId becomes its hex string, datetimes ISO 8601 and Decimal128 a
+    decimal string. When orjson is installed, encoding is done by it and the
+    stdlib encoder is only used for values orjson rejects (e.g. integers
+    wider than 64 bits or non-string keys).
+    """
+
+    def default(self, o):
+        value = bson_default(o)
+        if value is not None:
+            return value
+        return super().default(o)
+
+    def encode(self, o):
+        if orjson is not None:
+            try:
+                return orjson.dumps(o, default=self.default, option=self._orjson_option()).decode()
+            except TypeError:
+                pass
+        return super().encode(o)
+
+    def _orjson_option(self):
+        # NumPy scalars are float/int subclasses the stdlib encoder accepts, so keep accepting them
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            # orjson only indents by two spaces
+            option |= orjson.OPT_INDENT_2
+        return option
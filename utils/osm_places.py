@@ -0,0 +1,129 @@
+import re
+from math import cos, radians
+
+from config import Config
+from database.db import mongo
+from utils.cache import TTLCache
+from utils.geo import point_coordinates
+
+# The tag filters of the Overpass query in routes/predict_routes.py, as
+# unanchored regexes like Overpass' `~` operator
+PLACE_TAG_FILTERS = (
+    ('social_facility', re.compile(r'nursing_home|group_home|shelter|elderly_nursing_home')),
+    ('amenity', re.compile(r'social_facility|social_centre|community_centre')),
+    ('office', re.compile(r'ngo|charity')),
+    ('social_facility', re.compile(r'^food_bank$')),
+)
+
+EARTH_RADIUS_KM = 6378.1
+KM_PER_DEGREE = 111.32
+
+# Imported regions, refreshed once a minute so a nightly import is picked up
+_coverage = TTLCache(maxsize=1, ttl=60)
+
+
+def matches_place_tags(tags):
+    return any(pattern.search(tags.get(key, '')) for key, pattern in PLACE_TAG_FILTERS if key in tags)
+
+
+def place_from_tags(tags, latitude, longitude):
+    """The place dict search results are built from, for an OSM element's tags"""
+    # Get a better name for the type
+    place_type = tags.get('social_facility',
+                 tags.get('amenity',
+                 tags.get('office', 'NGO/Charity')))
+
+    # Clean up the type name
+    place_type = place_type.replace('_', ' ').title()
+
+    # Get the best available address
+    address_parts = []
+    if tags.get('addr:street'):
+        address_parts.append(tags.get('addr:street'))
+    if tags.get('addr:housenumber'):
+        address_parts.append(tags.get('addr:housenumber'))
+    if tags.get('addr:city'):
+        address_parts.append(tags.get('addr:city'))
+    if not address_parts and tags.get('addr:full'):
+        address_parts.append(tags.get('addr:full'))
+
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'name': tags.get('name', 'Unnamed Place'),
+        'address': ', '.join(address_parts) if address_parts else 'Address not available',
+        'phone': tags.get('phone', tags.get('contact:phone', 'Phone not available')),
+        'website': tags.get('website', tags.get('contact:website', '')),
+        'type': place_type
+    }
+
+
+def centroid(points):
+    """Mean of a way's node coordinates, counting a closed way's repeated first node once"""
+    points = list(points)
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    if not points:
+        return None
+    return (sum(lat for lat, _ in points) / len(points), sum(lng for _, lng in points) / len(points))
+
+
+def element_point(element, nodes=None):
+    """
+    (lat, lng) of an Overpass node or way: its own coordinates, the `center` of
+    `out center`, the centroid of its `geometry`, or else the centroid of its
+    member nodes looked up in `nodes` ({id: (lat, lng)}). None when unknown.
+    """
+    if 'lat' in element and 'lon' in element:
+        return (element['lat'], element['lon'])
+    if 'center' in element:
+        return (element['center']['lat'], element['center']['lon'])
+    if 'geometry' in element:
+        return centroid((g['lat'], g['lon']) for g in element['geometry'] if g)
+    nodes = nodes or {}
+    return centroid(nodes[ref] for ref in element.get('nodes', []) if ref in nodes)
+
+
+def _covered(latitude, longitude, radius_km):
+    """True when an imported region's bounding box contains the whole search circle"""
+    regions = _coverage.get('regions')
+    if regions is None:
+        regions = list(mongo.db.osm_imports.find({}, {'bbox': 1}))
+        _coverage.set('regions', regions)
+    lat_margin = radius_km / KM_PER_DEGREE
+    lng_margin = lat_margin / max(cos(radians(latitude)), 0.01)
+    for region in regions:
+        min_lat, min_lng, max_lat, max_lng = region['bbox']
+        if (min_lat + lat_margin <= latitude <= max_lat - lat_margin
+                and min_lng + lng_margin <= longitude <= max_lng - lng_margin):
+            return True
+    return False
+
+
+def local_candidates(latitude, longitude, radius_km):
+    """
+    Places from the imported OSM extract within `radius_km`, or None when no
+    imported region covers the search so the caller should ask Overpass.
+    """
+    if not Config.OSM_LOCAL_ENABLED:
+        return None
+    try:
+        if not _covered(latitude, longitude, radius_km):
+            return None
+        docs = mongo.db.osm_places.find(
+            {'location': {'$geoWithin': {'$centerSphere': [[longitude, latitude], radius_km / EARTH_RADIUS_KM]}}},
+            {'_id': 0, 'name': 1, 'address': 1, 'phone': 1, 'website': 1, 'type': 1, 'location': 1}
+        )
+        places = []
+        for doc in docs:
+            coords = point_coordinates(doc.pop('location'))
+            if coords is not None:
+                places.append(dict(doc, latitude=coords[0], longitude=coords[1]))
+        return places
+    except Exception as e:
+        print(f"Local OSM lookup failed: {str(e)}")
+        return None
+
+
+def invalidate_coverage():
+    _coverage.clear()
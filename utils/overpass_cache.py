@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta
+from math import cos, radians, sqrt
+
+from config import Config
+from database.db import mongo
+from utils.cache import TTLCache, SingleFlight
+from utils.geo import haversine_distance
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# (radius class in km, geohash precision of the tiles cached for that class).
+# Precision 6 tiles are ~1.2 x 0.6 km, precision 5 tiles are ~4.9 x 4.9 km.
+RADIUS_CLASSES = (
+    (1, 6),
+    (2, 6),
+    (5, 5),
+    (10, 5),
+    (20, 5),
+    (50, 5),
+)
+
+KM_PER_DEGREE = 111.32
+
+# Part of every tile key; bump it when the shape or meaning of cached places
+# changes so tiles persisted by older code are not served (v2: ways carry their
+# own centre instead of the query's)
+CACHE_KEY_VERSION = 'v2'
+
+_cache = TTLCache(maxsize=Config.OVERPASS_CACHE_SIZE, ttl=Config.OVERPASS_CACHE_TTL)
+_inflight = SingleFlight()
+
+
+def geohash_encode(latitude, longitude, precision):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """Return (min_lat, min_lon, max_lat, max_lon) of a geohash tile"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def _tile_fetch_area(geohash, radius_km):
+    """
+    Centre and radius of the Overpass query for a tile. The radius is padded by
+    the tile's half-diagonal, so any point inside the tile can be answered for
+    any radius up to `radius_km` by filtering the fetched places locally.
+    """
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash)
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+
+    widest_lat = min(abs(min_lat), abs(max_lat))
+    half_height_km = (max_lat - min_lat) / 2 * KM_PER_DEGREE
+    half_width_km = (max_lon - min_lon) / 2 * KM_PER_DEGREE * cos(radians(widest_lat))
+    padding_km = sqrt(half_height_km ** 2 + half_width_km ** 2)
+
+    return center_lat, center_lon, radius_km + padding_km
+
+
+def _tile_key(geohash, radius_class_km):
+    return f"{CACHE_KEY_VERSION}:{geohash}:{radius_class_km}"
+
+
+def _neighbour_tiles(geohash):
+    """The (up to) eight tiles of the same precision around `geohash`"""
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash)
+    height = max_lat - min_lat
+    width = max_lon - min_lon
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+
+    neighbours = set()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            latitude = center_lat + dy * height
+            if (dy, dx) == (0, 0) or not -90 <= latitude <= 90:
+                continue
+            longitude = (center_lon + dx * width + 180) % 360 - 180
+            neighbours.add(geohash_encode(latitude, longitude, len(geohash)))
+    return neighbours
+
+
+def _covering_neighbour_keys(latitude, longitude, radius_km, classes):
+    """
+    Keys of neighbouring tiles, at every usable radius class, whose fetched
+    circle contains the whole query circle; their places are a superset too.
+    """
+    keys = []
+    for radius_class_km, precision in classes:
+        for geohash in _neighbour_tiles(geohash_encode(latitude, longitude, precision)):
+            center_lat, center_lon, fetch_radius_km = _tile_fetch_area(geohash, radius_class_km)
+            if haversine_distance(latitude, longitude, center_lat, center_lon) + radius_km <= fetch_radius_km:
+                keys.append(_tile_key(geohash, radius_class_km))
+    return keys
+
+
+def _load_persisted(keys):
+    """Return (key, places) for the first fresh persisted entry among `keys`"""
+    try:
+        docs = {doc['_id']: doc for doc in mongo.db.overpass_cache.find({'_id': {'$in': keys}})}
+    except Exception as e:
+        print(f"Overpass cache read failed: {str(e)}")
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.OVERPASS_CACHE_TTL)
+    for key in keys:
+        doc = docs.get(key)
+        if doc and doc.get('created_at', datetime.min) >= cutoff:
+            return key, doc['places']
+    return None
+
+
+def _persist(key, places):
+    try:
+        mongo.db.overpass_cache.replace_one(
+            {'_id': key},
+            {'_id': key, 'places': places, 'created_at': datetime.utcnow()},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Overpass cache write failed: {str(e)}")
+
+
+def _load_tile(keys, geohash, radius_class_km, fetch):
+    persisted = _load_persisted(keys)
+    if persisted is not None:
+        key, places = persisted
+    else:
+        key = keys[0]
+        center_lat, center_lon, fetch_radius_km = _tile_fetch_area(geohash, radius_class_km)
+        places = fetch(center_lat, center_lon, fetch_radius_km)
+        _persist(key, places)
+    _cache.set(key, places)
+    return places
+
+
+def get_candidate_places(latitude, longitude, radius_km, fetch):
+    """
+    Return a superset of the places within `radius_km` of the point.
+
+    `fetch(latitude, longitude, radius_km)` performs the live Overpass query and
+    must return a list of dicts carrying `latitude` and `longitude`; it should
+    raise on failure so errors are never cached. Results are cached per
+    (geohash tile, radius class). Before anything is fetched, a cached larger
+    radius class of the point's own tile is reused, and so is a neighbouring
+    tile whose fetched circle still contains the query circle, which catches
+    points just across a tile border. Callers filter by exact distance.
+    """
+    classes = [(r, p) for r, p in RADIUS_CLASSES if r >= radius_km]
+    if not classes:
+        return fetch(latitude, longitude, radius_km)
+
+    keys = []
+    for radius_class_km, precision in classes:
+        key = _tile_key(geohash_encode(latitude, longitude, precision), radius_class_km)
+        places = _cache.get(key)
+        if places is not None:
+            return places
+        keys.append(key)
+
+    neighbour_keys = _covering_neighbour_keys(latitude, longitude, radius_km, classes)
+    for key in neighbour_keys:
+        places = _cache.get(key)
+        if places is not None:
+            return places
+
+    radius_class_km, precision = classes[0]
+    geohash = geohash_encode(latitude, longitude, precision)
+    # A miss fetches the point's own tile at the smallest class; keys[0] stays first
+    keys += neighbour_keys
+    return _inflight.do(keys[0], lambda: _load_tile(keys, geohash, radius_class_km, fetch))
+
+
+def cache_stats():
+    return _cache.stats()
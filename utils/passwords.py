@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import Config
+
+try:
+    import bcrypt
+except ImportError:  # optional: pbkdf2 via werkzeug needs nothing extra
+    bcrypt = None
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many hashes are queued; callers should answer 503"""
+
+# Hashing is CPU bound (bcrypt and hashlib release the GIL while they run), so a
+# small pool caps how many cores login/register bursts can take from the rest of
+# the app. The semaphore bounds the queue in front of it.
+_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_admission = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_LIMIT)
+
+def _method():
+    if Config.PASSWORD_HASH_METHOD == 'bcrypt' and bcrypt is not None:
+        return 'bcrypt'
+    return 'pbkdf2'
+
+def _hash(password):
+    if _method() == 'bcrypt':
+        salt = bcrypt.gensalt(rounds=Config.BCRYPT_LOG_ROUNDS)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('ascii')
+    return generate_password_hash(password, method=f"pbkdf2:sha256:{Config.PBKDF2_ITERATIONS}")
+
+def _verify(password_hash, password):
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        if bcrypt is None:
+            return False
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+def _run(fn, *args):
+    if not _admission.acquire(timeout=Config.PASSWORD_HASH_ADMISSION_TIMEOUT):
+        raise PasswordHashingBusy('Too many password checks in progress')
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _admission.release()
+        raise
+    future.add_done_callback(lambda _: _admission.release())
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FuturesTimeoutError:
+        raise PasswordHashingBusy('Password hashing timed out')
+
+def hash_password(password):
+    """Hash with the configured algorithm and cost on the bounded hashing pool"""
+    return _run(_hash, password)
+
+def verify_password(password_hash, password):
+    """Check a password against any supported stored hash on the bounded hashing pool"""
+    if not password_hash or password is None:
+        return False
+    return _run(_verify, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True when a stored hash does not use the configured algorithm and cost"""
+    if not password_hash:
+        return False
+    if _method() == 'bcrypt':
+        if not password_hash.startswith(BCRYPT_PREFIXES):
+            return True
+        # $2b$12$... carries the cost as the third field
+        return int(password_hash.split('$')[2]) != Config.BCRYPT_LOG_ROUNDS
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        return True
+    method = password_hash.split('$', 1)[0]
+    return method != f"pbkdf2:sha256:{Config.PBKDF2_ITERATIONS}"
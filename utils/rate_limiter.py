@@ -0,0 +1,163 @@
+import re
+import threading
+import time
+
+import requests
+
+from config import Config
+
+try:
+    import redis
+except ImportError:  # optional: without it every process keeps its own buckets
+    redis = None
+
+# Per-provider budgets: `rate` requests per second with bursts of up to `burst`.
+# Nominatim's usage policy is 1 request per second; Overpass hands out a couple
+# of slots per IP and makes extra requests wait or fail with 429.
+PROVIDER_RATES = {
+    'nominatim': {'rate': Config.NOMINATIM_RATE_PER_SECOND, 'burst': Config.NOMINATIM_BURST},
+    'overpass': {'rate': Config.OVERPASS_RATE_PER_SECOND, 'burst': Config.OVERPASS_BURST},
+}
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Generic cell rate algorithm: the bucket is a single "theoretical arrival time".
+# Each caller reserves the next free slot in arrival order and is told how long
+# to sleep before using it, which keeps queueing FIFO without polling.
+_RESERVE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - tolerance - now
+if wait < 0 then wait = 0 end
+if wait > max_wait then return {0, tostring(wait)} end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+
+class BudgetExhausted(requests.RequestException):
+    """Raised when a provider's rate budget can't admit the request within the allowed wait"""
+
+
+def parse_rate(limit):
+    """'100 per minute' -> requests per second"""
+    match = re.match(r'^\s*(\d+)\s*(?:per|/)\s*(second|minute|hour|day)s?\s*$', limit or '')
+    if not match:
+        raise ValueError(f"Unsupported rate limit: {limit!r}")
+    return int(match.group(1)) / _PERIODS[match.group(2)]
+
+
+class _LocalBucket:
+    """In-process stand-in for the Redis script, shared by this worker's threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat = 0.0
+
+    def reserve(self, interval, tolerance, max_wait):
+        with self._lock:
+            now = time.time()
+            tat = max(self._tat, now)
+            wait = max(tat - tolerance - now, 0.0)
+            if wait > max_wait:
+                return False, wait
+            self._tat = tat + interval
+            return True, wait
+
+
+class RateLimiter:
+    """
+    Token buckets per provider, shared across workers through Redis.
+
+    Buckets live in RATELIMIT_STORAGE_URL when the redis client is installed
+    and the server answers; otherwise (or for RATELIMIT_REDIS_RETRY seconds
+    after a Redis error) each process uses local buckets, which only
+    coordinate its own threads.
+    """
+
+    def __init__(self, storage_url=None):
+        self.storage_url = storage_url if storage_url is not None else Config.RATELIMIT_STORAGE_URL
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._local = {}
+        self._lock = threading.Lock()
+        self._stats = {'granted': 0, 'delayed': 0, 'exhausted': 0, 'redis_errors': 0}
+
+    def _budget(self, provider_name):
+        budget = PROVIDER_RATES.get(provider_name)
+        if budget is None:
+            return parse_rate(Config.RATELIMIT_DEFAULT), Config.RATELIMIT_DEFAULT_BURST
+        return budget['rate'], budget['burst']
+
+    def _get_redis(self):
+        if redis is None or not self.storage_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            with self._lock:
+                if self._redis is None:
+                    client = redis.Redis.from_url(
+                        self.storage_url,
+                        socket_timeout=Config.RATELIMIT_REDIS_TIMEOUT,
+                        socket_connect_timeout=Config.RATELIMIT_REDIS_TIMEOUT
+                    )
+                    self._script = client.register_script(_RESERVE_SCRIPT)
+                    self._redis = client
+        return self._redis
+
+    def _reserve(self, provider_name, interval, tolerance, max_wait):
+        client = self._get_redis()
+        if client is not None:
+            try:
+                allowed, wait = self._script(
+                    keys=[f"ratelimit:{provider_name}"],
+                    args=[interval, tolerance, max_wait],
+                    client=client
+                )
+                return bool(allowed), float(wait)
+            except redis.RedisError as e:
+                print(f"Rate limiter storage unavailable ({str(e)}), using local buckets")
+                self._redis_down_until = time.monotonic() + Config.RATELIMIT_REDIS_RETRY
+                with self._lock:
+                    self._stats['redis_errors'] += 1
+
+        with self._lock:
+            bucket = self._local.setdefault(provider_name, _LocalBucket())
+        return bucket.reserve(interval, tolerance, max_wait)
+
+    def acquire(self, provider_name, max_wait=None):
+        """
+        Wait for the next request slot of `provider_name`.
+
+        Raises BudgetExhausted, without consuming a slot, when the wait would be
+        longer than `max_wait` seconds (RATELIMIT_MAX_WAIT by default).
+        """
+        rate, burst = self._budget(provider_name)
+        interval = 1.0 / rate
+        tolerance = (max(burst, 1) - 1) * interval
+        max_wait = Config.RATELIMIT_MAX_WAIT if max_wait is None else max_wait
+
+        allowed, wait = self._reserve(provider_name, interval, tolerance, max_wait)
+        with self._lock:
+            self._stats['granted' if allowed else 'exhausted'] += 1
+            if allowed and wait > 0:
+                self._stats['delayed'] += 1
+        if not allowed:
+            raise BudgetExhausted(f"{provider_name} rate budget exhausted (next slot in {wait:.1f}s)")
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, backend='redis' if self._redis is not None and
+                        time.monotonic() >= self._redis_down_until else 'local')
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,97 @@
+from math import cos, floor, radians
+
+import numpy as np
+
+from utils.geo import haversine_one_to_many
+
+KM_PER_DEGREE = 111.32
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over point items.
+
+    Radius queries only look at the cells overlapping the query's bounding box,
+    so their cost depends on local density rather than on the total item count.
+    Not thread-safe on its own; callers serialise writes.
+    """
+
+    def __init__(self, cell_size_deg=0.05):
+        self.cell_size_deg = cell_size_deg
+        self._cells = {}
+        self._points = {}  # item_id -> (lat, lon, cell)
+
+    def _cell(self, latitude, longitude):
+        return floor(latitude / self.cell_size_deg), floor(longitude / self.cell_size_deg)
+
+    def insert(self, item_id, latitude, longitude, item=None):
+        self.remove(item_id)
+        cell = self._cell(latitude, longitude)
+        self._cells.setdefault(cell, {})[item_id] = (latitude, longitude, item)
+        self._points[item_id] = (latitude, longitude, cell)
+
+    def remove(self, item_id):
+        point = self._points.pop(item_id, None)
+        if point is None:
+            return False
+        bucket = self._cells.get(point[2])
+        if bucket is not None:
+            bucket.pop(item_id, None)
+            if not bucket:
+                del self._cells[point[2]]
+        return True
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, item_id):
+        return item_id in self._points
+
+    def within(self, latitude, longitude, radius_km):
+        """Return [(distance_km, item_id, item)] within `radius_km`, nearest first"""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(cos(radians(latitude)), 0.01))
+
+        min_i, min_j = self._cell(latitude - lat_span, longitude - lon_span)
+        max_i, max_j = self._cell(latitude + lat_span, longitude + lon_span)
+
+        # Large radii cover more cells than are occupied, so walk the occupied ones instead
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(self._cells):
+            buckets = [bucket for (i, j), bucket in self._cells.items()
+                       if min_i <= i <= max_i and min_j <= j <= max_j]
+        else:
+            buckets = [self._cells.get((i, j)) for i in range(min_i, max_i + 1)
+                       for j in range(min_j, max_j + 1)]
+
+        entries = [(item_id, point) for bucket in buckets if bucket for item_id, point in bucket.items()]
+        if not entries:
+            return []
+
+        distances = haversine_one_to_many(
+            latitude, longitude,
+            [point[0] for _, point in entries],
+            [point[1] for _, point in entries]
+        )
+        hits = np.flatnonzero(distances <= radius_km)
+        hits = hits[np.argsort(distances[hits], kind='stable')]
+        return [(float(distances[i]), entries[i][0], entries[i][1][2]) for i in hits]
+
+    def nearest(self, latitude, longitude, k, max_radius_km=None):
+        """Return the `k` nearest [(distance_km, item_id, item)], optionally capped by distance"""
+        if k <= 0 or not self._points:
+            return []
+
+        radius_km = self.cell_size_deg * KM_PER_DEGREE
+        while True:
+            capped = max_radius_km is not None and radius_km >= max_radius_km
+            if capped:
+                radius_km = max_radius_km
+            results = self.within(latitude, longitude, radius_km)
+            # Every point within the searched radius is found, so k hits there are the true k nearest
+            if len(results) >= k or capped or len(results) == len(self._points):
+                return results[:k]
+            radius_km *= 2